@@ -0,0 +1,74 @@
+import asyncio
+import random
+import time
+from typing import Callable, Dict, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+from config import settings
+from .service import AIPrompt, AITexts, parse_ai_response
+
+# Upstream errors worth another attempt; anything else fails the project right away
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+async def _complete(client: AsyncOpenAI, prompt: AIPrompt, limiter: TokenBucket, semaphore: asyncio.Semaphore) -> AITexts:
+    for attempt in range(settings.ai_batch_max_retries + 1):
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                response = await client.chat.completions.create(
+                    model=settings.ai_model,
+                    messages=prompt.messages,
+                    temperature=0.7,
+                    max_tokens=250
+                )
+                return parse_ai_response(response.choices[0].message.content)
+            except RETRYABLE_ERRORS:
+                if attempt == settings.ai_batch_max_retries:
+                    raise
+        # Full-jitter exponential backoff, slept outside the semaphore so other calls proceed
+        await asyncio.sleep(random.uniform(0, settings.ai_batch_backoff_seconds * 2 ** attempt))
+
+async def complete_batch(prompts: Dict[str, AIPrompt], on_result: Callable[[str, Optional[AITexts]], None]) -> None:
+    """Runs one completion per prompt key with bounded concurrency and rate limiting.
+
+    ``on_result`` gets each key with its texts, or None once the key has exhausted its retries.
+    """
+    limiter = TokenBucket(settings.ai_batch_rate_per_second, settings.ai_batch_concurrency)
+    semaphore = asyncio.Semaphore(settings.ai_batch_concurrency)
+    # Retries are handled here, with the limiter in the loop, instead of inside the client
+    async with AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None, max_retries=0) as client:
+        async def run(key: str, prompt: AIPrompt):
+            try:
+                texts = await _complete(client, prompt, limiter, semaphore)
+            except Exception as e:
+                print(f"AI batch generation failed for prompt {key[:12]}: {e}")
+                texts = None
+            on_result(key, texts)
+
+        # Same-language prompts share the static system prefix; issuing them back to back keeps
+        # the provider's prompt cache warm for it
+        ordered = sorted(prompts.items(), key=lambda item: item[1].system)
+        await asyncio.gather(*(run(key, prompt) for key, prompt in ordered))
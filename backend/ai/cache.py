@@ -0,0 +1,78 @@
+import json
+import time
+from typing import Optional
+
+import redis
+from redis.exceptions import RedisError
+
+from config import settings
+from .service import AITexts
+
+CACHE_PREFIX = "ai:texts:"
+LOCK_PREFIX = "ai:lock:"
+WAIT_POLL_SECONDS = 0.25
+
+class AITextCache:
+    """Generated texts keyed by AIPrompt.cache_key, plus a single-flight lock per key.
+
+    The first task to take a key's lock calls upstream; identical tasks that arrive meanwhile
+    wait for its result instead of issuing their own completion. Redis errors degrade to
+    a cache miss so generation keeps working without Redis. Texts without a description are
+    failed completions and are never cached, so the next request retries upstream.
+    """
+
+    def __init__(self, redis_url: str, ttl: int, lock_ttl: int):
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self._redis = redis.Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Optional[AITexts]:
+        try:
+            raw = self._redis.get(CACHE_PREFIX + key)
+        except RedisError:
+            return None
+        if raw is None:
+            return None
+        description, commercial_text = json.loads(raw)
+        # Entries written before empty results were rejected count as misses
+        if not description:
+            return None
+        return description, commercial_text
+
+    def set(self, key: str, texts: AITexts) -> None:
+        if not texts[0]:
+            return
+        try:
+            self._redis.set(CACHE_PREFIX + key, json.dumps(list(texts)), ex=self.ttl)
+        except RedisError:
+            pass
+
+    def acquire(self, key: str) -> bool:
+        try:
+            return bool(self._redis.set(LOCK_PREFIX + key, "1", nx=True, ex=self.lock_ttl))
+        except RedisError:
+            # Without Redis there is nobody to coordinate with
+            return True
+
+    def release(self, key: str) -> None:
+        try:
+            self._redis.delete(LOCK_PREFIX + key)
+        except RedisError:
+            pass
+
+    def wait(self, key: str) -> Optional[AITexts]:
+        """Waits for the lock holder's result; None if it failed or the lock expired."""
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            texts = self.get(key)
+            if texts is not None:
+                return texts
+            try:
+                if not self._redis.exists(LOCK_PREFIX + key):
+                    return self.get(key)
+            except RedisError:
+                return None
+            time.sleep(WAIT_POLL_SECONDS)
+        return None
+
+ai_cache = AITextCache(settings.redis_url, settings.ai_cache_ttl_seconds, settings.ai_lock_ttl_seconds)
@@ -1,37 +1,71 @@
-from openai import OpenAI
+import hashlib
+import logging
+from dataclasses import dataclass
+from openai import AsyncOpenAI, OpenAI
 from config import settings
-from typing import Tuple, Optional
+from typing import AsyncIterator, Tuple, Optional
 import models
 from exceptions import AIServiceException
 
+logger = logging.getLogger(__name__)
+
+AITexts = Tuple[Optional[str], Optional[str]]
+
+@dataclass(frozen=True)
+class AIPrompt:
+    system: str
+    user: str
+
+    @property
+    def cache_key(self) -> str:
+        # Everything that shapes the completion; equal keys can share one upstream call
+        payload = "\0".join((settings.ai_model, self.system, self.user))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @property
+    def messages(self):
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user}
+        ]
+
 class AIService:
     def __init__(self):
         # Add graceful fallback if key is not set, or OpenAI fails to import properly
         try:
-            self.client = OpenAI(api_key=settings.openai_api_key)
+            self.client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
+            # Streaming runs on the API's event loop rather than tying up a threadpool worker
+            self.async_client = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
         except Exception:
             self.client = None
+            self.async_client = None
 
-    def generate_ai_texts(self, project: models.Project, lang: str = 'en') -> Tuple[Optional[str], Optional[str]]:
+    def generate_ai_texts(self, project: models.Project, lang: str = 'en') -> AITexts:
         """
         Generates AI texts for a project based on its parameters.
         Returns a tuple of (description: Optional[str], commercial_text: Optional[str]).
         """
-        if self.client is None:
-            raise AIServiceException("AI Service is not configured (missing API key)")
-        if not project.calculated_results:
+        prompt = self.build_prompt(project, lang)
+        if prompt is None:
             return None, None
-            
+        return self.complete(prompt)
+
+    def build_prompt(self, project: models.Project, lang: str = 'en') -> Optional[AIPrompt]:
+        """Returns None when the project has nothing to describe yet."""
+        if not project.calculated_results:
+            return None
+
         dim = f"{project.dim_x:.1f}x{project.dim_y:.1f}x{project.dim_z:.1f} mm" if project.dim_x else "Unknown"
         vol = f"{project.volume_mm3:.1f} mm3" if project.volume_mm3 else "Unknown"
         poly = f"{project.poly_count}" if project.poly_count else "Unknown"
-        
+
+        production_params = project.production_params or {}
         cost = project.calculated_results.get("total_price", "Unknown")
-        material = project.production_params.get("material", "Unknown")
-        technology = project.production_params.get("technology", "Unknown")
-        
+        material = production_params.get("material", "Unknown")
+        technology = production_params.get("technology", "Unknown")
+
         target_language = "Russian" if lang == "ru" else "English"
-        
+
         # we put static content in the beginning to enable prefix caching. we can keep lang as there are only counter options
         system_prompt = f"""[3D_CALC_STATIC_INSTRUCTIONS]
 Assistant for industrial 3D printing. Generate content exactly in this structure AND STRICTLY IN {target_language.upper()}:
@@ -50,31 +84,61 @@ Output MUST follow this format strictly with no extra text or labels.
 - Tech: {technology}
 - Price: {cost}
 """
+        return AIPrompt(system=system_prompt, user=user_data)
 
+    def complete(self, prompt: AIPrompt) -> AITexts:
+        if self.client is None:
+            raise AIServiceException("AI Service is not configured (missing API key)")
         try:
             response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_data}
-                ],
+                model=settings.ai_model,
+                messages=prompt.messages,
                 temperature=0.7,
                 max_tokens=250
             )
-            content = response.choices[0].message.content.strip()
-            lines = content.split("\n")
-            
-            # Extract reasoning (first line)
-            reasoning = lines[0] if lines else ""
-            print(f"DEBUGGER AI REASONING: {reasoning[:50]}")
-            
-            # Filter paragraphs (skip empty and reasoning)
-            paragraphs = [l.strip() for l in lines[1:] if l.strip()]
-            
-            if len(paragraphs) >= 2:
-                return paragraphs[0], paragraphs[1]
-            elif len(paragraphs) == 1:
-                return paragraphs[0], None
-            return None, None
+            return parse_ai_response(response.choices[0].message.content)
+        except Exception as e:
+            raise AIServiceException("Failed to generate AI content", details=str(e))
+
+    async def stream_completion(self, prompt: AIPrompt) -> AsyncIterator[str]:
+        """Yields the completion's text deltas as the model produces them."""
+        if self.async_client is None:
+            raise AIServiceException("AI Service is not configured (missing API key)")
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=settings.ai_model,
+                messages=prompt.messages,
+                temperature=0.7,
+                max_tokens=250,
+                stream=True
+            )
         except Exception as e:
             raise AIServiceException("Failed to generate AI content", details=str(e))
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise AIServiceException("Failed to generate AI content", details=str(e))
+        finally:
+            # Stops the upstream generation when the client goes away mid-stream
+            await stream.close()
+
+def parse_ai_response(content: str) -> AITexts:
+    lines = content.strip().split("\n")
+
+    # Extract reasoning (first line)
+    reasoning = lines[0] if lines else ""
+    logger.debug("AI reasoning: %s", reasoning[:50])
+
+    # Filter paragraphs (skip empty and reasoning)
+    paragraphs = [l.strip() for l in lines[1:] if l.strip()]
+
+    if len(paragraphs) >= 2:
+        return paragraphs[0], paragraphs[1]
+    elif len(paragraphs) == 1:
+        return paragraphs[0], None
+    return None, None
+
+# One client (and its connection pool) per process
+ai_service = AIService()
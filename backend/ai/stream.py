@@ -0,0 +1,65 @@
+import logging
+from typing import List, Optional, Tuple
+
+from .service import AITexts
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("description", "pitch")
+
+class AIResponseParser:
+    """Incremental counterpart of parse_ai_response.
+
+    Fed completion deltas as they arrive, it returns the (section, text) pieces of the
+    description and pitch paragraphs, so each can be forwarded the moment it starts.
+    The reasoning line is consumed but never emitted; it is logged at debug level once it
+    is complete.
+    """
+
+    def __init__(self):
+        self.reasoning = ""
+        self._paragraphs: List[str] = []
+        self._in_reasoning = True
+        self._at_line_start = True
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        events: List[Tuple[str, str]] = []
+        for char in delta:
+            if self._in_reasoning:
+                if char == "\n":
+                    if self.reasoning:
+                        self._end_reasoning()
+                elif self.reasoning or not char.isspace():
+                    self.reasoning += char
+                continue
+            if char == "\n":
+                self._at_line_start = True
+                continue
+            if len(self._paragraphs) >= len(SECTIONS) and self._at_line_start:
+                # Anything after the pitch is ignored, as in parse_ai_response
+                continue
+            if self._at_line_start:
+                if char.isspace():
+                    continue
+                self._paragraphs.append("")
+                self._at_line_start = False
+            self._paragraphs[-1] += char
+            section = SECTIONS[len(self._paragraphs) - 1]
+            if events and events[-1][0] == section:
+                events[-1] = (section, events[-1][1] + char)
+            else:
+                events.append((section, char))
+        return events
+
+    def _end_reasoning(self) -> None:
+        self._in_reasoning = False
+        logger.debug("AI reasoning: %s", self.reasoning[:50])
+
+    def result(self) -> AITexts:
+        if self._in_reasoning:
+            # The completion ended on the reasoning line
+            self._end_reasoning()
+        paragraphs = [p.strip() for p in self._paragraphs]
+        description: Optional[str] = paragraphs[0] if paragraphs else None
+        commercial_text: Optional[str] = paragraphs[1] if len(paragraphs) > 1 else None
+        return description, commercial_text
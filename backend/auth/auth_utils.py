@@ -17,10 +17,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: int = 12) -> str:
     return bcrypt.hashpw(
         password.encode('utf-8'),
-        bcrypt.gensalt()
+        bcrypt.gensalt(rounds)
     ).decode('utf-8')
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
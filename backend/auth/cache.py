@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from config import settings
+
+REDIS_PREFIX = "auth:token:"
+REDIS_USER_PREFIX = "auth:user:"
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Detached copy of the fields request handlers read from the current user."""
+    id: str
+    email: str
+    is_active: bool
+
+class TokenCache:
+    """Verified-token cache: an in-process LRU with TTL, optionally backed by Redis.
+
+    Entries never outlive the token's own expiry. The Redis tier lets uvicorn workers share
+    verifications; the local TTL bounds how long another worker can serve a revoked user.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, redis_url: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._keys_by_email: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._redis = aioredis.from_url(redis_url) if redis_url else None
+
+    async def get(self, token: str) -> Optional[UserSnapshot]:
+        key = _token_key(token)
+        snapshot = self._get_local(key)
+        if snapshot is not None or self._redis is None:
+            return snapshot
+        try:
+            raw = await self._redis.get(REDIS_PREFIX + key)
+        except RedisError:
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        snapshot = UserSnapshot(**data["user"])
+        self._set_local(key, snapshot, data["expires_at"])
+        return snapshot
+
+    async def set(self, token: str, snapshot: UserSnapshot, token_expires_at: float) -> None:
+        key = _token_key(token)
+        expires_at = min(time.time() + self.ttl, token_expires_at)
+        if expires_at <= time.time():
+            return
+        self._set_local(key, snapshot, expires_at)
+        if self._redis is None:
+            return
+        ttl = max(int(expires_at - time.time()), 1)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.set(REDIS_PREFIX + key, json.dumps({"user": asdict(snapshot), "expires_at": expires_at}), ex=ttl)
+                pipe.sadd(REDIS_USER_PREFIX + snapshot.email, key)
+                pipe.expire(REDIS_USER_PREFIX + snapshot.email, self.ttl)
+                await pipe.execute()
+        except RedisError:
+            pass
+
+    async def invalidate_user(self, email: str) -> None:
+        with self._lock:
+            for key in self._keys_by_email.pop(email, set()):
+                self._entries.pop(key, None)
+        if self._redis is None:
+            return
+        try:
+            keys = await self._redis.smembers(REDIS_USER_PREFIX + email)
+            await self._redis.delete(REDIS_USER_PREFIX + email, *(REDIS_PREFIX + k.decode() for k in keys))
+        except RedisError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_email.clear()
+
+    def _get_local(self, key: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def _set_local(self, key: str, snapshot: UserSnapshot, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, snapshot)
+            self._entries.move_to_end(key)
+            self._keys_by_email.setdefault(snapshot.email, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        _, snapshot = self._entries.pop(key)
+        keys = self._keys_by_email.get(snapshot.email)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_email[snapshot.email]
+
+def _token_key(token: str) -> str:
+    # Raw tokens are never stored as keys
+    return hashlib.sha256(token.encode()).hexdigest()
+
+token_cache = TokenCache(
+    maxsize=settings.auth_cache_size,
+    ttl=settings.auth_cache_ttl_seconds,
+    redis_url=settings.redis_url if settings.auth_cache_redis else None,
+)
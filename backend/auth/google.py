@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from jose import jwt, JWTError
+
+from config import settings
+
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+DEFAULT_JWKS_MAX_AGE = 3600
+USERINFO_CACHE_SIZE = 10000
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens locally against cached JWKS, with a userinfo fallback.
+
+    One pooled AsyncClient is shared for every outbound call. Signing keys are kept for as
+    long as Google's Cache-Control allows and refetched when an unknown ``kid`` shows up (key
+    rotation), at most once per ``jwks_min_refresh`` seconds so arbitrary tokens can't turn
+    logins into outbound fetches. Concurrent refreshes share one request. Successful userinfo
+    lookups are memoized for a short TTL.
+    """
+
+    def __init__(self, client_id: str, certs_url: str, userinfo_url: str, userinfo_ttl: int, jwks_min_refresh: float):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.userinfo_url = userinfo_url
+        self.userinfo_ttl = userinfo_ttl
+        self.jwks_min_refresh = jwks_min_refresh
+        self._client: Optional[httpx.AsyncClient] = None
+        self._jwks: List[Dict[str, Any]] = []
+        self._jwks_expires_at = 0.0
+        self._jwks_fetched_at = float("-inf")
+        self._jwks_refresh: Optional[asyncio.Future] = None
+        self._userinfo: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(5.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def verify_id_token(self, token: str) -> Optional[str]:
+        """Returns the email of a valid ID token, or None when the token is not a valid ID token."""
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError:
+            # Opaque access tokens are not JWTs
+            return None
+        key = await self._get_key(kid)
+        if key is None:
+            return None
+        try:
+            claims = jwt.decode(
+                token, key, algorithms=["RS256"], audience=self.client_id, issuer=GOOGLE_ISSUERS,
+                options={"verify_at_hash": False},
+            )
+        except JWTError:
+            return None
+        return claims.get("email")
+
+    async def fetch_userinfo_email(self, access_token: str) -> Optional[str]:
+        cache_key = hashlib.sha256(access_token.encode()).hexdigest()
+        cached = self._userinfo.get(cache_key)
+        if cached is not None and cached[0] > time.time():
+            return cached[1]
+
+        response = await self.client.get(self.userinfo_url, headers={"Authorization": f"Bearer {access_token}"})
+        if response.status_code != 200:
+            return None
+        email = response.json().get("email")
+        if email:
+            self._userinfo[cache_key] = (time.time() + self.userinfo_ttl, email)
+            self._userinfo.move_to_end(cache_key)
+            while len(self._userinfo) > USERINFO_CACHE_SIZE:
+                self._userinfo.popitem(last=False)
+        return email
+
+    async def _get_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        if time.time() >= self._jwks_expires_at:
+            await self._refresh_jwks()
+        key = self._find_key(kid)
+        if key is None and time.monotonic() - self._jwks_fetched_at >= self.jwks_min_refresh:
+            await self._refresh_jwks()
+            key = self._find_key(kid)
+        return key
+
+    def _find_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        return next((k for k in self._jwks if k.get("kid") == kid), None)
+
+    async def _refresh_jwks(self) -> None:
+        # Single flight: callers arriving while a fetch is running wait for that one. Shielded,
+        # so a caller that gives up doesn't cancel the fetch for everyone else.
+        if self._jwks_refresh is None:
+            self._jwks_refresh = asyncio.ensure_future(self._fetch_jwks())
+            self._jwks_refresh.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._jwks_refresh)
+
+    def _refresh_done(self, future: asyncio.Future) -> None:
+        self._jwks_refresh = None
+        if not future.cancelled():
+            # Retrieved here so a failure nobody awaited anymore isn't reported as unhandled
+            future.exception()
+
+    async def _fetch_jwks(self) -> None:
+        # Counted from the attempt, so failing fetches are rate-limited as well
+        self._jwks_fetched_at = time.monotonic()
+        response = await self.client.get(self.certs_url)
+        response.raise_for_status()
+        self._jwks = response.json().get("keys", [])
+        self._jwks_expires_at = time.time() + _max_age(response.headers.get("cache-control"))
+
+def _max_age(cache_control: Optional[str]) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_JWKS_MAX_AGE
+
+google_verifier = GoogleTokenVerifier(
+    client_id=settings.google_client_id,
+    certs_url=settings.google_certs_url,
+    userinfo_url=settings.google_userinfo_url,
+    userinfo_ttl=settings.google_userinfo_ttl_seconds,
+    jwks_min_refresh=settings.google_jwks_min_refresh_seconds,
+)
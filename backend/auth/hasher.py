@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from config import settings
+from exceptions import ServiceBusyException
+from . import auth_utils
+
+T = TypeVar("T")
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so threads give real parallelism without touching Starlette's
+    shared threadpool. Once ``max_pending`` operations are queued or running, new ones are
+    rejected with a 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def hash(self, password: str) -> str:
+        return await self._run(auth_utils.get_password_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(auth_utils.verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # "$2b$12$..." -> cost 12
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        # Only touched from the event loop, so a plain counter is enough
+        if self._pending >= self.max_pending:
+            raise ServiceBusyException("Too many concurrent password operations, please retry shortly")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+password_hasher = PasswordHasher(
+    rounds=settings.bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 import models
@@ -21,3 +23,40 @@ class AuthRepository:
         except SQLAlchemyError as e:
             self.db.rollback()
             raise DatabaseException("Failed to create user", details=str(e))
+
+class AsyncAuthRepository:
+    """AsyncSession counterpart of AuthRepository used by the API routes."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_by_email(self, email: str) -> Optional[models.User]:
+        return await self.db.scalar(select(models.User).where(models.User.email == email))
+
+    async def create_user(self, email: str, hashed_password: str) -> models.User:
+        try:
+            db_user = models.User(email=email, hashed_password=hashed_password)
+            self.db.add(db_user)
+            await self.db.commit()
+            return db_user
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to create user", details=str(e))
+
+    async def update_password_hash(self, user: models.User, hashed_password: str) -> models.User:
+        try:
+            user.hashed_password = hashed_password
+            await self.db.commit()
+            return user
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to update user", details=str(e))
+
+    async def set_user_active(self, user: models.User, is_active: bool) -> models.User:
+        try:
+            user.is_active = is_active
+            await self.db.commit()
+            return user
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to update user", details=str(e))
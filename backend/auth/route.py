@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-import models, schemas
-from database import get_db
-from exceptions import AuthException
-from .repo import AuthRepository
+import schemas
+from config import settings
+from database import get_async_db, AsyncSessionLocal
+from exceptions import AuthException, ForbiddenException
+from .cache import UserSnapshot, token_cache
+from .repo import AsyncAuthRepository
 from .service import AuthService
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -14,8 +16,8 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 COOKIE_NAME = "access_token"
 COOKIE_MAX_AGE = 60 * 60 * 24 * 7  # 7 days
 
-def get_auth_service(db: Session = Depends(get_db)):
-    repository = AuthRepository(db)
+def get_auth_service(db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncAuthRepository(db)
     return AuthService(repository)
 
 def _set_auth_cookie(response: Response, token: str):
@@ -29,32 +31,47 @@ def _set_auth_cookie(response: Response, token: str):
         path="/",
     )
 
-async def get_current_user(request: Request, auth_service: AuthService = Depends(get_auth_service)):
+async def get_current_user(request: Request) -> UserSnapshot:
     token = request.cookies.get(COOKIE_NAME)
     if not token:
         raise AuthException("Not authenticated")
-    return auth_service.verify_token(token)
+    # Cache hits skip both the JWT signature check and the DB session
+    snapshot = await token_cache.get(token)
+    if snapshot is None:
+        async with AsyncSessionLocal() as db:
+            snapshot, expires_at = await AuthService(AsyncAuthRepository(db)).verify_token_snapshot(token)
+        await token_cache.set(token, snapshot, expires_at)
+    return snapshot
+
+async def get_current_admin(current_user: UserSnapshot = Depends(get_current_user)):
+    if current_user.email not in settings.admin_emails:
+        raise ForbiddenException()
+    return current_user
 
 @router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, auth_service: AuthService = Depends(get_auth_service)):
-    return auth_service.register_user(user)
+async def register(user: schemas.UserCreate, auth_service: AuthService = Depends(get_auth_service)):
+    return await auth_service.register_user(user)
 
 @router.post("/token")
-def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), auth_service: AuthService = Depends(get_auth_service)):
-    user = auth_service.authenticate_user(form_data.username, form_data.password)
+async def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), auth_service: AuthService = Depends(get_auth_service)):
+    user = await auth_service.authenticate_user(form_data.username, form_data.password)
     access_token = auth_service.create_access_token(user.email)
     _set_auth_cookie(response, access_token)
     return {"status": "ok"}
 
 @router.get("/me", response_model=schemas.User)
-def me(current_user: models.User = Depends(get_current_user)):
+async def me(current_user: UserSnapshot = Depends(get_current_user)):
     return current_user
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(response: Response):
     response.delete_cookie(key=COOKIE_NAME, path="/")
     return {"status": "ok"}
 
+@router.post("/admin/users/{email}/deactivate", response_model=schemas.User)
+async def deactivate_user(email: str, current_user: UserSnapshot = Depends(get_current_admin), auth_service: AuthService = Depends(get_auth_service)):
+    return await auth_service.deactivate_user(email)
+
 class GoogleAuthRequest(BaseModel):
     token: str
 
@@ -1,23 +1,26 @@
 from datetime import timedelta
-import httpx
+from typing import Tuple
 from jose import jwt, JWTError
-from google.oauth2 import id_token
-from google.auth.transport import requests
-from config import settings
 import schemas
-from exceptions import AuthException, AlreadyExistsException, AppException, DatabaseException
-from .repo import AuthRepository
+from exceptions import AuthException, AlreadyExistsException, AppException, DatabaseException, UserNotFoundException
+from .cache import UserSnapshot, token_cache
+from .google import google_verifier
+from .hasher import password_hasher
+from .repo import AsyncAuthRepository
 from . import auth_utils
 import models
 
 class AuthService:
-    def __init__(self, repository: AuthRepository):
+    def __init__(self, repository: AsyncAuthRepository):
         self.repository = repository
 
-    def authenticate_user(self, email: str, password: str):
-        user = self.repository.get_user_by_email(email)
-        if not user or not auth_utils.verify_password(password, user.hashed_password):
+    async def authenticate_user(self, email: str, password: str):
+        user = await self.repository.get_user_by_email(email)
+        if not user or not await password_hasher.verify(password, user.hashed_password):
             raise AuthException("Incorrect username or password")
+        # The plain password is only available here, so upgrade hashes made with an old cost now
+        if password_hasher.needs_rehash(user.hashed_password):
+            await self.repository.update_password_hash(user, await password_hasher.hash(password))
         return user
 
     def create_access_token(self, email: str):
@@ -26,19 +29,19 @@ class AuthService:
             data={"sub": email}, expires_delta=access_token_expires
         )
 
-    def register_user(self, user_data: schemas.UserCreate):
-        if self.repository.get_user_by_email(user_data.email):
+    async def register_user(self, user_data: schemas.UserCreate):
+        if await self.repository.get_user_by_email(user_data.email):
             raise AlreadyExistsException("Email already registered")
-        hashed_password = auth_utils.get_password_hash(user_data.password)
-        return self.repository.create_user(user_data.email, hashed_password)
+        hashed_password = await password_hasher.hash(user_data.password)
+        return await self.repository.create_user(user_data.email, hashed_password)
 
-    def get_user_by_email(self, email: str):
-        return self.repository.get_user_by_email(email)
+    async def get_user_by_email(self, email: str):
+        return await self.repository.get_user_by_email(email)
 
-    def create_google_user(self, email: str):
-        return self.repository.create_user(email, "")
+    async def create_google_user(self, email: str):
+        return await self.repository.create_user(email, "")
 
-    def verify_token(self, token: str) -> models.User:
+    async def verify_token(self, token: str) -> models.User:
         try:
             payload = jwt.decode(token, auth_utils.SECRET_KEY, algorithms=[auth_utils.ALGORITHM])
             email: str = payload.get("sub")
@@ -47,36 +50,45 @@ class AuthService:
         except JWTError:
             raise AuthException("Could not validate credentials")
         
-        user = self.get_user_by_email(email=email)
+        user = await self.get_user_by_email(email=email)
         if user is None:
             raise AuthException("User not found")
+        if not user.is_active:
+            raise AuthException("Inactive user")
+        return user
+
+    async def verify_token_snapshot(self, token: str) -> Tuple[UserSnapshot, float]:
+        """Verifies the token and returns a detached user snapshot plus the token expiry."""
+        user = await self.verify_token(token)
+        expires_at = float(jwt.get_unverified_claims(token)["exp"])
+        return UserSnapshot(id=user.id, email=user.email, is_active=user.is_active), expires_at
+
+    async def deactivate_user(self, email: str) -> models.User:
+        user = await self.get_user_by_email(email)
+        if user is None:
+            raise UserNotFoundException(email)
+        user = await self.repository.set_user_active(user, False)
+        # Cached verifications would otherwise keep the user signed in until they expire
+        await token_cache.invalidate_user(email)
         return user
 
     async def authenticate_google(self, token: str) -> models.User:
-        # 1. Try ID Token Verification first
+        # 1. Try ID Token Verification first (locally, against cached Google signing keys)
         try:
-            idinfo = id_token.verify_oauth2_token(
-                token, requests.Request(), settings.google_client_id
-            )
-            email = idinfo.get("email")
+            email = await google_verifier.verify_id_token(token)
             if email:
                 return await self._get_or_create_google_user(email)
+        except (AuthException, DatabaseException, AlreadyExistsException):
+            raise
         except Exception:
-            # Not an ID Token or verification failed, proceed to Access Token fallback
+            # Verification failed (e.g. JWKS fetch error), proceed to Access Token fallback
             pass
 
         # 2. Fallback: Access Token verification (Userinfo endpoint)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://www.googleapis.com/oauth2/v3/userinfo",
-                    headers={"Authorization": f"Bearer {token}"}
-                )
-                if response.status_code == 200:
-                    user_data = response.json()
-                    email = user_data.get("email")
-                    if email:
-                        return await self._get_or_create_google_user(email)
+            email = await google_verifier.fetch_userinfo_email(token)
+            if email:
+                return await self._get_or_create_google_user(email)
         except (AuthException, DatabaseException, AlreadyExistsException):
             # Re-raise our own known exceptions directly
             raise
@@ -87,8 +99,8 @@ class AuthService:
         raise AuthException("Invalid Google token")
 
     async def _get_or_create_google_user(self, email: str) -> models.User:
-        user = self.get_user_by_email(email=email)
+        user = await self.get_user_by_email(email=email)
         if not user:
             # This is where 'create_user' might raise a DatabaseException
-            user = self.create_google_user(email)
+            user = await self.create_google_user(email)
         return user
@@ -1,13 +1,83 @@
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     google_client_id: str = ""
+    google_certs_url: str = "https://www.googleapis.com/oauth2/v3/certs"
+    google_userinfo_url: str = "https://www.googleapis.com/oauth2/v3/userinfo"
+    google_userinfo_ttl_seconds: int = 60
+    google_jwks_min_refresh_seconds: int = 60
     openai_api_key: str = ""
     redis_url: str = "redis://redis:6379/0"
     secret_key: str = "supersecretkey"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 43200
 
+    # Auth
+    admin_emails: List[str] = []
+    auth_cache_size: int = 10000
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_redis: bool = False
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
+
+    # Uploads
+    upload_chunk_size: int = 1024 * 1024
+    max_upload_size_mb: int = 2048
+    # Multipart sessions with no new part for this long are removed, parts and all
+    multipart_upload_ttl_hours: int = 24
+    multipart_expiry_interval_seconds: int = 3600
+
+    # Mesh analysis
+    streaming_analysis_threshold_mb: int = 256
+    mesh_analysis_workers: int = 4
+    mesh_analysis_chunk_faces: int = 2_000_000
+    overhang_angle_deg: float = 45.0
+    topology_max_faces: int = 10_000_000
+    # Viewer LOD grid resolutions; 65535 matches the 16-bit quantization, i.e. full detail
+    lod_resolutions: List[int] = [64, 256, 1024, 65535]
+    lod_max_faces: int = 2_000_000
+    thumbnail_size: int = 256
+    thumbnail_max_faces: int = 2_000_000
+
+    # Worker: files at least this large go to the mesh_large queue so they never block small ones
+    mesh_large_file_mb: int = 100
+    # The soft limit marks the project as errored; the hard limit kills a task that ignores it
+    mesh_task_soft_time_limit_seconds: int = 1800
+    mesh_task_time_limit_seconds: int = 1860
+    thumbnail_task_soft_time_limit_seconds: int = 120
+    thumbnail_task_time_limit_seconds: int = 150
+
+    # Pricing
+    quote_matrix_max_rows: int = 100_000
+    requote_batch_size: int = 1000
+    params_flush_interval_seconds: float = 2.0
+    params_buffer_idle_seconds: float = 60.0
+    # A claimed but never flushed version (its API process died) stops blocking patches after this
+    params_claim_timeout_seconds: float = 30.0
+    # How long a patch waits for another API process to flush the version it was made against
+    params_flush_wait_seconds: float = 5.0
+
+    # AI
+    ai_model: str = "gpt-4o"
+    openai_base_url: str = ""
+    ai_cache_ttl_seconds: int = 7 * 24 * 3600
+    ai_lock_ttl_seconds: int = 60
+    ai_batch_concurrency: int = 8
+    ai_batch_rate_per_second: float = 5.0
+    ai_batch_max_retries: int = 4
+    ai_batch_backoff_seconds: float = 1.0
+
+    # Database (empty database_url keeps the bundled SQLite file)
+    database_url: str = ""
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 settings = Settings()
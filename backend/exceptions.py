@@ -62,3 +62,127 @@ class AlreadyExistsException(AppException):
             status_code=400,
             error_code="already_exists"
         )
+
+class FileTooLargeException(AppException):
+    """Raised when an uploaded file exceeds the configured size limit."""
+    def __init__(self, max_size: int):
+        super().__init__(
+            message=f"File exceeds the maximum upload size of {max_size} bytes",
+            status_code=413,
+            error_code="file_too_large"
+        )
+
+class UploadNotFoundException(AppException):
+    """Raised when a multipart upload session does not exist."""
+    def __init__(self, upload_id: str):
+        super().__init__(
+            message=f"Upload with ID {upload_id} not found",
+            status_code=404,
+            error_code="upload_not_found"
+        )
+
+class InvalidUploadException(AppException):
+    """Raised when a multipart upload cannot be completed as requested."""
+    def __init__(self, message: str, details: Optional[Any] = None):
+        super().__init__(
+            message=message,
+            status_code=400,
+            error_code="invalid_upload",
+            details=details
+        )
+
+class ProjectNotReadyException(AppException):
+    """Raised when an operation needs analyzed geometry the project does not have yet."""
+    def __init__(self, project_id: str):
+        super().__init__(
+            message=f"Project with ID {project_id} has no analyzed model yet",
+            status_code=409,
+            error_code="project_not_ready"
+        )
+
+class InvalidQuoteException(AppException):
+    """Raised when quote parameters cannot be evaluated."""
+    def __init__(self, message: str, details: Optional[Any] = None):
+        super().__init__(
+            message=message,
+            status_code=400,
+            error_code="invalid_quote",
+            details=details
+        )
+
+class ForbiddenException(AppException):
+    """Raised when an authenticated user lacks permission for an operation."""
+    def __init__(self, message: str = "Not enough permissions"):
+        super().__init__(
+            message=message,
+            status_code=403,
+            error_code="forbidden"
+        )
+
+class InvalidCursorException(AppException):
+    """Raised when a pagination cursor cannot be decoded."""
+    def __init__(self):
+        super().__init__(
+            message="Invalid pagination cursor",
+            status_code=400,
+            error_code="invalid_cursor"
+        )
+
+class ServiceBusyException(AppException):
+    """Raised when a bounded worker pool is saturated and the request should be retried."""
+    def __init__(self, message: str = "Service is busy, please retry shortly"):
+        super().__init__(
+            message=message,
+            status_code=503,
+            error_code="service_busy"
+        )
+
+class VersionConflictException(AppException):
+    """Raised when an update was based on an outdated version of the resource."""
+    def __init__(self, current_version: int):
+        super().__init__(
+            message="Resource was modified by another request",
+            status_code=409,
+            error_code="version_conflict",
+            details={"current_version": current_version}
+        )
+
+class ThumbnailNotReadyException(AppException):
+    """Raised when a project's thumbnail has not been rendered yet."""
+    def __init__(self, project_id: str):
+        super().__init__(
+            message=f"Thumbnail for project {project_id} is not ready",
+            status_code=404,
+            error_code="thumbnail_not_ready",
+            details={"project_id": project_id}
+        )
+
+class StoredFileNotFoundException(AppException):
+    """Raised when a requested uploaded file does not exist."""
+    def __init__(self, path: str):
+        super().__init__(
+            message=f"File {path} not found",
+            status_code=404,
+            error_code="file_not_found",
+            details={"path": path}
+        )
+
+class TaskNotFoundException(AppException):
+    """Raised when a background task does not exist or belongs to someone else."""
+    def __init__(self, task_id: str):
+        super().__init__(
+            message=f"Task with ID {task_id} not found",
+            status_code=404,
+            error_code="task_not_found",
+            details={"task_id": task_id}
+        )
+
+class UserNotFoundException(AppException):
+    """Raised when an admin action targets a user that does not exist."""
+    def __init__(self, email: str):
+        super().__init__(
+            message=f"User {email} not found",
+            status_code=404,
+            error_code="user_not_found",
+            details={"email": email}
+        )
@@ -1,22 +1,41 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 import models
-from database import engine
+from database import SessionLocal, engine, async_engine, pool_metrics, upgrade_schema
 import constants
 from auth import route as auth_route
-from projects import route as project_route
+from auth.cache import UserSnapshot
+from auth.google import google_verifier
+from projects import delivery, route as project_route
+from projects.repo import ProjectRepository
+from projects.events import event_hub
 
 from error_handlers import register_handlers
 
-# Create SQLite tables
-models.Base.metadata.create_all(bind=engine)
+# Create missing tables and add columns and indexes introduced since the database was created
+added_columns = upgrade_schema(engine, models.Base.metadata)
+if ("projects", "params_version") in added_columns:
+    # Databases from before versioned params hold PUT bodies instead of the editor state
+    with SessionLocal() as db:
+        ProjectRepository(db).unnest_saved_params()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    project_route.params_buffer.start()
+    yield
+    # Flush buffered autosaves before the DB engine goes away
+    await project_route.params_buffer.stop()
+    await event_hub.stop()
+    await google_verifier.aclose()
+    await async_engine.dispose()
 
 app = FastAPI(
+    lifespan=lifespan,
     title=constants.TITLE,
     description=constants.DESCRIPTION,
     version=constants.VERSION,
@@ -40,10 +59,15 @@ app.add_middleware(
 app.include_router(auth_route.router)
 app.include_router(project_route.router)
 
-# Serve uploaded model files
+# Serve uploaded model files with validators, ranges and precompressed variants
 os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.include_router(delivery.router)
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": constants.ROOT_MESSAGE}
+
+@app.get("/health/db")
+def read_db_health(current_user: UserSnapshot = Depends(auth_route.get_current_admin)):
+    # Pool sizes and connection counts are operational detail, so only admins see them
+    return pool_metrics()
@@ -0,0 +1,249 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import trimesh
+
+from .streaming import ProgressCallback, iter_ascii_stl_triangles, iter_obj_triangles
+from .topology import mesh_topology
+
+# Binary STL: 80-byte header, uint32 triangle count, then packed 50-byte records
+STL_HEADER_SIZE = 80
+STL_TRIANGLE_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+
+# Faces converted to float64 at a time; keeps temporaries around ~20 MB
+BLOCK_FACES = 262144
+
+# Faces whose centroid is this close to the build plate rest on it and need no support (mm)
+BUILD_PLATE_TOLERANCE = 0.01
+
+@dataclass
+class AnalysisOptions:
+    streaming_threshold: Optional[int] = None
+    workers: int = 1
+    chunk_faces: int = 2_000_000
+    overhang_angle: float = 45.0
+    topology_max_faces: int = 10_000_000
+
+@dataclass
+class MeshStats:
+    poly_count: int
+    volume_mm3: float
+    dim_x: float
+    dim_y: float
+    dim_z: float
+    surface_area_mm2: Optional[float] = None
+    overhang_area_mm2: Optional[float] = None
+    support_volume_mm3: Optional[float] = None
+    is_watertight: Optional[bool] = None
+    shell_count: Optional[int] = None
+    # Viewer LOD files, filled in by the worker after analysis
+    preview_assets: Optional[list] = None
+
+class MeshAccumulator:
+    """Reduces face count, signed volume, AABB, area and overhang metrics over blocks of triangles.
+
+    Overhang metrics need the build plate height up front and are skipped without it.
+    """
+
+    def __init__(self, build_plate_z: Optional[float] = None, overhang_angle: float = 45.0):
+        self.build_plate_z = build_plate_z
+        # A downward face needs support once it tilts more than overhang_angle away from vertical
+        self.overhang_sin = float(np.sin(np.radians(overhang_angle)))
+        self.faces = 0
+        self.volume = 0.0
+        self.area = 0.0
+        self.overhang_area = 0.0
+        self.support_volume = 0.0
+        self.lower = np.full(3, np.inf)
+        self.upper = np.full(3, -np.inf)
+
+    def add(self, triangles: np.ndarray) -> None:
+        if len(triangles) == 0:
+            return
+        tri = np.asarray(triangles, dtype=np.float64)
+        # Unnormalized normals; their length is twice the face area
+        normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        double_area = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+        # Sum of signed tetrahedra against the origin: v0 . (v1 x v2) / 6 == v0 . n / 6
+        self.volume += float(np.einsum("ij,ij->", tri[:, 0], normals)) / 6.0
+        self.area += float(double_area.sum()) / 2.0
+
+        if self.build_plate_z is not None:
+            heights = tri[:, :, 2].mean(axis=1) - self.build_plate_z
+            overhang = (-normals[:, 2] > self.overhang_sin * double_area) & (heights > BUILD_PLATE_TOLERANCE)
+            self.overhang_area += float(double_area[overhang].sum()) / 2.0
+            # Support column under each overhang face: projected XY area times height above the plate
+            self.support_volume += float(np.dot(-normals[overhang, 2], heights[overhang])) / 2.0
+
+        points = tri.reshape(-1, 3)
+        self.lower = np.minimum(self.lower, points.min(axis=0))
+        self.upper = np.maximum(self.upper, points.max(axis=0))
+        self.faces += len(tri)
+
+    def merge(self, other: "MeshAccumulator") -> None:
+        self.faces += other.faces
+        self.volume += other.volume
+        self.area += other.area
+        self.overhang_area += other.overhang_area
+        self.support_volume += other.support_volume
+        self.lower = np.minimum(self.lower, other.lower)
+        self.upper = np.maximum(self.upper, other.upper)
+
+    def result(self) -> MeshStats:
+        extents = self.upper - self.lower if self.faces else np.zeros(3)
+        has_overhangs = self.build_plate_z is not None
+        return MeshStats(
+            poly_count=self.faces,
+            volume_mm3=self.volume,
+            dim_x=float(extents[0]),
+            dim_y=float(extents[1]),
+            dim_z=float(extents[2]),
+            surface_area_mm2=self.area,
+            overhang_area_mm2=self.overhang_area if has_overhangs else None,
+            support_volume_mm3=self.support_volume if has_overhangs else None,
+        )
+
+def analyze_mesh(file_path: str, options: AnalysisOptions = AnalysisOptions(), progress: Optional[ProgressCallback] = None) -> MeshStats:
+    """Picks the cheapest analyzer for the file.
+
+    Binary STL files with more than ``chunk_faces`` faces are split into face ranges and
+    reduced across ``workers`` processes. ASCII STL and OBJ files of at least
+    ``streaming_threshold`` bytes are parsed out-of-core in batches instead of being
+    loaded whole by trimesh; that mode cannot see the whole mesh, so it reports no
+    overhang or topology metrics.
+    """
+    if is_binary_stl(file_path):
+        if options.workers > 1 and stl_face_count(file_path) > options.chunk_faces:
+            return analyze_binary_stl_parallel(file_path, options, progress)
+        return analyze_binary_stl(file_path, options, progress)
+    if options.streaming_threshold is not None and os.path.getsize(file_path) >= options.streaming_threshold:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".stl":
+            return analyze_streaming(iter_ascii_stl_triangles(file_path, BLOCK_FACES, progress))
+        if extension == ".obj":
+            return analyze_streaming(iter_obj_triangles(file_path, BLOCK_FACES, progress))
+    return analyze_with_trimesh(file_path, options)
+
+def iter_triangle_blocks(file_path: str, options: AnalysisOptions = AnalysisOptions()) -> Iterator[np.ndarray]:
+    """Yields the mesh as (<= BLOCK_FACES, 3, 3) triangle arrays, reading it the way analyze_mesh does."""
+    if is_binary_stl(file_path):
+        triangles = load_binary_stl(file_path)
+        for start in range(0, len(triangles), BLOCK_FACES):
+            yield triangles[start:start + BLOCK_FACES]
+        return
+    if options.streaming_threshold is not None and os.path.getsize(file_path) >= options.streaming_threshold:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".stl":
+            yield from iter_ascii_stl_triangles(file_path, BLOCK_FACES)
+            return
+        if extension == ".obj":
+            yield from iter_obj_triangles(file_path, BLOCK_FACES)
+            return
+    triangles = trimesh.load(file_path, force='mesh').triangles
+    for start in range(0, len(triangles), BLOCK_FACES):
+        yield triangles[start:start + BLOCK_FACES]
+
+def is_binary_stl(file_path: str) -> bool:
+    if not file_path.lower().endswith(".stl"):
+        return False
+    size = os.path.getsize(file_path)
+    if size < STL_HEADER_SIZE + 4:
+        return False
+    # ASCII files can start with "solid" too, so trust the size rather than the header
+    return size == STL_HEADER_SIZE + 4 + stl_face_count(file_path) * STL_TRIANGLE_DTYPE.itemsize
+
+def stl_face_count(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        f.seek(STL_HEADER_SIZE)
+        return int.from_bytes(f.read(4), "little")
+
+def load_binary_stl(file_path: str) -> np.ndarray:
+    """Returns an (n, 3, 3) float32 view of the triangles, memory-mapped without copying."""
+    count = stl_face_count(file_path)
+    if count == 0:
+        return np.empty((0, 3, 3), dtype=np.float32)
+    records = np.memmap(file_path, dtype=STL_TRIANGLE_DTYPE, mode="r", offset=STL_HEADER_SIZE + 4, shape=(count,))
+    return records["vertices"]
+
+def analyze_binary_stl(file_path: str, options: AnalysisOptions = AnalysisOptions(), progress: Optional[ProgressCallback] = None) -> MeshStats:
+    triangles = load_binary_stl(file_path)
+    accumulator = MeshAccumulator(_min_z(triangles), options.overhang_angle)
+    for start in range(0, len(triangles), BLOCK_FACES):
+        accumulator.add(triangles[start:start + BLOCK_FACES])
+        if progress is not None:
+            progress(min(start + BLOCK_FACES, len(triangles)) / len(triangles))
+    return _with_topology(accumulator.result(), triangles, options)
+
+def analyze_binary_stl_parallel(file_path: str, options: AnalysisOptions, progress: Optional[ProgressCallback] = None) -> MeshStats:
+    # Each worker maps the file itself and receives only a face range, so no triangle data is pickled
+    triangles = load_binary_stl(file_path)
+    count = len(triangles)
+    build_plate_z = _min_z(triangles)
+    ranges = [(start, min(start + options.chunk_faces, count)) for start in range(0, count, options.chunk_faces)]
+    try:
+        with ProcessPoolExecutor(max_workers=options.workers) as pool:
+            stats = _reduce_ranges(pool, file_path, ranges, count, build_plate_z, options, progress)
+    except (AssertionError, OSError) as e:
+        # Daemonic pool processes (e.g. some Celery pools) cannot fork children; NumPy releases
+        # the GIL in the heavy kernels, so threads still spread the work across cores
+        print(f"Process pool unavailable ({e}), analyzing {file_path} with threads")
+        with ThreadPoolExecutor(max_workers=options.workers) as pool:
+            stats = _reduce_ranges(pool, file_path, ranges, count, build_plate_z, options, progress)
+    return _with_topology(stats, triangles, options)
+
+def _reduce_ranges(pool: Executor, file_path: str, ranges, count: int, build_plate_z: float, options: AnalysisOptions, progress: Optional[ProgressCallback]) -> MeshStats:
+    total = MeshAccumulator(build_plate_z, options.overhang_angle)
+    done = 0
+    futures = {
+        pool.submit(_analyze_stl_range, file_path, start, stop, build_plate_z, options.overhang_angle): stop - start
+        for start, stop in ranges
+    }
+    for future in as_completed(futures):
+        total.merge(future.result())
+        done += futures[future]
+        if progress is not None:
+            progress(done / count)
+    return total.result()
+
+def _analyze_stl_range(file_path: str, start: int, stop: int, build_plate_z: float, overhang_angle: float) -> MeshAccumulator:
+    triangles = load_binary_stl(file_path)
+    accumulator = MeshAccumulator(build_plate_z, overhang_angle)
+    for block_start in range(start, stop, BLOCK_FACES):
+        accumulator.add(triangles[block_start:min(block_start + BLOCK_FACES, stop)])
+    return accumulator
+
+def analyze_streaming(batches: Iterable[np.ndarray]) -> MeshStats:
+    accumulator = MeshAccumulator()
+    for triangles in batches:
+        accumulator.add(triangles)
+    return accumulator.result()
+
+def analyze_with_trimesh(file_path: str, options: AnalysisOptions = AnalysisOptions()) -> MeshStats:
+    mesh = trimesh.load(file_path, force='mesh')
+    triangles = mesh.triangles
+    accumulator = MeshAccumulator(float(mesh.bounds[0][2]) if len(triangles) else None, options.overhang_angle)
+    for start in range(0, len(triangles), BLOCK_FACES):
+        accumulator.add(triangles[start:start + BLOCK_FACES])
+    stats = accumulator.result()
+    # trimesh has already welded vertices and built adjacency, so reuse its topology
+    stats.is_watertight = bool(mesh.is_watertight)
+    stats.shell_count = int(mesh.body_count)
+    return stats
+
+def _with_topology(stats: MeshStats, triangles: np.ndarray, options: AnalysisOptions) -> MeshStats:
+    # Welding vertices is the one O(n log n) step, so very large meshes skip it
+    if len(triangles) <= options.topology_max_faces:
+        stats.is_watertight, stats.shell_count = mesh_topology(triangles)
+    return stats
+
+def _min_z(triangles: np.ndarray) -> Optional[float]:
+    if len(triangles) == 0:
+        return None
+    return float(min(triangles[start:start + BLOCK_FACES, :, 2].min() for start in range(0, len(triangles), BLOCK_FACES)))
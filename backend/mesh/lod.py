@@ -0,0 +1,176 @@
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Compact viewer format: header, uint16 quantized positions, then uint16/uint32 triangle indices
+QMESH_MAGIC = b"QMSH"
+QMESH_VERSION = 1
+# magic, version, index byte width, vertex count, face count, origin xyz, step xyz
+QMESH_HEADER = struct.Struct("<4sHHII3f3f")
+QMESH_EXTENSION = ".qmesh"
+QUANTIZATION_STEPS = 65535
+
+# Pending per-block clusters are reduced once they pass this many rows, bounding memory
+REDUCE_ROWS = 4_000_000
+
+class VertexClusterer:
+    """Streaming vertex-clustering decimation onto a uniform grid.
+
+    Every vertex snaps to the cell of a ``resolution``-wide grid over the longest axis; a cell's
+    vertex is the mean of the vertices in it, and faces that collapse inside one cell are
+    dropped. Blocks are reduced independently and merged, so the mesh never has to be resident.
+    Cell ids are taken relative to the first vertex seen, which no other vertex is more than
+    ``resolution`` cells away from.
+    """
+
+    def __init__(self, resolution: int, longest_extent: float):
+        self.resolution = resolution
+        self.cell = max(longest_extent, 1e-9) / resolution
+        # Signed cell offsets from the origin cell fit in [-span, span]
+        self.span = resolution + 2
+        self.base = 2 * self.span + 1
+        self.origin: Optional[np.ndarray] = None
+        self._keys: List[np.ndarray] = []
+        self._sums: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        self._faces: List[np.ndarray] = []
+        self._rows = 0
+
+    def add(self, triangles: np.ndarray) -> None:
+        if len(triangles) == 0:
+            return
+        points = np.asarray(triangles, dtype=np.float64).reshape(-1, 3)
+        if self.origin is None:
+            self.origin = points[0].copy()
+        cells = np.floor((points - self.origin) / self.cell).astype(np.int64) + self.span
+        np.clip(cells, 0, self.base - 1, out=cells)
+        keys = (cells[:, 0] * self.base + cells[:, 1]) * self.base + cells[:, 2]
+
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        self._keys.append(unique_keys)
+        self._sums.append(np.stack([np.bincount(inverse, weights=points[:, axis], minlength=len(unique_keys)) for axis in range(3)], axis=1))
+        self._counts.append(np.bincount(inverse, minlength=len(unique_keys)))
+        self._faces.append(_unique_faces(keys.reshape(-1, 3)))
+        self._rows += len(unique_keys) + len(self._faces[-1])
+        if self._rows > REDUCE_ROWS:
+            self._reduce()
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (vertices float32 (v, 3), faces uint32 (f, 3))."""
+        self._reduce()
+        if not self._keys or len(self._faces[0]) == 0:
+            return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.uint32)
+        keys, sums, counts, faces = self._keys[0], self._sums[0], self._counts[0], self._faces[0]
+        vertices = (sums / counts[:, None]).astype(np.float32)
+        # Drop cells only referenced by collapsed faces and renumber the rest
+        used, indices = np.unique(np.searchsorted(keys, faces), return_inverse=True)
+        return vertices[used], indices.reshape(-1, 3).astype(np.uint32)
+
+    def _reduce(self) -> None:
+        if len(self._keys) <= 1:
+            return
+        keys, inverse = np.unique(np.concatenate(self._keys), return_inverse=True)
+        sums = np.concatenate(self._sums)
+        self._keys = [keys]
+        self._sums = [np.stack([np.bincount(inverse, weights=sums[:, axis], minlength=len(keys)) for axis in range(3)], axis=1)]
+        self._counts = [np.bincount(inverse, weights=np.concatenate(self._counts), minlength=len(keys))]
+        self._faces = [_unique_faces(np.concatenate(self._faces))]
+        self._rows = len(keys) + len(self._faces[0])
+
+def _unique_faces(faces: np.ndarray) -> np.ndarray:
+    """Drops collapsed and duplicate faces; rotations of one face count as duplicates."""
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+    if len(faces) == 0:
+        return faces
+    # Rotate so the smallest id leads, keeping winding (and so the normal) intact
+    shift = np.argmin(faces, axis=1)
+    rows = np.arange(len(faces))[:, None]
+    faces = faces[rows, (shift[:, None] + np.arange(3)) % 3]
+    return np.unique(faces, axis=0)
+
+def plan_levels(resolutions: Iterable[int], poly_count: int, surface_area: float, longest_extent: float, max_faces: int) -> List[int]:
+    """Picks the grid resolutions worth building, coarse to fine.
+
+    A clustered surface keeps roughly two faces per occupied cell, which estimates each
+    level's size up front; levels over ``max_faces`` are skipped. The estimate only bounds
+    memory: it assumes faces are spread evenly over the surface, so a small dense part makes
+    it overshoot. Whether a level actually reduces the mesh is decided once it is built
+    (``reduced_levels``).
+    """
+    levels = []
+    for resolution in sorted(resolutions):
+        cell = max(longest_extent, 1e-9) / resolution
+        if min(poly_count, int(2 * surface_area / (cell * cell))) > max_faces:
+            break
+        levels.append(resolution)
+    return levels
+
+def build_lods(blocks: Iterable[np.ndarray], resolutions: List[int], longest_extent: float) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Decimates the mesh at every resolution in a single pass over its triangle blocks."""
+    clusterers = [VertexClusterer(resolution, longest_extent) for resolution in resolutions]
+    for triangles in blocks:
+        for clusterer in clusterers:
+            clusterer.add(triangles)
+    return {clusterer.resolution: clusterer.result() for clusterer in clusterers}
+
+def reduced_levels(lods: Dict[int, Tuple[np.ndarray, np.ndarray]], poly_count: int) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Keeps the built levels that are smaller than the original mesh.
+
+    The viewer loads the original after the finest preview, so a level with as many faces
+    would only be downloaded twice; it and anything finer are dropped.
+    """
+    kept = {}
+    for resolution in sorted(lods):
+        if len(lods[resolution][1]) >= poly_count:
+            break
+        kept[resolution] = lods[resolution]
+    return kept
+
+def encode_qmesh(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """Serializes an indexed mesh with positions quantized to 16 bits over its bounding box."""
+    if len(vertices):
+        origin = vertices.min(axis=0).astype(np.float64)
+        extent = vertices.max(axis=0) - origin
+    else:
+        origin = extent = np.zeros(3)
+    step = np.where(extent > 0, extent / QUANTIZATION_STEPS, 1.0)
+    quantized = np.rint((vertices - origin) / step).astype("<u2")
+    index_dtype = np.dtype("<u2") if len(vertices) <= 0xFFFF else np.dtype("<u4")
+    header = QMESH_HEADER.pack(QMESH_MAGIC, QMESH_VERSION, index_dtype.itemsize, len(vertices), len(faces), *origin, *step)
+    positions = quantized.tobytes()
+    # Index arrays must start 4-byte aligned for typed-array views on the client
+    padding = b"\0" * (-(len(header) + len(positions)) % 4)
+    return header + positions + padding + faces.astype(index_dtype).tobytes()
+
+def decode_qmesh(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of encode_qmesh: returns (vertices float32 (v, 3), faces (f, 3))."""
+    magic, version, index_bytes, vertex_count, face_count, *params = QMESH_HEADER.unpack_from(data)
+    if magic != QMESH_MAGIC or version != QMESH_VERSION:
+        raise ValueError("Unsupported qmesh data")
+    origin, step = np.array(params[:3], dtype=np.float32), np.array(params[3:], dtype=np.float32)
+    quantized = np.frombuffer(data, dtype="<u2", count=vertex_count * 3, offset=QMESH_HEADER.size).reshape(-1, 3)
+    index_offset = QMESH_HEADER.size + -(-vertex_count * 6 // 4) * 4
+    faces = np.frombuffer(data, dtype=f"<u{index_bytes}", count=face_count * 3, offset=index_offset).reshape(-1, 3)
+    return origin + quantized * step, faces
+
+def write_preview_assets(file_path: str, lods: Dict[int, Tuple[np.ndarray, np.ndarray]]) -> List[dict]:
+    """Writes one .qmesh per level beside the original; returns their descriptions, coarse first."""
+    stem = os.path.splitext(file_path)[0]
+    assets = []
+    for level, resolution in enumerate(sorted(lods)):
+        vertices, faces = lods[resolution]
+        if len(faces) == 0:
+            continue
+        path = f"{stem}.lod{level}{QMESH_EXTENSION}"
+        data = encode_qmesh(vertices, faces)
+        # Write then rename so a concurrent reader never sees a partial file
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+        assets.append({"level": level, "path": path, "faces": int(len(faces)), "vertices": int(len(vertices)), "size": len(data)})
+    return assets
+
+def preview_assets_exist(assets: Optional[List[dict]]) -> bool:
+    return all(os.path.exists(asset["path"]) for asset in assets or ())
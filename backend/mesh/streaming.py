@@ -0,0 +1,96 @@
+import os
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+import numpy as np
+
+ProgressCallback = Callable[[float], None]
+
+def iter_ascii_stl_triangles(file_path: str, batch_faces: int, progress: Optional[ProgressCallback] = None) -> Iterator[np.ndarray]:
+    """Yields (batch_faces, 3, 3) arrays parsed from an ASCII STL without loading the whole file."""
+    with open(file_path, "rb") as f:
+        total = os.fstat(f.fileno()).st_size or 1
+        coords: List[bytes] = []
+        for line in f:
+            line = line.strip()
+            if line.startswith(b"vertex"):
+                coords.append(line[len(b"vertex"):])
+                if len(coords) == batch_faces * 3:
+                    yield _parse_triangles(coords)
+                    coords = []
+                    _report(progress, f, total)
+        if len(coords) >= 3:
+            yield _parse_triangles(coords[:len(coords) - len(coords) % 3])
+        _report(progress, f, total)
+
+def iter_obj_triangles(file_path: str, batch_faces: int, progress: Optional[ProgressCallback] = None) -> Iterator[np.ndarray]:
+    """Yields (batch_faces, 3, 3) arrays from an OBJ, fan-triangulating polygons.
+
+    Faces are streamed in batches; the vertex table itself has to stay resident because
+    faces may reference any earlier vertex, so it is kept compact as float32.
+    """
+    vertices = _GrowableArray(3, np.float32)
+    pending_vertices: List[bytes] = []
+    faces: List[int] = []
+    with open(file_path, "rb") as f:
+        total = os.fstat(f.fileno()).st_size or 1
+        for line in f:
+            if line.startswith(b"v "):
+                pending_vertices.append(line[2:])
+                if len(pending_vertices) >= batch_faces:
+                    vertices.extend(_parse_vertices(pending_vertices))
+                    pending_vertices = []
+            elif line.startswith(b"f "):
+                if pending_vertices:
+                    vertices.extend(_parse_vertices(pending_vertices))
+                    pending_vertices = []
+                _append_face(faces, line, len(vertices))
+                if len(faces) >= batch_faces * 3:
+                    yield vertices.view()[np.asarray(faces, dtype=np.int64)].reshape(-1, 3, 3)
+                    faces = []
+                    _report(progress, f, total)
+        if faces:
+            yield vertices.view()[np.asarray(faces, dtype=np.int64)].reshape(-1, 3, 3)
+        _report(progress, f, total)
+
+def _append_face(faces: List[int], line: bytes, vertex_count: int) -> None:
+    # "f 1/2/3 4//6 -1" -> zero-based vertex indices, negative ones relative to the end
+    indices = []
+    for token in line.split()[1:]:
+        index = int(token.split(b"/", 1)[0])
+        indices.append(index - 1 if index > 0 else vertex_count + index)
+    for i in range(1, len(indices) - 1):
+        faces.extend((indices[0], indices[i], indices[i + 1]))
+
+def _parse_triangles(coords: List[bytes]) -> np.ndarray:
+    return np.array(b" ".join(coords).decode().split(), dtype=np.float64).reshape(-1, 3, 3)
+
+def _parse_vertices(lines: List[bytes]) -> np.ndarray:
+    # Only x, y, z are used; an optional w component is dropped
+    rows = [line.split()[:3] for line in lines]
+    return np.array([[float(value) for value in row] for row in rows], dtype=np.float32)
+
+def _report(progress: Optional[ProgressCallback], f: BinaryIO, total: int) -> None:
+    if progress is not None:
+        progress(min(f.tell() / total, 1.0))
+
+class _GrowableArray:
+    """Append-only (n, width) array with amortized doubling, avoiding repeated concatenation."""
+
+    def __init__(self, width: int, dtype):
+        self._data = np.empty((1024, width), dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, rows: np.ndarray) -> None:
+        needed = self._size + len(rows)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, len(self._data) * 2), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = rows
+        self._size = needed
+
+    def view(self) -> np.ndarray:
+        return self._data[:self._size]
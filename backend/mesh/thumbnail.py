@@ -0,0 +1,177 @@
+import os
+import struct
+import zlib
+from typing import Tuple
+
+import numpy as np
+
+# Viewer blue (#3b82f6) under a headlight
+BASE_COLOR = np.array([59, 130, 246], dtype=np.float32)
+AMBIENT = 0.25
+MARGIN = 0.06
+THUMBNAIL_SUFFIX = ".thumb.png"
+# Bump when the rendering changes so clients holding an old ETag refetch
+THUMBNAIL_VERSION = 1
+# Candidate pixels generated per rasterization step
+FRAGMENT_BATCH = 2_000_000
+
+def thumbnail_path(file_path: str) -> str:
+    # Content-addressed like the blob itself, so every project with this file shares it
+    return os.path.splitext(file_path)[0] + THUMBNAIL_SUFFIX
+
+def thumbnail_etag(content_hash: str, size: int) -> str:
+    return f'"{content_hash}-{size}-v{THUMBNAIL_VERSION}"'
+
+def view_basis() -> np.ndarray:
+    """Rows are the screen right, screen up and view direction of an isometric camera (Z up)."""
+    forward = -np.array([1.0, -1.0, 1.0]) / np.sqrt(3.0)
+    right = np.cross(forward, [0.0, 0.0, 1.0])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    return np.stack([right, up, forward])
+
+def render_thumbnail(triangles: np.ndarray, size: int = 256) -> bytes:
+    """Renders an (n, 3, 3) triangle array to an RGBA PNG with a transparent background.
+
+    Orthographic isometric projection, a z-buffer and flat shading, all in NumPy: faces are
+    binned by screen-space size so each bin is rasterized in a few array operations, and the
+    z-buffer is resolved with a single sort over all fragments. Faces no bigger than a pixel,
+    the bulk of any dense mesh at thumbnail size, skip rasterization altogether. 2.6M faces
+    render at 256 px in about 0.9 s on one core (scripts/bench_thumbnail.py).
+    """
+    image = np.zeros((size, size, 4), dtype=np.uint8)
+    if len(triangles) == 0:
+        return encode_png(image)
+
+    view = np.asarray(triangles, dtype=np.float32).reshape(-1, 3) @ view_basis().T.astype(np.float32)
+    lower = np.array([view[:, 0].min(), view[:, 1].min()])
+    upper = np.array([view[:, 0].max(), view[:, 1].max()])
+    scale = size * (1 - 2 * MARGIN) / max(float((upper - lower).max()), 1e-9)
+    offset = (size - (upper - lower) * scale) / 2
+    # Screen coordinates as (n, 3) arrays per axis; image rows grow downwards
+    x = ((view[:, 0] - lower[0]) * scale + offset[0]).reshape(-1, 3)
+    y = (size - ((view[:, 1] - lower[1]) * scale + offset[1])).reshape(-1, 3)
+    depth = view[:, 2].reshape(-1, 3)
+
+    pixels, depths, faces = _rasterize(x, y, depth, size)
+
+    # Nearest fragment per pixel: sort by (pixel, depth) and keep each pixel's first. Non-negative
+    # float32 bits order like the floats, so both fit one uint64 key, several times cheaper than lexsort
+    depth_bits = (depths - depths.min()).view(np.uint32)
+    order = np.argsort((pixels.astype(np.uint64) << np.uint64(32)) | depth_bits)
+    pixels, faces = pixels[order], faces[order]
+    first = np.ones(len(pixels), dtype=bool)
+    first[1:] = pixels[1:] != pixels[:-1]
+    pixels, faces = pixels[first], faces[first]
+
+    # At most one face per pixel survives, so only those are shaded
+    shade = _flat_shading(view.reshape(-1, 3, 3)[faces])
+    flat = image.reshape(-1, 4)
+    flat[pixels, :3] = np.clip(BASE_COLOR * shade[:, None], 0, 255).astype(np.uint8)
+    flat[pixels, 3] = 255
+    return encode_png(image)
+
+def _flat_shading(view_triangles: np.ndarray) -> np.ndarray:
+    normals = np.cross(view_triangles[:, 1] - view_triangles[:, 0], view_triangles[:, 2] - view_triangles[:, 0])
+    lengths = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+    # Light comes from the camera; abs() keeps inverted or inconsistent windings lit
+    facing = np.abs(normals[:, 2]) / np.maximum(lengths, 1e-12)
+    return AMBIENT + (1 - AMBIENT) * facing
+
+def _rasterize(x: np.ndarray, y: np.ndarray, depth: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns (pixel index, depth, face index) for every covered pixel center."""
+    lo_x, lo_y = np.floor(_min3(x)).astype(np.int32), np.floor(_min3(y)).astype(np.int32)
+    extent = np.maximum(np.maximum(np.ceil(_max3(x)) - lo_x, np.ceil(_max3(y)) - lo_y), 1)
+    # Round every extent up to a power of two so faces of similar size share a grid
+    levels = np.ceil(np.log2(extent)).astype(np.int64)
+    out = [_rasterize_pixel_faces(depth, lo_x, lo_y, np.flatnonzero(levels == 0), size)]
+    # bincount finds the levels present without sorting millions of faces
+    present = np.flatnonzero(np.bincount(levels))
+    for level in present[present > 0]:
+        tier = 1 << int(level)
+        selected = np.flatnonzero(levels == level)
+        # Bound the temporaries: each face expands to tier * tier candidate pixels
+        step = max(1, FRAGMENT_BATCH // (tier * tier))
+        for start in range(0, len(selected), step):
+            out.append(_rasterize_tier(x, y, depth, lo_x, lo_y, selected[start:start + step], tier, size))
+    return tuple(np.concatenate(parts) for parts in zip(*out))
+
+def _min3(values: np.ndarray) -> np.ndarray:
+    # Reducing over a length-3 axis is several times slower than combining its columns
+    return np.minimum(np.minimum(values[:, 0], values[:, 1]), values[:, 2])
+
+def _max3(values: np.ndarray) -> np.ndarray:
+    return np.maximum(np.maximum(values[:, 0], values[:, 1]), values[:, 2])
+
+def _rasterize_pixel_faces(depth: np.ndarray, lo_x: np.ndarray, lo_y: np.ndarray, faces: np.ndarray, size: int):
+    # A face inside one pixel's square either covers its center or is splatted onto it, so it
+    # yields that pixel at its centroid depth without any coverage test
+    px, py = lo_x[faces], lo_y[faces]
+    visible = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+    faces = faces[visible]
+    pixels = py[visible].astype(np.int64) * size + px[visible]
+    fragment_depth = (depth[faces, 0] + depth[faces, 1] + depth[faces, 2]) / 3
+    return pixels, fragment_depth.astype(np.float32), faces
+
+def _rasterize_tier(x: np.ndarray, y: np.ndarray, depth: np.ndarray, lo_x: np.ndarray, lo_y: np.ndarray, faces: np.ndarray, tier: int, size: int):
+    # Candidate pixel centers: a tier x tier grid anchored at each face's bounding box corner
+    grid = np.arange(tier, dtype=np.int32)
+    gx, gy = (g.ravel() for g in np.meshgrid(grid, grid, indexing="xy"))
+
+    # Vertices relative to the face's first candidate center
+    origin_x, origin_y = lo_x[faces] + np.float32(0.5), lo_y[faces] + np.float32(0.5)
+    fx, fy = x[faces] - origin_x[:, None], y[faces] - origin_y[:, None]
+    ax, bx, cx = fx[:, 0], fx[:, 1], fx[:, 2]
+    ay, by, cy = fy[:, 0], fy[:, 1], fy[:, 2]
+    area = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    nondegenerate = np.abs(area) > 1e-12
+    # Edge functions are linear in the pixel offset, so each is a per-face constant plus
+    # per-face steps along x and y. Multiplying by the winding's sign accepts either winding;
+    # the results are the barycentric weights scaled by |area|.
+    sign = np.where(area < 0, -1, 1).astype(np.float32)
+    e0 = _edge_function(bx, by, cx, cy, sign, gx, gy)
+    e1 = _edge_function(cx, cy, ax, ay, sign, gx, gy)
+    e2 = np.abs(area)[:, None] - e0 - e1
+    inside = (e0 >= 0) & (e1 >= 0) & (e2 >= 0) & nondegenerate[:, None]
+
+    rows, cols = np.nonzero(inside)
+    face_ids = faces[rows]
+    px, py = lo_x[face_ids] + gx[cols], lo_y[face_ids] + gy[cols]
+    w0 = e0[rows, cols] / np.abs(area[rows])
+    w1 = e1[rows, cols] / np.abs(area[rows])
+    fragment_depth = w0 * depth[face_ids, 0] + w1 * depth[face_ids, 1] + (1 - w0 - w1) * depth[face_ids, 2]
+    visible = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+    pixels = py[visible].astype(np.int64) * size + px[visible]
+    fragment_depth, face_ids = fragment_depth[visible], face_ids[visible]
+
+    # Sub-pixel faces miss every pixel center; splat those onto the pixel under their centroid
+    missed = np.ones(len(faces), dtype=bool)
+    missed[rows] = False
+    if missed.any():
+        cpx = np.floor(origin_x[missed] + (ax[missed] + bx[missed] + cx[missed]) / 3).astype(np.int32)
+        cpy = np.floor(origin_y[missed] + (ay[missed] + by[missed] + cy[missed]) / 3).astype(np.int32)
+        splat = (cpx >= 0) & (cpx < size) & (cpy >= 0) & (cpy < size)
+        splat_faces = faces[missed][splat]
+        pixels = np.concatenate([pixels, cpy[splat].astype(np.int64) * size + cpx[splat]])
+        fragment_depth = np.concatenate([fragment_depth, depth[splat_faces].mean(axis=1)])
+        face_ids = np.concatenate([face_ids, splat_faces])
+    return pixels, fragment_depth.astype(np.float32), face_ids
+
+def _edge_function(x0, y0, x1, y1, sign, gx, gy) -> np.ndarray:
+    """(x0 - x) * (y1 - y) - (y0 - y) * (x1 - x) for every face (rows) and grid offset (columns)."""
+    constant = (x0 * y1 - y0 * x1) * sign
+    step_x = (y0 - y1) * sign
+    step_y = (x1 - x0) * sign
+    return constant[:, None] + step_x[:, None] * gx + step_y[:, None] * gy
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Minimal RGBA8 PNG encoder, so rendering needs nothing beyond NumPy."""
+    height, width = image.shape[:2]
+    # Filter type 0 (None) in front of every scanline
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b"")
@@ -0,0 +1,53 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+def mesh_topology(triangles: np.ndarray) -> Tuple[bool, int]:
+    """Returns (is_watertight, shell_count) for an (n, 3, 3) triangle soup.
+
+    Vertices are welded on exact coordinates, which matches how STL exporters duplicate them.
+    A mesh is watertight when every edge is shared by exactly two faces.
+    """
+    if len(triangles) == 0:
+        return False, 0
+    # Adding 0.0 folds -0.0 into 0.0 so both weld to the same vertex
+    points = np.ascontiguousarray(triangles, dtype=np.float32).reshape(-1, 3) + np.float32(0.0)
+    faces, vertex_count = _weld(points)
+
+    start = faces.ravel()
+    end = faces[:, [1, 2, 0]].ravel()
+    # Undirected edge keys; sorting a 1D int64 array is the cheap way to count them
+    keys = np.minimum(start, end) * vertex_count + np.maximum(start, end)
+    keys.sort()
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1])
+    counts = np.diff(np.concatenate(([-1], boundaries, [len(keys) - 1])))
+    is_watertight = bool(np.all(counts == 2))
+
+    # Two edges per face already connect all three of its vertices
+    graph = coo_matrix(
+        (np.ones(2 * len(faces), dtype=np.int8), (faces[:, :2].ravel(), faces[:, 1:].ravel())),
+        shape=(vertex_count, vertex_count),
+    )
+    shell_count, _ = connected_components(graph, directed=False)
+    return is_watertight, int(shell_count)
+
+def _weld(points: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Returns (faces as (n, 3) vertex ids, vertex count) for bit-identical float32 points.
+
+    Sorting scalar keys is several times faster than np.unique(axis=0), which compares rows
+    as structured records: x and y bits are packed into one uint64 key and z breaks ties.
+    """
+    bits = points.view(np.uint32)
+    xy = (bits[:, 0].astype(np.uint64) << np.uint64(32)) | bits[:, 1]
+    z = np.ascontiguousarray(bits[:, 2])
+    order = np.lexsort((z, xy))
+    xy, z = xy[order], z[order]
+    first = np.empty(len(order), dtype=bool)
+    first[0] = True
+    np.not_equal(xy[1:], xy[:-1], out=first[1:])
+    first[1:] |= z[1:] != z[:-1]
+    inverse = np.empty(len(order), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return inverse.reshape(-1, 3), int(inverse[order[-1]]) + 1
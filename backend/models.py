@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float, ForeignKey, DateTime, Text, JSON
+from sqlalchemy import Boolean, Column, Integer, String, Float, ForeignKey, DateTime, Text, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sqlalchemy.orm import relationship
@@ -18,10 +18,18 @@ class User(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Keyset pagination of a user's list, optionally filtered by status or title prefix
+        Index("ix_projects_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_projects_owner_status_created", "owner_id", "file_status", "created_at", "id"),
+        Index("ix_projects_owner_title", "owner_id", "title"),
+    )
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Drives the ETags of project GET responses
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     client_name = Column(String, nullable=True)
     contact = Column(String, nullable=True)
     notes = Column(Text, nullable=True)
@@ -32,6 +40,7 @@ class Project(Base):
     # Uploaded model file path
     file_path = Column(String, nullable=True)
     file_status = Column(String, default="pending") # pending, processing, ready, error
+    file_hash = Column(String, nullable=True, index=True) # sha256 of the content-addressed blob
     
     # Processed Analysis stats
     poly_count = Column(Integer, nullable=True)
@@ -39,13 +48,55 @@ class Project(Base):
     dim_x = Column(Float, nullable=True)
     dim_y = Column(Float, nullable=True)
     dim_z = Column(Float, nullable=True)
+
+    # Printability analysis
+    surface_area_mm2 = Column(Float, nullable=True)
+    overhang_area_mm2 = Column(Float, nullable=True)
+    support_volume_mm3 = Column(Float, nullable=True)
+    is_watertight = Column(Boolean, nullable=True)
+    shell_count = Column(Integer, nullable=True)
+
+    # Decimated viewer LODs beside the original: [{"level", "path", "faces", "vertices", "size"}], coarse first
+    preview_assets = Column(JSON, nullable=True)
     
     # Saved Production Parameters from Frontend (JSON)
     production_params = Column(JSON, nullable=True)
     
     # Calculated Results (JSON)
     calculated_results = Column(JSON, nullable=True)
+
+    # Version of the params stored in this row; used for optimistic concurrency on PATCH /params
+    params_version = Column(Integer, default=0, server_default="0", nullable=False)
+    # Newest version handed out. Ahead of params_version while an API process still buffers it,
+    # so versions stay unique across processes and no one else patches stale stored params.
+    params_claimed_version = Column(Integer, default=0, server_default="0", nullable=False)
     
     # LLM outputs
     ai_description = Column(Text, nullable=True)
     ai_commercial_text = Column(Text, nullable=True)
+
+# Geometry stats shared between a Project and its cached MeshAnalysis
+MESH_ANALYSIS_FIELDS = (
+    "poly_count", "volume_mm3", "dim_x", "dim_y", "dim_z",
+    "surface_area_mm2", "overhang_area_mm2", "support_volume_mm3", "is_watertight", "shell_count",
+    "preview_assets",
+)
+
+class MeshAnalysis(Base):
+    __tablename__ = "mesh_analyses"
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    content_hash = Column(String, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    poly_count = Column(Integer, nullable=True)
+    volume_mm3 = Column(Float, nullable=True)
+    dim_x = Column(Float, nullable=True)
+    dim_y = Column(Float, nullable=True)
+    dim_z = Column(Float, nullable=True)
+    surface_area_mm2 = Column(Float, nullable=True)
+    overhang_area_mm2 = Column(Float, nullable=True)
+    support_volume_mm3 = Column(Float, nullable=True)
+    is_watertight = Column(Boolean, nullable=True)
+    shell_count = Column(Integer, nullable=True)
+    preview_assets = Column(JSON, nullable=True)
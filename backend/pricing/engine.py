@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from exceptions import InvalidQuoteException
+
+# Mirrors frontend/src/lib/calculator.ts and docs/calculations.md; keep the three in sync.
+PREP_LABOR_RATE = 20.0  # $/hr, applied to modelPrepMins
+POST_PROCESS_LABOR_RATE = 15.0  # $/hr, applied to postProcessHours
+
+# Numeric inputs of the pipeline with the editor's defaults (ProjectEditor DEFAULT_PARAMS)
+DEFAULT_PARAMS: Dict[str, float] = {
+    "density": 1.24,
+    "pricePerKg": 25,
+    "wastePercent": 5,
+    "infill": 20,
+    "supports": 10,
+    "printTimeHours": 2,
+    "postProcessHours": 0.5,
+    "modelPrepMins": 15,
+    "quantity": 1,
+    "markupPercent": 30,
+    "defectRateRate": 5,
+    "taxRatePercent": 20,
+    "amortizationCostPerHour": 0.5,
+    "electricityCostPerHour": 0.2,
+}
+
+def resolve_params(stored: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Merges a project's saved production_params over the defaults."""
+    return {**DEFAULT_PARAMS, **(stored or {})}
+
+def calculate_economics(params: Mapping[str, Any], volume_mm3) -> Dict[str, np.ndarray]:
+    """Vectorized port of calculateEconomics; every input may be a scalar or a 1-D array."""
+    p = {field: np.asarray(params[field], dtype=np.float64) for field in DEFAULT_PARAMS}
+    vol_cm3 = np.asarray(volume_mm3, dtype=np.float64) / 1000
+
+    effective_vol_cm3 = vol_cm3 * (p["infill"] / 100) + vol_cm3 * (p["supports"] / 100)
+    final_weight_grams = effective_vol_cm3 * p["density"] * (1 + p["wastePercent"] / 100)
+    material_cost = (final_weight_grams / 1000) * p["pricePerKg"]
+
+    print_cost = p["printTimeHours"] * p["amortizationCostPerHour"]
+    power_cost = p["printTimeHours"] * p["electricityCostPerHour"]
+    prep_cost = (p["modelPrepMins"] / 60) * PREP_LABOR_RATE
+    post_cost = p["postProcessHours"] * POST_PROCESS_LABOR_RATE
+
+    unit_cost = material_cost + print_cost + power_cost + prep_cost + post_cost
+    cost_with_defects = unit_cost * (1 + p["defectRateRate"] / 100)
+
+    selling_price_pre_tax = cost_with_defects * (1 + p["markupPercent"] / 100)
+    total_unit_price = selling_price_pre_tax * (1 + p["taxRatePercent"] / 100)
+
+    return {
+        "weightGrams": final_weight_grams,
+        "materialCost": material_cost,
+        "printCost": print_cost,
+        "powerCost": power_cost,
+        "laborCost": prep_cost + post_cost,
+        "unitCost": cost_with_defects,
+        "profitPerUnit": selling_price_pre_tax - cost_with_defects,
+        "totalUnitPrice": total_unit_price,
+        "finalBatchPrice": total_unit_price * p["quantity"],
+    }
+
+def calculate_results_batch(stored_params: List[Optional[Mapping[str, Any]]], volumes: List[float]) -> List[Optional[Dict[str, float]]]:
+    """Recomputes many projects in one vectorized pass; rows with non-numeric params yield None."""
+    columns: Dict[str, List[float]] = {field: [] for field in DEFAULT_PARAMS}
+    valid: List[int] = []
+    for i, stored in enumerate(stored_params):
+        params = resolve_params(stored)
+        try:
+            values = {field: float(params[field]) for field in DEFAULT_PARAMS}
+        except (TypeError, ValueError):
+            continue
+        for field, value in values.items():
+            columns[field].append(value)
+        valid.append(i)
+
+    output: List[Optional[Dict[str, float]]] = [None] * len(stored_params)
+    if not valid:
+        return output
+    results = calculate_economics(columns, np.asarray(volumes, dtype=np.float64)[valid])
+    for row, i in enumerate(valid):
+        output[i] = {name: float(values[row]) for name, values in results.items()}
+    return output
+
+def build_param_matrix(
+    base: Mapping[str, Any],
+    param_sets: List[Dict[str, float]],
+    grid: Dict[str, List[float]],
+    max_rows: int,
+) -> Dict[str, np.ndarray]:
+    """Expands param_sets x cartesian(grid) into one column per varying field.
+
+    Fields that do not vary stay scalars and are broadcast by calculate_economics.
+    """
+    unknown = ({key for row in param_sets for key in row} | set(grid)) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise InvalidQuoteException("Unknown parameters", details=sorted(unknown))
+    param_sets = param_sets or [{}]
+    shape = [len(param_sets)] + [len(values) for values in grid.values()]
+    rows = int(np.prod(shape))
+    if rows == 0 or rows > max_rows:
+        raise InvalidQuoteException(f"Quote matrix must have between 1 and {max_rows} rows", details={"rows": rows})
+
+    try:
+        columns: Dict[str, Any] = {field: float(base[field]) for field in DEFAULT_PARAMS}
+        index = np.indices(shape).reshape(len(shape), -1)
+        for field in {key for row in param_sets for key in row}:
+            values = np.array([row.get(field, columns[field]) for row in param_sets], dtype=np.float64)
+            columns[field] = values[index[0]]
+        for axis, (field, values) in enumerate(grid.items(), start=1):
+            columns[field] = np.asarray(values, dtype=np.float64)[index[axis]]
+    except (TypeError, ValueError) as e:
+        raise InvalidQuoteException("Parameters must be numeric", details=str(e))
+    return columns
+
+def varying_columns(columns: Mapping[str, Any]) -> Dict[str, List[float]]:
+    return {field: values.tolist() for field, values in columns.items() if np.ndim(values) > 0}
@@ -0,0 +1,176 @@
+import gzip
+import mimetypes
+import os
+import shutil
+from stat import S_ISREG
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, Response as RawResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from exceptions import StoredFileNotFoundException
+from .file_service import BLOB_DIR
+
+# Same root FileService writes to and main.py used to mount
+UPLOAD_DIR = "uploads"
+
+try:
+    import zstandard
+except ImportError:  # optional: `poetry install -E zstd`
+    zstandard = None
+
+# Content-Encoding name and file suffix of each precompressed variant, most preferred first
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("zstd", ".zst"), ("gzip", ".gz"))
+# A variant is only kept when it is at most this fraction of the original
+MIN_COMPRESSION_RATIO = 0.9
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+mimetypes.add_type("model/stl", ".stl")
+mimetypes.add_type("model/obj", ".obj")
+mimetypes.add_type("model/3mf", ".3mf")
+
+router = APIRouter(prefix="/uploads", tags=["files"])
+
+def precompress(path: str) -> List[str]:
+    """Writes the gzip (and, when available, zstd) variants of a file once; returns those kept.
+
+    Blobs and their derivatives are content-addressed, so existing variants are never redone.
+    """
+    size = os.path.getsize(path)
+    kept = []
+    for encoding, suffix in ENCODINGS:
+        target = path + suffix
+        if os.path.exists(target):
+            kept.append(target)
+            continue
+        if encoding == "zstd" and zstandard is None:
+            continue
+        with open(path, "rb") as src, open(target + ".part", "wb") as dst:
+            if encoding == "zstd":
+                zstandard.ZstdCompressor(level=10, threads=-1).copy_stream(src, dst)
+            else:
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, settings.upload_chunk_size)
+        if os.path.getsize(target + ".part") > size * MIN_COMPRESSION_RATIO:
+            os.remove(target + ".part")
+            continue
+        os.replace(target + ".part", target)
+        kept.append(target)
+    return kept
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_upload(request: Request, file_path: str):
+    """Uploaded files with validators, byte ranges and precompressed variants.
+
+    Blob-store paths embed the content hash, so they are immutable and their ETag is the
+    file name. Ranges are served from the identity encoding only.
+    """
+    upload_root = os.path.abspath(UPLOAD_DIR)
+    path = os.path.abspath(os.path.join(upload_root, file_path))
+    if os.path.commonpath([upload_root, path]) != upload_root or path.endswith(".part"):
+        raise StoredFileNotFoundException(file_path)
+    try:
+        stat = await run_in_threadpool(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise StoredFileNotFoundException(file_path)
+    if not S_ISREG(stat.st_mode):
+        raise StoredFileNotFoundException(file_path)
+
+    immutable = os.path.commonpath([os.path.join(upload_root, BLOB_DIR), path]) == os.path.join(upload_root, BLOB_DIR)
+    etag = f'"{os.path.basename(path)}"' if immutable else f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) != etag:
+        range_header = None
+
+    serve_path, size, encoding = path, stat.st_size, None
+    if not range_header:
+        for candidate, suffix in ENCODINGS:
+            if candidate in _accepted_encodings(request) and os.path.exists(path + suffix):
+                serve_path, encoding = path + suffix, candidate
+                size = os.path.getsize(serve_path)
+                # Each representation needs its own strong validator
+                etag = etag[:-1] + f'-{candidate}"'
+                break
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return RawResponse(status_code=304, headers=headers)
+
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is False:
+            return RawResponse(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            if request.method == "HEAD":
+                return RawResponse(status_code=206, headers=headers, media_type=media_type)
+            return StreamingResponse(_iter_file_range(serve_path, start, end), status_code=206, headers=headers, media_type=media_type)
+
+    if request.method == "HEAD":
+        return RawResponse(headers={**headers, "Content-Length": str(size)}, media_type=media_type)
+    return FileResponse(serve_path, headers=headers, media_type=media_type, stat_result=None if encoding else stat)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def _accepted_encodings(request: Request) -> List[str]:
+    accepted = []
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.append(name.lower())
+    return accepted
+
+def _parse_range(header: str, size: int):
+    """Returns (start, end) inclusive, None to ignore the header, or False if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    # Multiple ranges would need multipart/byteranges; serving the whole file is allowed instead
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if end < start:
+                return None
+            end = min(end, size - 1)
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or end < 0:
+        return False
+    return start, end
+
+async def _iter_file_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        await run_in_threadpool(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await run_in_threadpool(f.read, min(settings.upload_chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,102 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+import models
+from config import settings
+
+CHANNEL_PREFIX = "project:events:"
+# Events a slow client hasn't consumed yet; older progress ticks are dropped past this
+SUBSCRIBER_QUEUE_SIZE = 64
+RECONNECT_DELAY_SECONDS = 1.0
+
+def project_channel(project_id: str) -> str:
+    return CHANNEL_PREFIX + project_id
+
+def status_event(project: models.Project) -> Dict[str, Any]:
+    """Current file status of a project, with the analysis results once it is ready."""
+    event = {"project_id": project.id, "status": project.file_status}
+    if project.file_status == "ready":
+        event.update({field: getattr(project, field) for field in models.MESH_ANALYSIS_FIELDS})
+    return event
+
+class ProjectEventPublisher:
+    """Sync publisher used by Celery tasks. Publishing is best-effort and never fails a task."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._client: Optional[redis.Redis] = None
+
+    def publish(self, project_id: str, event: Dict[str, Any]) -> None:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url)
+        try:
+            self._client.publish(project_channel(project_id), json.dumps({"project_id": project_id, **event}))
+        except RedisError as e:
+            print(f"Failed to publish event for project {project_id}: {e}")
+
+class ProjectEventHub:
+    """Fans project events out to the SSE clients of this API process.
+
+    One pattern subscription per process is shared by every client; each client only gets a
+    bounded local queue, so connections cost no Redis connection of their own.
+    """
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def open(self, project_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(project_id, set()).add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def close(self, project_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(project_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[project_id]
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _dispatch(self, project_id: str, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(project_id, ()):
+            if queue.full():
+                # Progress is monotonic, so losing an intermediate tick is harmless
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _run(self) -> None:
+        while True:
+            client = aioredis.from_url(self.redis_url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"].decode()
+                    self._dispatch(channel[len(CHANNEL_PREFIX):], json.loads(message["data"]))
+            except (RedisError, OSError) as e:
+                print(f"Project event subscriber disconnected: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+event_hub = ProjectEventHub(settings.redis_url)
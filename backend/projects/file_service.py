@@ -1,20 +1,263 @@
+import glob
+import hashlib
+import json
 import os
 import shutil
+import time
+import uuid
+from typing import AsyncIterator, List, NamedTuple, Optional
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from exceptions import FileTooLargeException, InvalidUploadException, UploadNotFoundException
+import schemas
+
+MULTIPART_DIR = ".multipart"
+BLOB_DIR = "blobs"
+
+class StoredFile(NamedTuple):
+    path: str
+    content_hash: str
+    size: int
+    # The upload's own copy of the blob, kept until a project references it (settle_blob)
+    staged_path: Optional[str] = None
 
 class FileService:
-    def __init__(self, upload_dir: str = "uploads"):
+    def __init__(self, upload_dir: str = "uploads", chunk_size: int = settings.upload_chunk_size, max_size: int = settings.max_upload_size_mb * 1024 * 1024):
         self.upload_dir = upload_dir
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self._last_expiry = 0.0
         if not os.path.exists(self.upload_dir):
             os.makedirs(self.upload_dir)
 
-    async def save_upload_file(self, upload_file: UploadFile, project_id: str) -> str:
+    async def save_upload_file(self, upload_file: UploadFile, project_id: str) -> StoredFile:
+        filename = _upload_filename(upload_file.filename)
         project_dir = os.path.join(self.upload_dir, str(project_id))
-        if not os.path.exists(project_dir):
-            os.makedirs(project_dir)
-        
-        file_path = os.path.join(project_dir, upload_file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-            
-        return file_path
+        await run_in_threadpool(os.makedirs, project_dir, exist_ok=True)
+
+        file_path = _staging_path(project_dir, filename)
+        content_hash, size = await self._stream_to_disk(self._iter_upload(upload_file), file_path)
+        blob_path = await run_in_threadpool(self._link_to_blob_store, file_path, content_hash)
+        return StoredFile(blob_path, content_hash, size, file_path)
+
+    def settle_blob(self, stored_file: StoredFile) -> None:
+        """Called once a project referencing the blob is committed; drops the staged copy.
+
+        A release of the last previous reference may have removed the blob between the upload
+        finding it in place and that commit; the staged copy puts it back.
+        """
+        if not stored_file.staged_path:
+            return
+        if os.path.exists(stored_file.path):
+            os.remove(stored_file.staged_path)
+        else:
+            os.replace(stored_file.staged_path, stored_file.path)
+
+    def retire_blob(self, blob_path: str) -> Optional[str]:
+        """First step of a release: moves the blob aside and returns where, or None if it is gone.
+
+        The caller re-counts references afterwards and either restores or deletes it, so an
+        upload committing a new reference meanwhile never ends up pointing at nothing.
+        """
+        if not self._in_blob_store(blob_path):
+            return None
+        retired = _temp_path(blob_path)
+        try:
+            os.replace(blob_path, retired)
+        except FileNotFoundError:
+            return None
+        return retired
+
+    def restore_blob(self, blob_path: str, retired_path: str) -> None:
+        if os.path.exists(blob_path):
+            # A new upload already settled its own copy
+            os.remove(retired_path)
+        else:
+            os.replace(retired_path, blob_path)
+
+    def delete_blob(self, blob_path: str, retired_path: Optional[str] = None) -> None:
+        # Only files inside the blob store are ever removed here
+        if not self._in_blob_store(blob_path):
+            return
+        # Derivatives (<hash>.lod<n>.qmesh, <hash>.thumb.png) live beside the blob and go with it
+        stem = os.path.splitext(blob_path)[0]
+        paths = [retired_path or blob_path] + [path for path in glob.glob(glob.escape(stem) + ".*") if not path.endswith(".part")]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _in_blob_store(self, path: str) -> bool:
+        blob_root = os.path.abspath(os.path.join(self.upload_dir, BLOB_DIR))
+        return os.path.commonpath([blob_root, os.path.abspath(path)]) == blob_root
+
+    def _link_to_blob_store(self, file_path: str, content_hash: str) -> str:
+        # Blobs are keyed by content hash; the extension is kept so loaders can detect the format.
+        # The upload stays staged until settle_blob, so it can still restore a released blob.
+        extension = os.path.splitext(file_path)[1].lower()
+        blob_dir = os.path.join(self.upload_dir, BLOB_DIR, content_hash[:2])
+        os.makedirs(blob_dir, exist_ok=True)
+        blob_path = os.path.join(blob_dir, f"{content_hash}{extension}")
+        if not os.path.exists(blob_path):
+            try:
+                os.link(file_path, blob_path)
+            except FileExistsError:
+                pass
+            except OSError:
+                # No hard links on this filesystem
+                tmp_path = _temp_path(blob_path)
+                shutil.copyfile(file_path, tmp_path)
+                os.replace(tmp_path, blob_path)
+        return blob_path
+
+    async def create_multipart_upload(self, project_id: str, filename: Optional[str]) -> schemas.MultipartUpload:
+        filename = _upload_filename(filename)
+        # Abandoned sessions are swept when new ones start, at most once per sweep interval
+        if time.monotonic() - self._last_expiry > settings.multipart_expiry_interval_seconds:
+            self._last_expiry = time.monotonic()
+            await run_in_threadpool(self.expire_multipart_uploads)
+        upload_id = uuid.uuid4().hex
+        upload_dir = os.path.join(self.upload_dir, str(project_id), MULTIPART_DIR, upload_id)
+        await run_in_threadpool(self._write_multipart_upload, upload_dir, filename)
+        return schemas.MultipartUpload(upload_id=upload_id, filename=filename)
+
+    async def save_upload_part(self, project_id: str, upload_id: str, part_number: int, chunks: AsyncIterator[bytes]) -> schemas.UploadPart:
+        upload_dir = await run_in_threadpool(self._get_multipart_dir, project_id, upload_id)
+        part_path = os.path.join(upload_dir, f"part-{part_number:05d}")
+        # The whole upload is capped, not just each part; a part being retried replaces itself.
+        # Parts still in flight aren't counted, so concurrent parts can overshoot by their size.
+        stored = await run_in_threadpool(self._stored_parts_size, upload_dir, os.path.basename(part_path))
+        content_hash, size = await self._stream_to_disk(chunks, part_path, self.max_size - stored)
+        return schemas.UploadPart(part_number=part_number, size=size, content_hash=content_hash)
+
+    async def get_multipart_upload(self, project_id: str, upload_id: str) -> schemas.MultipartUpload:
+        upload_dir = await run_in_threadpool(self._get_multipart_dir, project_id, upload_id)
+        return await run_in_threadpool(self._read_multipart_upload, upload_dir, upload_id)
+
+    async def complete_multipart_upload(self, project_id: str, upload_id: str) -> StoredFile:
+        upload_dir = await run_in_threadpool(self._get_multipart_dir, project_id, upload_id)
+        upload = await run_in_threadpool(self._read_multipart_upload, upload_dir, upload_id)
+        if not upload.parts:
+            raise InvalidUploadException("Upload has no parts")
+        missing = sorted(set(range(1, upload.parts[-1] + 1)) - set(upload.parts))
+        if missing:
+            raise InvalidUploadException("Upload is missing parts", details={"missing_parts": missing})
+
+        file_path = _staging_path(os.path.join(self.upload_dir, str(project_id)), upload.filename)
+        content_hash, size = await run_in_threadpool(self._assemble_parts, upload_dir, upload.parts, file_path)
+        await run_in_threadpool(shutil.rmtree, upload_dir, True)
+        blob_path = await run_in_threadpool(self._link_to_blob_store, file_path, content_hash)
+        return StoredFile(blob_path, content_hash, size, file_path)
+
+    def expire_multipart_uploads(self) -> int:
+        """Removes multipart sessions untouched for longer than the TTL; returns how many."""
+        # Writing a part renames it into the session directory, which bumps its mtime
+        cutoff = time.time() - settings.multipart_upload_ttl_hours * 3600
+        expired = 0
+        for upload_dir in glob.glob(os.path.join(glob.escape(self.upload_dir), "*", MULTIPART_DIR, "*")):
+            try:
+                if os.path.getmtime(upload_dir) < cutoff:
+                    shutil.rmtree(upload_dir, ignore_errors=True)
+                    expired += 1
+            except FileNotFoundError:
+                pass
+        return expired
+
+    def _stored_parts_size(self, upload_dir: str, replaced: str) -> int:
+        total = 0
+        for entry in os.scandir(upload_dir):
+            if entry.name.startswith("part-") and entry.name[len("part-"):].isdigit() and entry.name != replaced:
+                total += entry.stat().st_size
+        return total
+
+    def _get_multipart_dir(self, project_id: str, upload_id: str) -> str:
+        try:
+            upload_id = uuid.UUID(hex=upload_id).hex
+        except ValueError:
+            raise UploadNotFoundException(upload_id)
+        upload_dir = os.path.join(self.upload_dir, str(project_id), MULTIPART_DIR, upload_id)
+        if not os.path.isdir(upload_dir):
+            raise UploadNotFoundException(upload_id)
+        return upload_dir
+
+    def _write_multipart_upload(self, upload_dir: str, filename: str) -> None:
+        os.makedirs(upload_dir)
+        with open(os.path.join(upload_dir, "meta.json"), "w") as meta:
+            json.dump({"filename": filename}, meta)
+
+    def _read_multipart_upload(self, upload_dir: str, upload_id: str) -> schemas.MultipartUpload:
+        with open(os.path.join(upload_dir, "meta.json")) as meta:
+            filename = json.load(meta)["filename"]
+        parts = sorted(
+            int(name[len("part-"):]) for name in os.listdir(upload_dir)
+            if name.startswith("part-") and name[len("part-"):].isdigit()
+        )
+        return schemas.MultipartUpload(upload_id=upload_id, filename=filename, parts=parts)
+
+    def _assemble_parts(self, upload_dir: str, parts: List[int], file_path: str):
+        # Parts are concatenated through a fixed-size buffer, never the whole file in memory
+        tmp_path = _temp_path(file_path)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as buffer:
+                for part_number in parts:
+                    with open(os.path.join(upload_dir, f"part-{part_number:05d}"), "rb") as part:
+                        while chunk := part.read(self.chunk_size):
+                            size += len(chunk)
+                            if size > self.max_size:
+                                raise FileTooLargeException(self.max_size)
+                            _write_chunk(buffer, digest, chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, file_path)
+        return digest.hexdigest(), size
+
+    async def _iter_upload(self, upload_file: UploadFile) -> AsyncIterator[bytes]:
+        while chunk := await upload_file.read(self.chunk_size):
+            yield chunk
+
+    async def _stream_to_disk(self, chunks: AsyncIterator[bytes], file_path: str, max_size: Optional[int] = None):
+        # Write to a temp name so a failed or oversized upload never replaces a good file.
+        # The name is unique per request: a retried part may arrive while the dropped request
+        # for it is still draining, and neither may truncate or delete the other's file.
+        # Hashing and disk writes run in the threadpool; only one chunk is held at a time.
+        tmp_path = _temp_path(file_path)
+        limit = self.max_size if max_size is None else max_size
+        digest = hashlib.sha256()
+        size = 0
+        buffer = await run_in_threadpool(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > limit:
+                    raise FileTooLargeException(self.max_size)
+                await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+        except BaseException:
+            await run_in_threadpool(buffer.close)
+            await run_in_threadpool(os.remove, tmp_path)
+            raise
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, tmp_path, file_path)
+        return digest.hexdigest(), size
+
+def _upload_filename(filename: Optional[str]) -> str:
+    # Clients may omit the name or send a whole path; only the last component is stored
+    name = os.path.basename(filename or "")
+    if not name:
+        raise InvalidUploadException("Upload has no file name")
+    return name
+
+def _staging_path(project_dir: str, filename: str) -> str:
+    # Unique per upload, so concurrent uploads of one file name never swap contents
+    return os.path.join(project_dir, f"{uuid.uuid4().hex}-{os.path.basename(filename)}")
+
+def _temp_path(file_path: str) -> str:
+    return f"{file_path}.{uuid.uuid4().hex}.part"
+
+def _write_chunk(buffer, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
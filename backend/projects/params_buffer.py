@@ -0,0 +1,156 @@
+import asyncio
+import copy
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import models
+import schemas
+from database import AsyncSessionLocal
+from .repo import AsyncProjectRepository
+
+def json_merge_patch(target: Any, patch: Any) -> Any:
+    """RFC 7386: objects merge recursively, null removes a key, anything else replaces."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = json_merge_patch(result.get(key), value)
+    return result
+
+@dataclass
+class _Entry:
+    owner_id: str
+    production_params: Optional[Dict[str, Any]]
+    calculated_results: Optional[Dict[str, Any]]
+    version: int
+    # Version currently stored in the database; flushes are conditional on it
+    db_version: int
+    touched_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.db_version
+
+class ParamsWriteBuffer:
+    """Write-behind buffer for production_params autosaves.
+
+    Patches are applied in memory and each dirty project is written at most once per
+    ``interval``. Version numbers are claimed in the database (see ProjectService), so they are
+    unique across API processes; a flush only succeeds while its version is still the newest
+    claimed one. Otherwise a PUT superseded it: the buffered state is dropped and logged, and
+    the client learns about it from the 409 its next patch gets. A patch that reaches another
+    process than the one buffering its base version waits for that flush (ProjectService).
+    """
+
+    def __init__(self, interval: float, idle_seconds: float):
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[str, _Entry] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get(self, project_id: str, owner_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(project_id)
+        return entry if entry is not None and entry.owner_id == owner_id else None
+
+    def load(self, project: models.Project) -> _Entry:
+        entry = _Entry(
+            owner_id=project.owner_id,
+            production_params=project.production_params,
+            calculated_results=project.calculated_results,
+            version=project.params_version or 0,
+            db_version=project.params_version or 0,
+        )
+        self._entries[project.id] = entry
+        return entry
+
+    def apply(self, project_id: str, entry: _Entry, patch: schemas.ProjectParamsPatch, version: int) -> schemas.ProjectParamsState:
+        """Applies a patch made against the entry's version; ``version`` is the one claimed for it."""
+        if patch.production_params is not None:
+            entry.production_params = json_merge_patch(entry.production_params, patch.production_params)
+        if patch.calculated_results is not None:
+            entry.calculated_results = json_merge_patch(entry.calculated_results, patch.calculated_results)
+        entry.version = version
+        entry.touched_at = time.monotonic()
+        return self.state(project_id, entry)
+
+    def discard(self, project_id: str) -> None:
+        self._entries.pop(project_id, None)
+
+    def overlay(self, project: schemas.Project) -> schemas.Project:
+        # Reads must see saves that have not been flushed yet
+        entry = self._entries.get(project.id)
+        if entry is None or not entry.dirty:
+            return project
+        return project.model_copy(update={
+            "production_params": entry.production_params,
+            "calculated_results": entry.calculated_results,
+            "params_version": entry.version,
+        })
+
+    def pending_version(self, project_id: str) -> Optional[int]:
+        """params_version of buffered state not yet in the database, if any."""
+        entry = self._entries.get(project_id)
+        return entry.version if entry is not None and entry.dirty else None
+
+    @staticmethod
+    def state(project_id: str, entry: _Entry) -> schemas.ProjectParamsState:
+        return schemas.ProjectParamsState(
+            id=project_id,
+            version=entry.version,
+            production_params=entry.production_params,
+            calculated_results=entry.calculated_results,
+        )
+
+    async def flush(self) -> None:
+        # Snapshot first: patches keep landing on the entries while the writes are awaited
+        pending = {
+            project_id: (entry, entry.db_version, entry.version, copy.deepcopy(entry.production_params), copy.deepcopy(entry.calculated_results))
+            for project_id, entry in self._entries.items() if entry.dirty
+        }
+        if pending:
+            async with AsyncSessionLocal() as db:
+                repository = AsyncProjectRepository(db)
+                written = await repository.write_params_batch([
+                    (project_id, version, production_params, calculated_results)
+                    for project_id, (_, _, version, production_params, calculated_results) in pending.items()
+                ])
+            for project_id, (entry, db_version, version, _, _) in pending.items():
+                if project_id in written:
+                    entry.db_version = version
+                    continue
+                # Superseded by a full replace (or the project was deleted)
+                print(f"Dropped buffered params of project {project_id}: versions {db_version + 1}..{version} were superseded")
+                if self._entries.get(project_id) is entry:
+                    del self._entries[project_id]
+        self._evict_idle()
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_seconds
+        for project_id in [pid for pid, entry in self._entries.items() if not entry.dirty and entry.touched_at < cutoff]:
+            del self._entries[project_id]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Params flush failed: {e}")
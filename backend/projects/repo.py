@@ -1,7 +1,12 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 import models
 import schemas
+from config import settings
 from exceptions import DatabaseException
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -20,12 +25,84 @@ class ProjectRepository:
             self.db.rollback()
             raise DatabaseException("Failed to create project", details=str(e))
 
-    def get_projects(self, user_id: str, skip: int = 0, limit: int = 100) -> List[models.Project]:
-        return self.db.query(models.Project).filter(models.Project.owner_id == user_id).offset(skip).limit(limit).all()
+    def get_projects(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        file_status: Optional[str] = None,
+        title_prefix: Optional[str] = None,
+    ) -> List[Any]:
+        return self.db.execute(_project_list_query(user_id, limit, after, file_status, title_prefix)).all()
 
     def get_project(self, project_id: str, user_id: str) -> Optional[models.Project]:
         return self.db.query(models.Project).filter(models.Project.id == project_id, models.Project.owner_id == user_id).first()
 
+    def get_mesh_analysis(self, content_hash: str) -> Optional[models.MeshAnalysis]:
+        return self.db.query(models.MeshAnalysis).filter(models.MeshAnalysis.content_hash == content_hash).first()
+
+    def count_projects_by_file_hash(self, content_hash: str) -> int:
+        return self.db.query(models.Project).filter(models.Project.file_hash == content_hash).count()
+
+    def count_quotable_projects(self) -> int:
+        return self.db.query(models.Project).filter(models.Project.volume_mm3.isnot(None)).count()
+
+    def iter_quote_inputs(self, batch_size: int) -> Iterator[List[Any]]:
+        # Keyset pagination on the primary key: each batch is an indexed range scan, and only
+        # the columns needed for pricing are loaded (plain rows, nothing kept in the identity map)
+        last_id = None
+        while True:
+            query = self.db.query(models.Project.id, models.Project.volume_mm3, models.Project.production_params).filter(models.Project.volume_mm3.isnot(None))
+            if last_id is not None:
+                query = query.filter(models.Project.id > last_id)
+            rows = query.order_by(models.Project.id).limit(batch_size).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+
+    def unnest_saved_params(self, batch_size: int = 1000) -> int:
+        """Flattens production_params saved by the old PUT /params; returns how many rows changed.
+
+        It stored the whole request body, so the editor state sat under a nested
+        "production_params" key; every writer now stores the editor state itself.
+        """
+        fixed = 0
+        last_id = None
+        while True:
+            query = self.db.query(models.Project.id, models.Project.production_params).filter(models.Project.production_params.isnot(None))
+            if last_id is not None:
+                query = query.filter(models.Project.id > last_id)
+            rows = query.order_by(models.Project.id).limit(batch_size).all()
+            if not rows:
+                return fixed
+            updates = [
+                {"id": row.id, "production_params": row.production_params.get("production_params")}
+                for row in rows if _is_put_body(row.production_params)
+            ]
+            if updates:
+                self._bulk_update(updates, "Failed to migrate project params")
+                fixed += len(updates)
+            last_id = rows[-1].id
+
+    def get_projects_by_ids(self, project_ids: List[str], user_id: str) -> List[models.Project]:
+        return self.db.query(models.Project).filter(models.Project.id.in_(project_ids), models.Project.owner_id == user_id).all()
+
+    def bulk_update_calculated_results(self, updates: List[Dict[str, Any]]) -> None:
+        self._bulk_update(updates, "Failed to update project results")
+
+    def bulk_update_ai_texts(self, updates: List[Dict[str, Any]]) -> None:
+        self._bulk_update(updates, "Failed to update project AI texts")
+
+    def _bulk_update(self, updates: List[Dict[str, Any]], error_message: str) -> None:
+        # Executemany UPDATE by primary key, committed once per batch
+        try:
+            self.db.execute(update(models.Project), updates)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            raise DatabaseException(error_message, details=str(e))
+
     def update_project(self, project: models.Project) -> models.Project:
         try:
             self.db.commit()
@@ -42,3 +119,193 @@ class ProjectRepository:
         except SQLAlchemyError as e:
             self.db.rollback()
             raise DatabaseException("Failed to delete project", details=str(e))
+
+
+def _is_put_body(production_params: Any) -> bool:
+    return (
+        isinstance(production_params, dict)
+        and "production_params" in production_params
+        and set(production_params) <= {"production_params", "calculated_results"}
+    )
+
+def _project_list_query(
+    user_id: str,
+    limit: int,
+    after: Optional[Tuple[datetime, str]],
+    file_status: Optional[str],
+    title_prefix: Optional[str],
+):
+    # Newest first, keyset on (created_at, id); only the list columns are selected
+    Project = models.Project
+    query = select(
+        Project.id,
+        Project.title,
+        Project.client_name,
+        Project.created_at,
+        Project.updated_at,
+        Project.file_status,
+        Project.volume_mm3,
+        Project.calculated_results["finalBatchPrice"].as_float().label("total_price"),
+    ).where(Project.owner_id == user_id)
+    if file_status is not None:
+        query = query.where(Project.file_status == file_status)
+    if title_prefix:
+        query = query.where(Project.title.startswith(title_prefix, autoescape=True))
+    if after is not None:
+        created_at, project_id = after
+        query = query.where(or_(
+            Project.created_at < created_at,
+            and_(Project.created_at == created_at, Project.id < project_id),
+        ))
+    return query.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit)
+
+class AsyncProjectRepository:
+    """AsyncSession counterpart of ProjectRepository used by the API routes.
+
+    Each write is a single commit of state the caller already loaded.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_project(self, project_data: schemas.ProjectCreate, user_id: str) -> models.Project:
+        try:
+            db_project = models.Project(**project_data.model_dump(), owner_id=user_id)
+            self.db.add(db_project)
+            await self.db.commit()
+            return db_project
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to create project", details=str(e))
+
+    async def get_projects(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        file_status: Optional[str] = None,
+        title_prefix: Optional[str] = None,
+    ) -> List[Any]:
+        result = await self.db.execute(_project_list_query(user_id, limit, after, file_status, title_prefix))
+        return result.all()
+
+    async def get_project(self, project_id: str, user_id: str) -> Optional[models.Project]:
+        return await self.db.scalar(select(models.Project).where(models.Project.id == project_id, models.Project.owner_id == user_id))
+
+    async def get_mesh_analysis(self, content_hash: str) -> Optional[models.MeshAnalysis]:
+        return await self.db.scalar(select(models.MeshAnalysis).where(models.MeshAnalysis.content_hash == content_hash))
+
+    async def count_projects_by_file_hash(self, content_hash: str) -> int:
+        count = await self.db.scalar(select(func.count()).select_from(models.Project).where(models.Project.file_hash == content_hash))
+        # End the read transaction so the next count sees references committed since (SQLite
+        # would otherwise keep answering from the same snapshot)
+        await self.db.commit()
+        return count
+
+    async def refresh_project(self, project: models.Project) -> models.Project:
+        # End the read transaction first, so the reload sees what other processes committed since
+        await self.db.commit()
+        await self.db.refresh(project)
+        return project
+
+    async def update_project(self, project: models.Project) -> models.Project:
+        # Sessions don't expire on commit and every column default is client-side, so the
+        # in-memory state is already what was written; no refresh SELECT is needed
+        try:
+            await self.db.commit()
+            return project
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to update project", details=str(e))
+
+    async def replace_params(self, project: models.Project, production_params: Any, calculated_results: Any) -> models.Project:
+        """Full params replace; takes the next version after every one handed out so far.
+
+        The version is computed in the UPDATE itself, so a concurrent claim can't be given the
+        same number, and RETURNING brings it back without a refresh SELECT.
+        """
+        Project = models.Project
+        values = {
+            "production_params": production_params,
+            "params_version": Project.params_claimed_version + 1,
+            "params_claimed_version": Project.params_claimed_version + 1,
+        }
+        if calculated_results is not None:
+            values["calculated_results"] = calculated_results
+        try:
+            result = await self.db.execute(
+                update(Project)
+                .where(Project.id == project.id)
+                .values(**values)
+                .returning(Project.params_version, Project.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            version, updated_at = result.one()
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to update project", details=str(e))
+        committed = {"production_params": production_params, "params_version": version, "params_claimed_version": version, "updated_at": updated_at}
+        if calculated_results is not None:
+            committed["calculated_results"] = calculated_results
+        for key, value in committed.items():
+            set_committed_value(project, key, value)
+        return project
+
+    async def claim_params_version(self, project_id: str, version: int, buffered: bool) -> Optional[int]:
+        """Hands out the next version if ``version`` is still the newest one, else returns None.
+
+        ``buffered`` says the caller holds the params of ``version`` in memory. Otherwise they
+        must also be what the row stores, unless the claim that got ahead of them is abandoned;
+        numbers handed out by an abandoned claim are skipped, never reused.
+        """
+        Project = models.Project
+        condition = Project.params_claimed_version == version
+        if not buffered:
+            stale = datetime.utcnow() - timedelta(seconds=settings.params_claim_timeout_seconds)
+            condition = and_(Project.params_version == version, or_(condition, Project.updated_at < stale))
+        try:
+            result = await self.db.execute(
+                update(Project)
+                .where(Project.id == project_id, condition)
+                .values(params_claimed_version=Project.params_claimed_version + 1)
+                .returning(Project.params_claimed_version)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = result.scalar_one_or_none()
+            await self.db.commit()
+            return claimed
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to save project params", details=str(e))
+
+    async def write_params_batch(self, rows: List[Tuple[str, int, Any, Any]]) -> Set[str]:
+        """Writes (id, version, params, results) rows in one transaction.
+
+        Each UPDATE only applies while ``version`` is still the newest claimed one; returns the
+        ids written.
+        """
+        Project = models.Project
+        written: Set[str] = set()
+        try:
+            for project_id, version, production_params, calculated_results in rows:
+                result = await self.db.execute(
+                    update(Project)
+                    .where(Project.id == project_id, Project.params_claimed_version == version)
+                    .values(production_params=production_params, calculated_results=calculated_results, params_version=version)
+                )
+                if result.rowcount:
+                    written.add(project_id)
+            await self.db.commit()
+            return written
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to save project params", details=str(e))
+
+    async def delete_project(self, project: models.Project) -> None:
+        try:
+            await self.db.delete(project)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise DatabaseException("Failed to delete project", details=str(e))
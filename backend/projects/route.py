@@ -1,74 +1,301 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from fastapi.responses import Response as RawResponse
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, Request, Path, Query
+from fastapi.responses import FileResponse, Response as RawResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import json
+import os
+import time
 
 import models, schemas
-from database import get_db
-from auth.route import get_current_user
+from database import AsyncSessionLocal, get_async_db
+from auth.cache import UserSnapshot
+from auth.route import get_current_user, get_current_admin
+from config import settings
+from exceptions import TaskNotFoundException, ThumbnailNotReadyException
+from mesh.thumbnail import thumbnail_etag, thumbnail_path
+from .delivery import etag_matches
+from .events import event_hub, status_event
 from .file_service import FileService
-from .repo import ProjectRepository
+from .params_buffer import ParamsWriteBuffer
+from .repo import AsyncProjectRepository
 from .service import ProjectService
 
 
 router = APIRouter(prefix="/projects", tags=["projects"])
+SSE_KEEPALIVE_SECONDS = 15
+# Missing thumbnails are queued at most this often per file, however often the dashboard asks
+THUMBNAIL_REQUEUE_SECONDS = 60
+_thumbnail_requests: Dict[str, float] = {}
 file_service = FileService()
+params_buffer = ParamsWriteBuffer(settings.params_flush_interval_seconds, settings.params_buffer_idle_seconds)
 
-def get_project_service(db: Session = Depends(get_db)):
-    repository = ProjectRepository(db)
-    return ProjectService(repository)
+def get_project_service(db: AsyncSession = Depends(get_async_db)):
+    repository = AsyncProjectRepository(db)
+    return ProjectService(repository, file_service, params_buffer)
 
 @router.post("/", response_model=schemas.Project)
-def create_project(project: schemas.ProjectCreate, project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    return project_service.create_project(project, current_user.id)
+async def create_project(project: schemas.ProjectCreate, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    return await project_service.create_project(project, current_user.id)
 
-@router.get("/", response_model=List[schemas.Project])
-def read_projects(skip: int = 0, limit: int = 100, project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    return project_service.get_projects(current_user.id, skip, limit)
+@router.get("/", response_model=schemas.ProjectPage)
+async def read_projects(request: Request, response: RawResponse, limit: int = Query(100, ge=1, le=500), cursor: Optional[str] = None, file_status: Optional[str] = None, title: Optional[str] = None, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    rows, next_cursor = await project_service.get_project_rows(current_user.id, limit, cursor, file_status, title)
+    etag = project_service.page_etag(rows, next_cursor)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return RawResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    response.headers.update({"ETag": etag, "Cache-Control": "private, no-cache"})
+    return project_service.build_page(rows, next_cursor)
+
+@router.post("/admin/requote", response_model=schemas.BackgroundJob, status_code=202)
+async def start_requote(current_user: UserSnapshot = Depends(get_current_admin)):
+    from worker import requote_projects
+    task = await run_in_threadpool(requote_projects.delay)
+    return schemas.BackgroundJob(task_id=task.id, state=task.state)
+
+@router.get("/admin/requote/{task_id}", response_model=schemas.BackgroundJob)
+async def read_requote(task_id: str, current_user: UserSnapshot = Depends(get_current_admin)):
+    from worker import celery_app
+    return await run_in_threadpool(_read_task, celery_app, task_id)
+
+def _read_task(celery_app, task_id: str) -> schemas.BackgroundJob:
+    # Result backend lookups are blocking Redis calls
+    result = celery_app.AsyncResult(task_id)
+    progress = result.info if isinstance(result.info, dict) else None
+    return schemas.BackgroundJob(task_id=task_id, state=result.state, progress=progress)
+
+@router.post("/ai-batch", response_model=schemas.BackgroundJob, status_code=202)
+async def start_ai_batch(request: schemas.AIBatchRequest, current_user: UserSnapshot = Depends(get_current_user)):
+    from worker import enqueue_owned, generate_ai_batch
+    task = await run_in_threadpool(enqueue_owned, generate_ai_batch, current_user.id, request.project_ids, current_user.id, request.lang)
+    return schemas.BackgroundJob(task_id=task.id, state=task.state)
+
+@router.get("/ai-batch/{task_id}", response_model=schemas.BackgroundJob)
+async def read_ai_batch(task_id: str, current_user: UserSnapshot = Depends(get_current_user)):
+    from worker import celery_app
+    await _check_task_owner(task_id, current_user.id)
+    return await run_in_threadpool(_read_task, celery_app, task_id)
+
+async def _check_task_owner(task_id: str, owner: str) -> None:
+    # Celery answers for any id, including other users' and admin tasks, so unknown or
+    # foreign ids look the same
+    from worker import task_owner
+    if await run_in_threadpool(task_owner, task_id) != owner:
+        raise TaskNotFoundException(task_id)
 
 @router.get("/{project_id}", response_model=schemas.Project)
-def read_project(project_id: str, project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    return project_service.get_project(project_id, current_user.id)
+async def read_project(request: Request, response: RawResponse, project_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    project = await project_service.get_project(project_id, current_user.id)
+    # Revalidation is answered from the row's version alone, before anything is serialized
+    etag = project_service.project_etag(project)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return RawResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    response.headers.update({"ETag": etag, "Cache-Control": "private, no-cache"})
+    return params_buffer.overlay(schemas.Project.model_validate(project))
+
+@router.get("/{project_id}/thumbnail")
+async def read_project_thumbnail(request: Request, project_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    project = await project_service.get_project(project_id, current_user.id)
+    if project.file_status != "ready" or not project.file_hash:
+        raise ThumbnailNotReadyException(project_id)
+
+    # The PNG is a pure function of the file content, so the ETag needs no disk read
+    etag = thumbnail_etag(project.file_hash, settings.thumbnail_size)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return RawResponse(status_code=304, headers=headers)
+
+    path = thumbnail_path(project.file_path)
+    if not os.path.exists(path):
+        # Analyses served from cache never reached the worker; render on first request
+        if time.monotonic() - _thumbnail_requests.get(project.file_hash, -THUMBNAIL_REQUEUE_SECONDS) >= THUMBNAIL_REQUEUE_SECONDS:
+            if len(_thumbnail_requests) > 10_000:
+                _thumbnail_requests.clear()
+            _thumbnail_requests[project.file_hash] = time.monotonic()
+            from worker import render_project_thumbnail
+            await run_in_threadpool(render_project_thumbnail.delay, project.id)
+        raise ThumbnailNotReadyException(project_id)
+    return FileResponse(path, media_type="image/png", headers=headers)
 
 @router.put("/{project_id}", response_model=schemas.Project)
-def update_project(project_id: str, updates: schemas.ProjectUpdate, project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    return project_service.update_project_details(project_id, current_user.id, updates)
+async def update_project(project_id: str, updates: schemas.ProjectUpdate, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    return await project_service.update_project_details(project_id, current_user.id, updates)
 
 @router.delete("/{project_id}", status_code=204)
-def delete_project(project_id: str, project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    project_service.delete_project(project_id, current_user.id)
+async def delete_project(project_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    await project_service.delete_project(project_id, current_user.id)
     return RawResponse(status_code=204)
 
 @router.put("/{project_id}/params", response_model=schemas.Project)
-def update_project_params(project_id: str, params: schemas.ProjectUpdateParams, project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    return project_service.update_project_params(project_id, current_user.id, params)
+async def update_project_params(project_id: str, params: schemas.ProjectUpdateParams, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    return await project_service.update_project_params(project_id, current_user.id, params)
+
+@router.patch("/{project_id}/params", response_model=schemas.ProjectParamsState)
+async def patch_project_params(project_id: str, patch: schemas.ProjectParamsPatch, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    return await project_service.patch_project_params(project_id, current_user.id, patch)
+
+@router.post("/{project_id}/quote-matrix", response_model=schemas.QuoteMatrix)
+async def quote_matrix(project_id: str, request: schemas.QuoteMatrixRequest, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    return await project_service.quote_matrix(project_id, current_user.id, request)
+
+@router.get("/{project_id}/events")
+async def stream_project_events(request: Request, project_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    """Server-sent processing status; replaces polling GET /{id} while a file is processing."""
+    # Subscribe before reading the current status so a transition in between isn't missed
+    queue = event_hub.open(project_id)
+    try:
+        project = await project_service.get_project(project_id, current_user.id)
+    except Exception:
+        event_hub.close(project_id, queue)
+        raise
+    return StreamingResponse(
+        _project_event_stream(request, project_id, queue, status_event(project)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _project_event_stream(request: Request, project_id: str, queue: asyncio.Queue, initial: Dict[str, Any]) -> AsyncIterator[str]:
+    try:
+        event = initial
+        while True:
+            if event is not None:
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
+                # Terminal states close the stream; the client refetches the project once
+                if event.get("status") != "processing":
+                    return
+            if await request.is_disconnected():
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                event = None
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+    finally:
+        event_hub.close(project_id, queue)
 
 @router.post("/{project_id}/upload", response_model=schemas.Project)
-async def upload_file(project_id: str, file: UploadFile = File(...), project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
+async def upload_file(project_id: str, file: UploadFile = File(...), project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
     # Verify project exists first
-    project_service.get_project(project_id, current_user.id)
+    project = await project_service.get_project(project_id, current_user.id)
     
-    # Save the file
-    file_path = await file_service.save_upload_file(file, project_id)
+    # Stream the file to disk in bounded chunks
+    stored_file = await file_service.save_upload_file(file, project_id)
     
     # Update the database
-    updated_project = project_service.set_project_file(project_id, current_user.id, file_path)
-    
-    # Import and trigger Celery task directly to avoid circular imports at module level
-    from worker import process_3d_file
-    process_3d_file.delay(updated_project.id)
-    
+    updated_project = await project_service.set_project_file(project, stored_file)
+    await _queue_processing(updated_project)
     return updated_project
 
-@router.post("/{project_id}/generate-ai", response_model=schemas.Project)
-def generate_project_ai(project_id: str, lang: str = "en", project_service: ProjectService = Depends(get_project_service), current_user: models.User = Depends(get_current_user)):
-    project = project_service.get_project(project_id, current_user.id)
-        
-    from ai.service import AIService
-    ai_service = AIService()
-    description, commercial_text = ai_service.generate_ai_texts(project, lang)
-    
-    if description:
-        return project_service.update_ai_texts(project_id, current_user.id, description, commercial_text)
-    
-    return project
+@router.post("/{project_id}/uploads", response_model=schemas.MultipartUpload)
+async def create_multipart_upload(project_id: str, upload: schemas.MultipartUploadCreate, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    await project_service.get_project(project_id, current_user.id)
+    return await file_service.create_multipart_upload(project_id, upload.filename)
+
+@router.get("/{project_id}/uploads/{upload_id}", response_model=schemas.MultipartUpload)
+async def read_multipart_upload(project_id: str, upload_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    await project_service.get_project(project_id, current_user.id)
+    return await file_service.get_multipart_upload(project_id, upload_id)
+
+@router.put("/{project_id}/uploads/{upload_id}/parts/{part_number}", response_model=schemas.UploadPart)
+async def upload_part(request: Request, project_id: str, upload_id: str, part_number: int = Path(..., ge=1, le=10000), project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    # Raw request body is streamed straight to the part file
+    await project_service.get_project(project_id, current_user.id)
+    return await file_service.save_upload_part(project_id, upload_id, part_number, request.stream())
+
+@router.post("/{project_id}/uploads/{upload_id}/complete", response_model=schemas.Project)
+async def complete_multipart_upload(project_id: str, upload_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    project = await project_service.get_project(project_id, current_user.id)
+    stored_file = await file_service.complete_multipart_upload(project_id, upload_id)
+    updated_project = await project_service.set_project_file(project, stored_file)
+    await _queue_processing(updated_project)
+    return updated_project
+
+async def _queue_processing(project: models.Project):
+    # Duplicate content is resolved from the analysis cache and never reaches the worker
+    if project.file_status != "processing":
+        return
+    # Import and trigger Celery task directly to avoid circular imports at module level
+    from worker import enqueue_processing
+    await run_in_threadpool(enqueue_processing, project.id, project.file_path)
+
+@router.post("/{project_id}/generate-ai", response_model=schemas.AIJob, status_code=202)
+async def generate_project_ai(project_id: str, lang: str = "en", project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    project = await project_service.get_project(project_id, current_user.id)
+
+    from ai.cache import ai_cache
+    from ai.service import ai_service
+    prompt = ai_service.build_prompt(project, lang)
+    if prompt is None:
+        return schemas.AIJob(state="SUCCESS", project=project)
+
+    # Identical prompts are answered from cache without touching the worker; only
+    # completions with a description are cached, so a miss always means a fresh try
+    cached = await run_in_threadpool(ai_cache.get, prompt.cache_key)
+    if cached is not None:
+        project = await project_service.update_ai_texts(project, *cached)
+        return schemas.AIJob(state="SUCCESS", project=project)
+
+    from worker import enqueue_owned, generate_project_ai as generate_project_ai_task
+    task = await run_in_threadpool(enqueue_owned, generate_project_ai_task, project.id, project.id, lang)
+    return schemas.AIJob(task_id=task.id, state=task.state)
+
+@router.get("/{project_id}/generate-ai-stream")
+async def stream_project_ai(project_id: str, lang: str = "en", project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    """Server-sent AI texts: description and pitch deltas as the model writes them, then the saved project."""
+    project = await project_service.get_project(project_id, current_user.id)
+
+    from ai.service import ai_service
+    prompt = ai_service.build_prompt(project, lang)
+    return StreamingResponse(
+        _ai_event_stream(project_id, current_user.id, prompt),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _ai_event_stream(project_id: str, user_id: str, prompt) -> AsyncIterator[str]:
+    from ai.cache import ai_cache
+    from ai.service import ai_service
+    from ai.stream import AIResponseParser
+    from exceptions import AppException
+
+    try:
+        texts = None
+        if prompt is not None:
+            texts = await run_in_threadpool(ai_cache.get, prompt.cache_key)
+            if texts is not None:
+                description, commercial_text = texts
+                yield _sse("description", {"delta": description})
+                if commercial_text:
+                    yield _sse("pitch", {"delta": commercial_text})
+            else:
+                parser = AIResponseParser()
+                async for delta in ai_service.stream_completion(prompt):
+                    for section, text in parser.feed(delta):
+                        yield _sse(section, {"delta": text})
+                texts = parser.result()
+                await run_in_threadpool(ai_cache.set, prompt.cache_key, texts)
+
+        # The request's session is gone by now, so the texts are saved on a fresh one
+        async with AsyncSessionLocal() as db:
+            project_service = ProjectService(AsyncProjectRepository(db), file_service, params_buffer)
+            project = await project_service.get_project(project_id, user_id)
+            if texts is not None and texts[0]:
+                project = await project_service.update_ai_texts(project, *texts)
+            yield _sse("done", schemas.Project.model_validate(project).model_dump(mode="json"))
+    except AppException as e:
+        yield _sse("ai_error", {"error_code": e.error_code, "message": e.message})
+
+@router.get("/{project_id}/generate-ai/{task_id}", response_model=schemas.AIJob)
+async def read_ai_job(project_id: str, task_id: str, project_service: ProjectService = Depends(get_project_service), current_user: UserSnapshot = Depends(get_current_user)):
+    from worker import celery_app
+    # The task must be this project's; get_project below checks the project is the user's
+    await _check_task_owner(task_id, project_id)
+    state = await run_in_threadpool(lambda: celery_app.AsyncResult(task_id).state)
+    # The task writes the texts straight to the row, so reading it after the state is enough
+    project = await project_service.get_project(project_id, current_user.id)
+    return schemas.AIJob(task_id=task_id, state=state, project=project if state == "SUCCESS" else None)
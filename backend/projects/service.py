@@ -1,59 +1,218 @@
+import asyncio
+import base64
+import hashlib
 import os
 import shutil
+import time
+from datetime import datetime
+import numpy as np
 import models
 import schemas
-from exceptions import ProjectNotFoundException
-from .repo import ProjectRepository
+from config import settings
+from exceptions import InvalidCursorException, ProjectNotFoundException, ProjectNotReadyException, VersionConflictException
+from pricing import engine as pricing
+from starlette.concurrency import run_in_threadpool
+from mesh.lod import preview_assets_exist
+from .file_service import FileService, StoredFile
+from .params_buffer import ParamsWriteBuffer
+from .repo import AsyncProjectRepository
 
-from typing import List
+from typing import Optional, Tuple
+
+# How often a patch re-reads the row while another API process flushes the version it is based on
+FLUSH_POLL_SECONDS = 0.1
 
 class ProjectService:
-    def __init__(self, repository: ProjectRepository):
+    # Write paths load the project once, mutate it and commit once. Methods that take a
+    # models.Project expect the caller to have loaded it (and checked ownership) already.
+    def __init__(self, repository: AsyncProjectRepository, file_service: Optional[FileService] = None, params_buffer: Optional[ParamsWriteBuffer] = None):
         self.repository = repository
+        self.file_service = file_service or FileService()
+        self.params_buffer = params_buffer
+
+    async def create_project(self, project_data: schemas.ProjectCreate, user_id: str) -> models.Project:
+        return await self.repository.create_project(project_data, user_id)
+
+    async def get_projects(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        file_status: Optional[str] = None,
+        title_prefix: Optional[str] = None,
+    ) -> schemas.ProjectPage:
+        return self.build_page(*await self.get_project_rows(user_id, limit, cursor, file_status, title_prefix))
+
+    async def get_project_rows(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        file_status: Optional[str] = None,
+        title_prefix: Optional[str] = None,
+    ) -> Tuple[list, Optional[str]]:
+        """Raw list rows and the next cursor, so callers can validate caches before building the page."""
+        after = self._decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to know whether another page exists
+        rows = await self.repository.get_projects(user_id, limit + 1, after, file_status, title_prefix)
+        items = rows[:limit]
+        next_cursor = self._encode_cursor(items[-1]) if len(rows) > limit else None
+        return items, next_cursor
+
+    @staticmethod
+    def build_page(rows: list, next_cursor: Optional[str]) -> schemas.ProjectPage:
+        return schemas.ProjectPage(
+            items=[schemas.ProjectListItem.model_validate(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    @staticmethod
+    def page_etag(rows: list, next_cursor: Optional[str]) -> str:
+        digest = hashlib.sha1(next_cursor.encode() if next_cursor else b"")
+        for row in rows:
+            digest.update(f"{row.id}:{_version_stamp(row.updated_at or row.created_at)}".encode())
+        return f'"{digest.hexdigest()}"'
 
-    def create_project(self, project_data: schemas.ProjectCreate, user_id: str) -> models.Project:
-        return self.repository.create_project(project_data, user_id)
+    def project_etag(self, project: models.Project) -> str:
+        # Unflushed autosaves are part of what GET returns, so they are part of the validator
+        pending = self.params_buffer.pending_version(project.id) if self.params_buffer is not None else None
+        return f'"{project.id}-{_version_stamp(project.updated_at or project.created_at)}-{pending if pending is not None else project.params_version}"'
 
-    def get_projects(self, user_id: str, skip: int = 0, limit: int = 100) -> List[models.Project]:
-        return self.repository.get_projects(user_id, skip, limit)
+    @staticmethod
+    def _encode_cursor(row) -> str:
+        raw = f"{row.created_at.isoformat()}|{row.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
 
-    def get_project(self, project_id: str, user_id: str) -> models.Project:
-        project = self.repository.get_project(project_id, user_id)
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        try:
+            created_at, project_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            return datetime.fromisoformat(created_at), project_id
+        except ValueError:
+            raise InvalidCursorException()
+
+    async def get_project(self, project_id: str, user_id: str) -> models.Project:
+        project = await self.repository.get_project(project_id, user_id)
         if project is None:
             raise ProjectNotFoundException(project_id)
         return project
 
-    def update_project_params(self, project_id: str, user_id: str, params: schemas.ProjectUpdateParams) -> models.Project:
-        project = self.get_project(project_id, user_id)
-        project.production_params = params.model_dump()
-        if params.calculated_results is not None:
-            project.calculated_results = params.calculated_results
-            
-        return self.repository.update_project(project)
-
-    def set_project_file(self, project_id: str, user_id: str, file_path: str) -> models.Project:
-        project = self.get_project(project_id, user_id)
-        project.file_path = file_path
-        project.file_status = "processing"
-        return self.repository.update_project(project)
-
-    def update_ai_texts(self, project_id: str, user_id: str, description: str, commercial_text: str) -> models.Project:
-        project = self.get_project(project_id, user_id)
+    async def update_project_params(self, project_id: str, user_id: str, params: schemas.ProjectUpdateParams) -> models.Project:
+        project = await self.get_project(project_id, user_id)
+        # A full replace supersedes any buffered autosave, in this process or another: it takes
+        # a version past every claimed one, so their flushes and next patches fail
+        if self.params_buffer is not None:
+            self.params_buffer.discard(project_id)
+        return await self.repository.replace_params(project, params.production_params, params.calculated_results)
+
+    async def patch_project_params(self, project_id: str, user_id: str, patch: schemas.ProjectParamsPatch) -> schemas.ProjectParamsState:
+        # Each patch claims its version with one small conditional UPDATE, so versions agree
+        # across API processes; the params themselves are written behind by the buffer
+        entry = self.params_buffer.get(project_id, user_id)
+        if entry is not None and entry.version == patch.version:
+            version = await self.repository.claim_params_version(project_id, patch.version, buffered=True)
+            if version is not None:
+                return self.params_buffer.apply(project_id, entry, patch, version)
+            # A PUT moved the row since; whatever is buffered here is stale
+            self.params_buffer.discard(project_id)
+
+        project = await self._await_stored_params(await self.get_project(project_id, user_id), patch.version)
+        if patch.version != project.params_version:
+            raise VersionConflictException(project.params_version)
+        version = await self.repository.claim_params_version(project_id, patch.version, buffered=False)
+        if version is None:
+            # Newer params are still buffered by another process (or just got claimed)
+            raise VersionConflictException(project.params_version)
+        return self.params_buffer.apply(project_id, self.params_buffer.load(project), patch, version)
+
+    async def _await_stored_params(self, project: models.Project, version: int) -> models.Project:
+        """Waits, briefly, until ``version`` is stored if another API process still buffers it.
+
+        With several API processes an editor's patches can land on different ones; the patch is
+        made against params only the other process holds, and they reach the row with its next
+        flush. Versions that were never claimed, or already superseded, return at once.
+        """
+        deadline = time.monotonic() + settings.params_flush_wait_seconds
+        while project.params_version < version <= project.params_claimed_version and time.monotonic() < deadline:
+            await asyncio.sleep(FLUSH_POLL_SECONDS)
+            project = await self.repository.refresh_project(project)
+        return project
+
+    async def quote_matrix(self, project_id: str, user_id: str, request: schemas.QuoteMatrixRequest) -> schemas.QuoteMatrix:
+        project = await self.get_project(project_id, user_id)
+        if not project.volume_mm3:
+            raise ProjectNotReadyException(project_id)
+
+        base = pricing.resolve_params(request.base_params if request.base_params is not None else project.production_params)
+        columns = pricing.build_param_matrix(base, request.param_sets, request.grid, settings.quote_matrix_max_rows)
+        results = pricing.calculate_economics(columns, project.volume_mm3)
+
+        params = pricing.varying_columns(columns)
+        rows = len(next(iter(params.values()))) if params else 1
+        return schemas.QuoteMatrix(
+            rows=rows,
+            params=params,
+            results={name: np.broadcast_to(values, (rows,)).tolist() for name, values in results.items()},
+        )
+
+    async def set_project_file(self, project: models.Project, stored_file: StoredFile) -> models.Project:
+        previous = (project.file_path, project.file_hash)
+        project.file_path = stored_file.path
+        project.file_hash = stored_file.content_hash
+
+        # Identical content was analyzed before: reuse the result instead of queueing the worker
+        analysis = await self.repository.get_mesh_analysis(stored_file.content_hash)
+        # Derivatives go with the blob, so they are rebuilt if it was released in the meantime
+        if analysis is not None and preview_assets_exist(analysis.preview_assets):
+            for field in models.MESH_ANALYSIS_FIELDS:
+                setattr(project, field, getattr(analysis, field))
+            project.file_status = "ready"
+        else:
+            project.file_status = "processing"
+
+        updated_project = await self.repository.update_project(project)
+        # Now that the reference is committed no release can remove the blob anymore
+        await run_in_threadpool(self.file_service.settle_blob, stored_file)
+        if previous[1] != stored_file.content_hash:
+            await self._release_blob(*previous)
+        return updated_project
+
+    async def update_ai_texts(self, project: models.Project, description: str, commercial_text: str) -> models.Project:
         project.ai_description = description
         project.ai_commercial_text = commercial_text
-        return self.repository.update_project(project)
+        return await self.repository.update_project(project)
 
-    def update_project_details(self, project_id: str, user_id: str, updates: schemas.ProjectUpdate) -> models.Project:
-        project = self.get_project(project_id, user_id)
+    async def update_project_details(self, project_id: str, user_id: str, updates: schemas.ProjectUpdate) -> models.Project:
+        project = await self.get_project(project_id, user_id)
         update_data = updates.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(project, field, value)
-        return self.repository.update_project(project)
+        return await self.repository.update_project(project)
 
-    def delete_project(self, project_id: str, user_id: str) -> None:
-        project = self.get_project(project_id, user_id)
+    async def delete_project(self, project_id: str, user_id: str) -> None:
+        project = await self.get_project(project_id, user_id)
         # Clean up uploaded files from disk
         upload_dir = os.path.join("uploads", project_id)
         if os.path.exists(upload_dir):
-            shutil.rmtree(upload_dir, ignore_errors=True)
-        self.repository.delete_project(project)
+            await run_in_threadpool(shutil.rmtree, upload_dir, True)
+        file_path, file_hash = project.file_path, project.file_hash
+        await self.repository.delete_project(project)
+        await self._release_blob(file_path, file_hash)
+
+    async def _release_blob(self, file_path: Optional[str], file_hash: Optional[str]) -> None:
+        # Blobs are shared between projects; remove one only when nothing references it anymore
+        if not file_path or not file_hash:
+            return
+        if await self.repository.count_projects_by_file_hash(file_hash) > 0:
+            return
+        retired_path = await run_in_threadpool(self.file_service.retire_blob, file_path)
+        if retired_path is None:
+            return
+        # An identical upload may have committed a reference between the count and the move
+        if await self.repository.count_projects_by_file_hash(file_hash) > 0:
+            await run_in_threadpool(self.file_service.restore_blob, file_path, retired_path)
+        else:
+            await run_in_threadpool(self.file_service.delete_blob, file_path, retired_path)
+
+def _version_stamp(moment: Optional[datetime]) -> str:
+    return f"{int(moment.timestamp() * 1_000_000):x}" if moment else "0"
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Any, Dict
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, Any, Dict, List
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -36,6 +36,19 @@ class ProjectUpdateParams(BaseModel):
     production_params: Optional[Dict[str, Any]] = None
     calculated_results: Optional[Dict[str, Any]] = None
 
+class ProjectParamsPatch(BaseModel):
+    # params_version the client last saw
+    version: int
+    # JSON merge patches (RFC 7386) applied to the stored objects
+    production_params: Optional[Dict[str, Any]] = None
+    calculated_results: Optional[Dict[str, Any]] = None
+
+class ProjectParamsState(BaseModel):
+    id: str
+    version: int
+    production_params: Optional[Dict[str, Any]] = None
+    calculated_results: Optional[Dict[str, Any]] = None
+
 class ProjectUpdate(BaseModel):
     title: Optional[str] = None
     client_name: Optional[str] = None
@@ -55,12 +68,77 @@ class Project(ProjectBase):
     dim_x: Optional[float] = None
     dim_y: Optional[float] = None
     dim_z: Optional[float] = None
+
+    surface_area_mm2: Optional[float] = None
+    overhang_area_mm2: Optional[float] = None
+    support_volume_mm3: Optional[float] = None
+    is_watertight: Optional[bool] = None
+    shell_count: Optional[int] = None
+    preview_assets: Optional[List[Dict[str, Any]]] = None
     
     production_params: Optional[Dict[str, Any]] = None
     calculated_results: Optional[Dict[str, Any]] = None
+    params_version: int = 0
     
     ai_description: Optional[str] = None
     ai_commercial_text: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+class MultipartUploadCreate(BaseModel):
+    filename: str
+
+class MultipartUpload(BaseModel):
+    upload_id: str
+    filename: str
+    parts: List[int] = []
+
+class UploadPart(BaseModel):
+    part_number: int
+    size: int
+    content_hash: str
+
+class QuoteMatrixRequest(BaseModel):
+    # Defaults to the project's saved production_params
+    base_params: Optional[Dict[str, Any]] = None
+    # Each set overrides some base fields (e.g. density + pricePerKg for one material)
+    param_sets: List[Dict[str, float]] = []
+    # Every combination of these values is evaluated against every param set
+    grid: Dict[str, List[float]] = {}
+
+class QuoteMatrix(BaseModel):
+    rows: int
+    params: Dict[str, List[float]]
+    results: Dict[str, List[float]]
+
+class BackgroundJob(BaseModel):
+    task_id: str
+    state: str
+    progress: Optional[Dict[str, Any]] = None
+
+class AIJob(BaseModel):
+    # task_id is None when the texts were served from cache and already saved
+    task_id: Optional[str] = None
+    state: str
+    project: Optional[Project] = None
+
+class AIBatchRequest(BaseModel):
+    project_ids: List[str] = Field(..., min_length=1, max_length=1000)
+    lang: str = "en"
+
+class ProjectListItem(BaseModel):
+    id: str
+    title: str
+    client_name: Optional[str] = None
+    created_at: datetime
+    file_status: str
+    volume_mm3: Optional[float] = None
+    total_price: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class ProjectPage(BaseModel):
+    items: List[ProjectListItem]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,97 @@
+"""Login latency under a concurrent login burst, and what it does to other requests.
+
+Registers a throwaway user, then fires ``--requests`` logins from ``--concurrency`` clients at
+once against a running API while a signed-in probe keeps requesting ``GET /auth/me``. Reports latency
+percentiles for both and how many logins were turned away with 503 by the hashing pool:
+
+    uvicorn main:app --port 8000
+    python -m scripts.bench_login --url http://localhost:8000 --concurrency 200 --requests 2000
+
+Run it from backend/ so the hashing settings it prints are the server's. The probe latency
+shows whether bcrypt still competes with the rest of the API.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+from typing import List
+
+import httpx
+import numpy as np
+
+from config import settings
+
+PROBE_INTERVAL = 0.05
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+def report(name: str, latencies: List[float]) -> str:
+    ms = [latency * 1000 for latency in latencies]
+    return (
+        f"{name:<6} {len(ms):>6} {percentile(ms, 50):>8.1f}ms {percentile(ms, 95):>8.1f}ms "
+        f"{percentile(ms, 99):>8.1f}ms {max(ms, default=float('nan')):>8.1f}ms"
+    )
+
+async def login_burst(client: httpx.AsyncClient, credentials: dict, total: int, concurrency: int, latencies: List[float], statuses: Counter):
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.post("/auth/token", data=credentials)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def probe(client: httpx.AsyncClient, latencies: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/auth/me")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(PROBE_INTERVAL)
+
+async def run(args) -> None:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    credentials = {"username": email, "password": "bench-password"}
+    limits = httpx.Limits(max_connections=args.concurrency + 1, max_keepalive_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        response = await client.post("/auth/register", json={"email": email, "password": credentials["password"]})
+        response.raise_for_status()
+
+        # The probe gets its own connection and session cookie
+        prober = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        (await prober.post("/auth/token", data=credentials)).raise_for_status()
+
+        logins: List[float] = []
+        probes: List[float] = []
+        statuses: Counter = Counter()
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(prober, probes, stop))
+        started = time.perf_counter()
+        await login_burst(client, credentials, args.requests, args.concurrency, logins, statuses)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe_task
+        await prober.aclose()
+
+    print(f"{args.requests} logins from {args.concurrency} clients in {elapsed:.1f}s ({args.requests / elapsed:.1f}/s)")
+    print(f"bcrypt rounds {settings.bcrypt_rounds}, {settings.password_hash_workers} hash workers, {settings.password_hash_max_pending} max pending")
+    print(f"{'kind':<6} {'n':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    print(report("login", logins))
+    print(report("probe", probes))
+    print("status codes: " + ", ".join(f"{code} x{count}" for code, count in sorted(statuses.items())))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=200, help="logins in flight at once")
+    parser.add_argument("--requests", type=int, default=2000, help="logins in total")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Queue latency of mesh processing for a mix of small and large files.
+
+Writes random binary STL files, creates throwaway projects for them, enqueues the large ones
+first (the worst case for small files behind them) and records, from the project event
+stream, when each task started and finished. Needs Redis and workers for the mesh queues:
+
+    docker compose up -d redis worker mesh-large-worker
+    python -m scripts.bench_queue_latency --small 40 --large 2 --large-mb 500
+
+Run it from backend/ so it shares the workers' settings, database and upload directory.
+``--single-queue`` sends everything to the small-file queue, i.e. the old behaviour.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+import redis
+
+import models
+from config import settings
+from database import SessionLocal
+from projects.events import CHANNEL_PREFIX
+from worker import MESH_QUEUE, mesh_queue, process_3d_file, processing_failed
+
+BENCH_DIR = os.path.join("uploads", "bench")
+STL_RECORD = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+BLOCK_FACES = 1_000_000
+
+def write_random_stl(path: str, size_mb: float, rng: np.random.Generator) -> None:
+    faces = max(1, int((size_mb * 1024 * 1024 - 84) // STL_RECORD.itemsize))
+    with open(path, "wb") as f:
+        f.write(b"bench".ljust(80, b"\0"))
+        f.write(np.uint32(faces).tobytes())
+        for start in range(0, faces, BLOCK_FACES):
+            block = np.zeros(min(BLOCK_FACES, faces - start), dtype=STL_RECORD)
+            block["vertices"] = rng.uniform(0, 100, size=(len(block), 3, 3))
+            f.write(block.tobytes())
+
+class EventRecorder:
+    """Timestamps the first analysis event and the terminal status of each watched project."""
+
+    def __init__(self, redis_url: str, project_ids: List[str]):
+        self.watched = set(project_ids)
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+        self.status: Dict[str, str] = {}
+        self._pubsub = redis.Redis.from_url(redis_url).pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(CHANNEL_PREFIX + "*")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def done(self) -> bool:
+        return len(self.finished) == len(self.watched)
+
+    def _run(self):
+        while not self.done():
+            message = self._pubsub.get_message(timeout=1.0)
+            if message is None:
+                continue
+            now = time.monotonic()
+            event = json.loads(message["data"])
+            project_id = event.get("project_id")
+            if project_id not in self.watched:
+                continue
+            self.started.setdefault(project_id, now)
+            if event.get("status") in ("ready", "error"):
+                self.finished.setdefault(project_id, now)
+                self.status[project_id] = event["status"]
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small", type=int, default=40, help="number of small files")
+    parser.add_argument("--small-mb", type=float, default=1.0)
+    parser.add_argument("--large", type=int, default=2, help="number of large files, enqueued first")
+    parser.add_argument("--large-mb", type=float, default=float(settings.mesh_large_file_mb * 2))
+    parser.add_argument("--single-queue", action="store_true", help=f"route every file to {MESH_QUEUE!r}")
+    parser.add_argument("--timeout", type=float, default=1800.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    jobs = [("large", args.large_mb)] * args.large + [("small", args.small_mb)] * args.small
+    projects = []
+    db = SessionLocal()
+    try:
+        print(f"Writing {args.large} x {args.large_mb} MB and {args.small} x {args.small_mb} MB files...")
+        for kind, size_mb in jobs:
+            project_id = str(uuid.uuid4())
+            path = os.path.join(BENCH_DIR, f"{project_id}.stl")
+            write_random_stl(path, size_mb, rng)
+            db.add(models.Project(id=project_id, title=f"bench-{kind}", file_path=path, file_status="processing"))
+            projects.append((project_id, kind, path))
+        db.commit()
+
+        recorder = EventRecorder(settings.redis_url, [project_id for project_id, _, _ in projects])
+        enqueued = {}
+        for project_id, _, path in projects:
+            queue = MESH_QUEUE if args.single_queue else mesh_queue(path)
+            enqueued[project_id] = time.monotonic()
+            process_3d_file.apply_async((project_id,), queue=queue, link_error=processing_failed.s())
+
+        deadline = time.monotonic() + args.timeout
+        while not recorder.done() and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+        print(f"{'class':<6} {'n':>4} {'done':>5} {'wait p50':>9} {'wait p95':>9} {'wait max':>9} {'run p50':>9} {'total p95':>10}")
+        for kind in ("small", "large"):
+            ids = [project_id for project_id, job_kind, _ in projects if job_kind == kind]
+            if not ids:
+                continue
+            waits = [recorder.started[i] - enqueued[i] for i in ids if i in recorder.started]
+            runs = [recorder.finished[i] - recorder.started[i] for i in ids if i in recorder.finished]
+            totals = [recorder.finished[i] - enqueued[i] for i in ids if i in recorder.finished]
+            print(
+                f"{kind:<6} {len(ids):>4} {len(totals):>5} {percentile(waits, 50):>8.2f}s {percentile(waits, 95):>8.2f}s "
+                f"{max(waits, default=float('nan')):>8.2f}s {percentile(runs, 50):>8.2f}s {percentile(totals, 95):>9.2f}s"
+            )
+        errors = sum(1 for status in recorder.status.values() if status == "error")
+        if errors:
+            print(f"{errors} project(s) ended in error")
+    finally:
+        ids = [project_id for project_id, _, _ in projects]
+        if ids:
+            db.query(models.Project).filter(models.Project.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+        db.close()
+        for _, _, path in projects:
+            stem = os.path.splitext(path)[0]
+            for name in os.listdir(BENCH_DIR):
+                if os.path.join(BENCH_DIR, name).startswith(stem):
+                    os.remove(os.path.join(BENCH_DIR, name))
+
+if __name__ == "__main__":
+    main()
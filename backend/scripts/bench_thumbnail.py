@@ -0,0 +1,39 @@
+"""Thumbnail render time for dense meshes.
+
+Renders two side-by-side icospheres of the requested density, the thumbnail worker's worst
+case of millions of sub-pixel faces, and reports the best and median of several runs:
+
+    python -m scripts.bench_thumbnail --subdivisions 8 --size 256
+
+Run it from backend/. Subdivision 8 gives 2 x 1.3M faces; each step quadruples that.
+"""
+import argparse
+import time
+
+import numpy as np
+import trimesh
+
+from config import settings
+from mesh.thumbnail import render_thumbnail
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subdivisions", type=int, default=8)
+    parser.add_argument("--size", type=int, default=settings.thumbnail_size)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sphere = trimesh.creation.icosphere(subdivisions=args.subdivisions)
+    triangles = np.concatenate([sphere.triangles, sphere.triangles + [2.2, 0.0, 0.0]]).astype(np.float32)
+    # The first call pays for imports and allocator warm-up
+    render_thumbnail(triangles[:1000], args.size)
+
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        render_thumbnail(triangles, args.size)
+        timings.append(time.perf_counter() - started)
+    print(f"{len(triangles):,} faces at {args.size}px: best {min(timings):.2f}s, median {float(np.median(timings)):.2f}s")
+
+if __name__ == "__main__":
+    main()
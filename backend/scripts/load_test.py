@@ -0,0 +1,108 @@
+"""Request throughput of the project API with many concurrent clients.
+
+Signs in a throwaway user, creates a few projects, then runs ``--clients`` concurrent clients
+against a running API for ``--duration`` seconds. Each client loops over the dashboard list,
+a project read and, every ``--write-every`` requests, a details update. Reports requests per
+second, latency percentiles per endpoint and the error count:
+
+    uvicorn main:app --port 8000
+    python -m scripts.load_test --url http://localhost:8000 --clients 1000 --duration 30
+
+To measure the gain of the async request path, run it against this revision and against one
+with the sync routes, with the same server settings. 1000 clients need about as many open
+files on both sides (``ulimit -n``).
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+async def sign_in(client: httpx.AsyncClient) -> None:
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = "load-test-password"
+    (await client.post("/auth/register", json={"email": email, "password": password})).raise_for_status()
+    (await client.post("/auth/token", data={"username": email, "password": password})).raise_for_status()
+
+async def run_client(
+    client: httpx.AsyncClient,
+    project_ids: List[str],
+    deadline: float,
+    write_every: int,
+    offset: int,
+    latencies: Dict[str, List[float]],
+    statuses: Counter,
+):
+    n = offset
+    while time.monotonic() < deadline:
+        project_id = project_ids[n % len(project_ids)]
+        if write_every and n % write_every == 0:
+            name, request = "update", client.put(f"/projects/{project_id}", json={"notes": f"load {n}"})
+        elif n % 2:
+            name, request = "list", client.get("/projects/", params={"limit": 20})
+        else:
+            name, request = "read", client.get(f"/projects/{project_id}")
+        start = time.perf_counter()
+        try:
+            response = await request
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+            continue
+        finally:
+            n += 1
+        latencies[name].append(time.perf_counter() - start)
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        await sign_in(client)
+        project_ids = []
+        for i in range(args.projects):
+            response = await client.post("/projects/", json={"title": f"load-test {i}"})
+            response.raise_for_status()
+            project_ids.append(response.json()["id"])
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Counter = Counter()
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, project_ids, deadline, args.write_every, offset, latencies, statuses)
+            for offset in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+        for project_id in project_ids:
+            await client.delete(f"/projects/{project_id}")
+
+    total = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+    print(f"{total} requests from {args.clients} clients in {elapsed:.1f}s: {total / elapsed:.1f} req/s, {errors} errors")
+    print(f"{'endpoint':<8} {'n':>7} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for name in ("list", "read", "update"):
+        ms = [latency * 1000 for latency in latencies[name]]
+        if ms:
+            print(f"{name:<8} {len(ms):>7} {percentile(ms, 50):>8.1f}ms {percentile(ms, 95):>8.1f}ms {percentile(ms, 99):>8.1f}ms")
+    print("responses: " + ", ".join(f"{status} x{count}" for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=1000, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--projects", type=int, default=20, help="projects the clients spread over")
+    parser.add_argument("--write-every", type=int, default=10, help="every n-th request is an update; 0 for reads only")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
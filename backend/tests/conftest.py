@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+# The app reads its settings, database and upload directory at import time, so every test
+# session runs against a throwaway SQLite file in its own working directory
+_workdir = tempfile.mkdtemp(prefix="3dcalc-tests-")
+os.chdir(_workdir)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+
+# Everything below imports the app, so it must come after the environment above
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from auth.cache import UserSnapshot
+from auth.route import get_current_user
+from main import app
+from projects import route as project_route
+
+def make_user(email: str) -> UserSnapshot:
+    return UserSnapshot(id=str(uuid.uuid4()), email=email, is_active=True)
+
+@pytest.fixture
+def user():
+    return make_user("owner@example.com")
+
+@pytest.fixture
+def login():
+    """Switches the user every following request of the test client is authenticated as."""
+    def log_in(user: UserSnapshot):
+        app.dependency_overrides[get_current_user] = lambda: user
+    return log_in
+
+@pytest.fixture
+def client(monkeypatch, user, login):
+    # No worker runs in tests, so uploads are never queued for processing
+    async def queue_nothing(project):
+        pass
+
+    monkeypatch.setattr(project_route, "_queue_processing", queue_nothing)
+    login(user)
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def project_id(client):
+    return client.post("/projects/", json={"title": "Bracket"}).json()["id"]
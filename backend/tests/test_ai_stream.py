@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai.service import AIPrompt, AIService
+from ai.stream import AIResponseParser
+from config import settings
+from exceptions import AIServiceException
+
+COMPLETION = "Sturdy PLA part\n\nA compact bracket printed in PLA.\n\nReady to ship in two days.\n"
+PROMPT = AIPrompt(system="system", user="user")
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """Serves /chat/completions like the OpenAI API, in small streamed chunks or in one piece."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.completion = COMPLETION
+        self.chunk_size = 3
+        self.status = 200
+        self.requests = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: FakeOpenAI
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, body))
+        if self.server.status != 200:
+            self._send_json(self.server.status, {"error": {"message": "bad request", "type": "invalid_request_error"}})
+        elif body.get("stream"):
+            self._send_stream(body["model"])
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": self.server.completion}, "finish_reason": "stop"}],
+            })
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        text, size = self.server.completion, self.server.chunk_size
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": text[i:i + size]} for i in range(0, len(text), size)]
+        for delta in deltas:
+            chunk = {
+                "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    server = FakeOpenAI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "openai_base_url", server.base_url)
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _stream(service: AIService, prompt: AIPrompt):
+    async def collect():
+        return [delta async for delta in service.stream_completion(prompt)]
+    return asyncio.run(collect())
+
+def test_streamed_deltas_parse_into_sections(openai_server):
+    deltas = _stream(AIService(), PROMPT)
+    assert "".join(deltas) == COMPLETION
+    assert len(deltas) > 1
+
+    parser = AIResponseParser()
+    events = [event for delta in deltas for event in parser.feed(delta)]
+    sections = {}
+    for section, text in events:
+        sections[section] = sections.get(section, "") + text
+    assert sections == {"description": "A compact bracket printed in PLA.", "pitch": "Ready to ship in two days."}
+    assert parser.result() == ("A compact bracket printed in PLA.", "Ready to ship in two days.")
+    assert parser.reasoning == "Sturdy PLA part"
+
+    path, body = openai_server.requests[0]
+    assert path == "/v1/chat/completions"
+    assert body["stream"] is True
+    assert body["model"] == settings.ai_model
+    assert body["messages"] == PROMPT.messages
+
+def test_single_character_deltas_parse_the_same(openai_server):
+    openai_server.chunk_size = 1
+    parser = AIResponseParser()
+    for delta in _stream(AIService(), PROMPT):
+        parser.feed(delta)
+    assert parser.result() == ("A compact bracket printed in PLA.", "Ready to ship in two days.")
+
+def test_streamed_and_blocking_completions_agree(openai_server):
+    service = AIService()
+    parser = AIResponseParser()
+    for delta in _stream(service, PROMPT):
+        parser.feed(delta)
+    assert parser.result() == service.complete(PROMPT)
+
+def test_upstream_errors_surface_as_ai_service_errors(openai_server):
+    openai_server.status = 400
+    with pytest.raises(AIServiceException):
+        _stream(AIService(), PROMPT)
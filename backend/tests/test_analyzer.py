@@ -0,0 +1,44 @@
+import dataclasses
+
+import numpy as np
+import pytest
+import trimesh
+
+from mesh.analyzer import AnalysisOptions, analyze_binary_stl, analyze_binary_stl_parallel
+
+@pytest.fixture
+def stl_path(tmp_path):
+    # Two shells, one of them lifted off the plate, so overhangs and support volume are non-trivial
+    sphere = trimesh.creation.icosphere(subdivisions=3, radius=10.0)
+    box = trimesh.creation.box(extents=(8.0, 6.0, 4.0))
+    box.apply_translation((25.0, 0.0, 12.0))
+    path = tmp_path / "model.stl"
+    trimesh.util.concatenate([sphere, box]).export(path, file_type="stl")
+    return str(path)
+
+@pytest.mark.parametrize("chunk_faces", [200, 1000, 7])
+def test_parallel_matches_serial(stl_path, chunk_faces):
+    options = AnalysisOptions(workers=2, chunk_faces=chunk_faces)
+    serial = dataclasses.asdict(analyze_binary_stl(stl_path, options))
+    parallel = dataclasses.asdict(analyze_binary_stl_parallel(stl_path, options))
+
+    assert serial.keys() == parallel.keys()
+    for field, expected in serial.items():
+        if isinstance(expected, float):
+            assert parallel[field] == pytest.approx(expected, rel=1e-9, abs=1e-9), field
+        else:
+            assert parallel[field] == expected, field
+
+def test_parallel_reports_progress_to_completion(stl_path):
+    fractions = []
+    analyze_binary_stl_parallel(stl_path, AnalysisOptions(workers=2, chunk_faces=200), progress=fractions.append)
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == pytest.approx(1.0)
+
+def test_topology_of_closed_shells(stl_path):
+    stats = analyze_binary_stl(stl_path)
+    assert stats.poly_count == 1280 + 12
+    assert stats.is_watertight is True
+    assert stats.shell_count == 2
+    assert stats.volume_mm3 == pytest.approx(trimesh.creation.icosphere(subdivisions=3, radius=10.0).volume + 8 * 6 * 4, rel=1e-6)
+    assert np.isfinite(stats.support_volume_mm3)
@@ -0,0 +1,52 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from auth.route import COOKIE_NAME
+from config import settings
+from main import app
+
+@pytest.fixture
+def auth_client():
+    # Real cookie authentication, without the get_current_user override of the client fixture
+    with TestClient(app) as client:
+        yield client
+
+def _sign_in(client: TestClient, email: str) -> str:
+    """Registers and logs in ``email``; returns its session token."""
+    credentials = {"username": email, "password": "correct horse"}
+    assert client.post("/auth/register", json={"email": email, "password": credentials["password"]}).status_code == 200
+    assert client.post("/auth/token", data=credentials).status_code == 200
+    return client.cookies[COOKIE_NAME]
+
+def _use(client: TestClient, token: str) -> TestClient:
+    client.cookies.set(COOKIE_NAME, token)
+    return client
+
+@pytest.fixture
+def admin_email(monkeypatch):
+    email = f"admin-{uuid.uuid4().hex[:8]}@example.com"
+    monkeypatch.setattr(settings, "admin_emails", [email])
+    return email
+
+def test_deactivated_user_is_rejected_despite_a_cached_token(auth_client, admin_email):
+    email = f"user-{uuid.uuid4().hex[:8]}@example.com"
+    user_token = _sign_in(auth_client, email)
+    admin_token = _sign_in(auth_client, admin_email)
+    # The first request verifies the token and caches the result
+    assert _use(auth_client, user_token).get("/auth/me").status_code == 200
+
+    response = _use(auth_client, admin_token).post(f"/auth/admin/users/{email}/deactivate")
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+    assert _use(auth_client, user_token).get("/auth/me").status_code == 401
+
+def test_only_admins_can_deactivate_users(auth_client, admin_email):
+    _sign_in(auth_client, f"user-{uuid.uuid4().hex[:8]}@example.com")
+    assert auth_client.post(f"/auth/admin/users/{admin_email}/deactivate").status_code == 403
+
+def test_deactivating_an_unknown_user_is_not_found(auth_client, admin_email):
+    _sign_in(auth_client, admin_email)
+    assert auth_client.post("/auth/admin/users/nobody@example.com/deactivate").status_code == 404
@@ -0,0 +1,27 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from exceptions import InvalidUploadException
+from projects.file_service import FileService
+
+@pytest.fixture
+def file_service(tmp_path):
+    return FileService(str(tmp_path / "uploads"))
+
+@pytest.mark.parametrize("filename", [None, "", "models/"])
+def test_upload_without_a_file_name_is_rejected(file_service, filename):
+    upload = UploadFile(io.BytesIO(b"solid empty\nendsolid empty\n"), filename=filename)
+    with pytest.raises(InvalidUploadException) as error:
+        asyncio.run(file_service.save_upload_file(upload, "project"))
+    assert error.value.status_code == 400
+    with pytest.raises(InvalidUploadException):
+        asyncio.run(file_service.create_multipart_upload("project", filename))
+
+def test_upload_keeps_only_the_last_path_component(file_service):
+    upload = UploadFile(io.BytesIO(b"solid empty\nendsolid empty\n"), filename="../../etc/part.stl")
+    stored = asyncio.run(file_service.save_upload_file(upload, "project"))
+    assert stored.staged_path.endswith("-part.stl")
+    assert asyncio.run(file_service.create_multipart_upload("project", "../part.stl")).filename == "part.stl"
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from auth.google import GoogleTokenVerifier
+
+CLIENT_ID = "client-id.apps.googleusercontent.com"
+CERTS_URL = "https://google.test/oauth2/v3/certs"
+USERINFO_URL = "https://google.test/oauth2/v3/userinfo"
+
+class SigningKey:
+    def __init__(self, kid: str):
+        self.kid = kid
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        public_pem = private.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid}
+
+    def id_token(self, email: str, audience: str = CLIENT_ID) -> str:
+        claims = {"iss": "https://accounts.google.com", "aud": audience, "email": email, "exp": int(time.time()) + 300}
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+class FakeGoogle:
+    """Stands in for Google's JWKS and userinfo endpoints; counts the requests it serves."""
+
+    def __init__(self, *keys: SigningKey):
+        self.keys = list(keys)
+        self.max_age = 3600
+        self.access_tokens = {}
+        self.certs_requests = 0
+        self.userinfo_requests = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url == CERTS_URL:
+            self.certs_requests += 1
+            return httpx.Response(
+                200,
+                json={"keys": [key.public_jwk for key in self.keys]},
+                headers={"Cache-Control": f"public, max-age={self.max_age}"},
+            )
+        if request.url == USERINFO_URL:
+            self.userinfo_requests += 1
+            email = self.access_tokens.get(request.headers.get("Authorization", "").removeprefix("Bearer "))
+            return httpx.Response(200, json={"email": email}) if email else httpx.Response(401)
+        return httpx.Response(404)
+
+@pytest.fixture(scope="module")
+def keys():
+    # RSA key generation is the slow part, so the keys are shared by the module
+    return SigningKey("key-1"), SigningKey("key-2")
+
+def _verifier(google: FakeGoogle, jwks_min_refresh: float = 60) -> GoogleTokenVerifier:
+    verifier = GoogleTokenVerifier(CLIENT_ID, CERTS_URL, USERINFO_URL, userinfo_ttl=60, jwks_min_refresh=jwks_min_refresh)
+    verifier._client = httpx.AsyncClient(transport=httpx.MockTransport(google.handle))
+    return verifier
+
+def _run(verifier: GoogleTokenVerifier, *calls):
+    async def scenario():
+        try:
+            return [await call() for call in calls]
+        finally:
+            await verifier.aclose()
+    return asyncio.run(scenario())
+
+def test_id_tokens_are_verified_against_cached_keys(keys):
+    google = FakeGoogle(keys[0])
+    verifier = _verifier(google)
+    token = keys[0].id_token("ada@example.com")
+    results = _run(
+        verifier,
+        lambda: verifier.verify_id_token(token),
+        lambda: verifier.verify_id_token(token),
+        lambda: verifier.verify_id_token(keys[0].id_token("ada@example.com", audience="someone-else")),
+    )
+    assert results == ["ada@example.com", "ada@example.com", None]
+    assert google.certs_requests == 1
+
+def test_keys_are_refetched_when_their_cache_lifetime_ends(keys):
+    google = FakeGoogle(keys[0])
+    google.max_age = 0
+    verifier = _verifier(google)
+    token = keys[0].id_token("ada@example.com")
+    assert _run(verifier, lambda: verifier.verify_id_token(token), lambda: verifier.verify_id_token(token)) == ["ada@example.com"] * 2
+    assert google.certs_requests == 2
+
+def test_rotated_key_is_fetched_on_first_sight(keys):
+    google = FakeGoogle(keys[0])
+    verifier = _verifier(google, jwks_min_refresh=0)
+
+    async def rotate():
+        google.keys = [keys[1]]
+
+    results = _run(
+        verifier,
+        lambda: verifier.verify_id_token(keys[0].id_token("ada@example.com")),
+        rotate,
+        lambda: verifier.verify_id_token(keys[1].id_token("ada@example.com")),
+    )
+    assert results == ["ada@example.com", None, "ada@example.com"]
+    assert google.certs_requests == 2
+
+def test_unknown_key_ids_refetch_at_most_once_per_interval(keys):
+    google = FakeGoogle(keys[0])
+    verifier = _verifier(google, jwks_min_refresh=60)
+    # Signed by a key Google never published
+    forged = [keys[1].id_token(f"user{i}@example.com") for i in range(5)]
+
+    async def interval_passes():
+        verifier._jwks_fetched_at -= 60
+
+    results = _run(
+        verifier,
+        *[lambda token=token: verifier.verify_id_token(token) for token in forged],
+        interval_passes,
+        lambda: verifier.verify_id_token(forged[0]),
+        lambda: verifier.verify_id_token(forged[1]),
+    )
+    assert results == [None] * 8
+    # The initial fetch, then one more once the interval has passed
+    assert google.certs_requests == 2
+
+def test_concurrent_refreshes_share_one_request(keys):
+    google = FakeGoogle(keys[0])
+    verifier = _verifier(google)
+    token = keys[0].id_token("ada@example.com")
+
+    async def concurrently():
+        return await asyncio.gather(*(verifier.verify_id_token(token) for _ in range(10)))
+
+    assert _run(verifier, concurrently) == [["ada@example.com"] * 10]
+    assert google.certs_requests == 1
+
+def test_userinfo_lookups_are_memoized(keys):
+    google = FakeGoogle(keys[0])
+    google.access_tokens["ya29.valid"] = "ada@example.com"
+    verifier = _verifier(google)
+    results = _run(
+        verifier,
+        lambda: verifier.fetch_userinfo_email("ya29.valid"),
+        lambda: verifier.fetch_userinfo_email("ya29.valid"),
+        lambda: verifier.fetch_userinfo_email("ya29.revoked"),
+    )
+    assert results == ["ada@example.com", "ada@example.com", None]
+    assert google.userinfo_requests == 2
@@ -0,0 +1,10 @@
+from config import settings
+
+def test_db_health_is_admin_only(client):
+    assert client.get("/health/db").status_code == 403
+
+def test_db_health_reports_both_pools(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", [user.email])
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async"}
@@ -0,0 +1,28 @@
+import trimesh
+
+from mesh.lod import build_lods, plan_levels, reduced_levels
+
+RESOLUTIONS = [64, 256, 1024, 65535]
+
+def test_small_dense_detail_keeps_a_preview_finer_than_the_coarse_levels():
+    # A flat plate carrying a tiny, finely tessellated ball. Assuming evenly spread faces, the
+    # estimate puts every level from 256 up at the full face count, yet 256 and 1024 reduce it a lot
+    plate = trimesh.creation.box(extents=[200, 200, 20])
+    ball = trimesh.creation.icosphere(subdivisions=5, radius=2.0)
+    ball.apply_translation([50, 50, 12])
+    mesh = trimesh.util.concatenate([plate, ball])
+    poly_count = len(mesh.faces)
+
+    levels = plan_levels(RESOLUTIONS, poly_count, mesh.area, 200, max_faces=2_000_000)
+    assert levels == RESOLUTIONS
+
+    lods = reduced_levels(build_lods([mesh.triangles], levels, 200), poly_count)
+    faces = [len(lods[resolution][1]) for resolution in sorted(lods)]
+    assert faces == sorted(faces)
+    assert faces[-1] > 10 * faces[1]
+    # Nothing as large as the original is kept; the viewer loads that one last
+    assert faces[-1] < poly_count
+
+def test_levels_estimated_over_the_face_budget_are_skipped():
+    sphere = trimesh.creation.icosphere(subdivisions=6, radius=50.0)
+    assert plan_levels(RESOLUTIONS, len(sphere.faces), sphere.area, 100, max_faces=50_000) == [64]
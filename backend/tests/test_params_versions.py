@@ -0,0 +1,74 @@
+import asyncio
+
+from config import settings
+from projects import route as project_route
+from projects.params_buffer import ParamsWriteBuffer
+
+def _patch(client, project_id, version, **params):
+    return client.patch(f"/projects/{project_id}/params", json={"version": version, "production_params": params})
+
+def test_patches_merge_and_bump_the_version(client, project_id):
+    _patch(client, project_id, 0, material="PLA", infill=20)
+    response = _patch(client, project_id, 1, infill=None, quantity=5)
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.json()["production_params"] == {"material": "PLA", "quantity": 5}
+    assert client.get(f"/projects/{project_id}").json()["params_version"] == 2
+
+def test_put_takes_a_version_past_the_buffered_one(client, project_id):
+    assert _patch(client, project_id, 0, infill=20).json()["version"] == 1
+    put = client.put(f"/projects/{project_id}/params", json={"production_params": {"infill": 50}})
+    assert put.json()["params_version"] == 2
+
+    # Based on the state the PUT replaced: must conflict, not silently apply
+    conflict = _patch(client, project_id, 1, infill=25)
+    assert conflict.status_code == 409
+    assert conflict.json()["details"]["current_version"] == 2
+    assert _patch(client, project_id, 2, infill=25).json()["version"] == 3
+
+def _move_to_other_process(project_id):
+    """Hands the buffered params of a project to a buffer standing in for another API process."""
+    other = ParamsWriteBuffer(settings.params_flush_interval_seconds, settings.params_buffer_idle_seconds)
+    other._entries[project_id] = project_route.params_buffer._entries.pop(project_id)
+    return other
+
+def test_patch_waits_for_the_process_buffering_its_base_version(client, project_id):
+    assert _patch(client, project_id, 0, material="PLA", infill=20).json()["version"] == 1
+    other = _move_to_other_process(project_id)
+
+    async def flush_shortly():
+        await asyncio.sleep(0.3)
+        await other.flush()
+
+    # The other process flushes while this one's patch waits for version 1 to be stored
+    client.portal.start_task_soon(flush_shortly)
+    response = _patch(client, project_id, 1, infill=30)
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.json()["production_params"] == {"material": "PLA", "infill": 30}
+
+def test_patch_conflicts_if_the_buffering_process_never_flushes(client, project_id, monkeypatch):
+    monkeypatch.setattr(settings, "params_flush_wait_seconds", 0.2)
+    assert _patch(client, project_id, 0, infill=20).json()["version"] == 1
+    _move_to_other_process(project_id)
+    assert _patch(client, project_id, 0, infill=30).status_code == 409
+    assert _patch(client, project_id, 1, infill=30).status_code == 409
+
+def test_flush_drops_superseded_state(client, project_id, user):
+    assert _patch(client, project_id, 0, infill=20).json()["version"] == 1
+    entry = project_route.params_buffer.get(project_id, user.id)
+    client.put(f"/projects/{project_id}/params", json={"production_params": {"infill": 50}})
+    # A buffer elsewhere still holds version 1; its flush must not overwrite the PUT
+    project_route.params_buffer._entries[project_id] = entry
+    # On the app's event loop, where its database connections live
+    client.portal.call(project_route.params_buffer.flush)
+    assert project_route.params_buffer.get(project_id, user.id) is None
+    project = client.get(f"/projects/{project_id}").json()
+    assert project["params_version"] == 2
+    assert project["production_params"] == {"infill": 50}
+
+def test_list_shows_the_saved_batch_price(client, project_id):
+    body = {"production_params": {"quantity": 5}, "calculated_results": {"finalBatchPrice": 12.5}}
+    assert client.put(f"/projects/{project_id}/params", json=body).status_code == 200
+    items = client.get("/projects/").json()["items"]
+    assert next(item for item in items if item["id"] == project_id)["total_price"] == 12.5
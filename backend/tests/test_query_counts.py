@@ -0,0 +1,81 @@
+import random
+import struct
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from database import async_engine
+
+def _binary_stl() -> bytes:
+    # One triangle is enough for upload; the worker is never reached in these tests. A random
+    # height keeps every file unique, so no test sees another's blob references.
+    z = random.uniform(0, 1000)
+    record = struct.pack("<12fH", 0, 0, 1, 0, 0, z, 1, 0, z, 0, 1, z, 0)
+    return b"\0" * 80 + struct.pack("<I", 1) + record
+
+@pytest.fixture
+def statements():
+    """Collects the SQL statements the API sends while the returned context is active."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split(None, 1)[0].upper())
+
+    @contextmanager
+    def counting():
+        executed.clear()
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield executed
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    return counting
+
+def test_create_project_is_one_insert(client, statements):
+    with statements() as executed:
+        assert client.post("/projects/", json={"title": "Bracket"}).status_code == 200
+    assert executed == ["INSERT"]
+
+def test_update_details_loads_once_and_writes_once(client, project_id, statements):
+    with statements() as executed:
+        assert client.put(f"/projects/{project_id}", json={"client_name": "ACME"}).status_code == 200
+    assert executed == ["SELECT", "UPDATE"]
+
+def test_put_params_loads_once_and_writes_once(client, project_id, statements):
+    body = {"production_params": {"material": "PLA"}, "calculated_results": {"finalBatchPrice": 10}}
+    with statements() as executed:
+        assert client.put(f"/projects/{project_id}/params", json=body).status_code == 200
+    assert executed == ["SELECT", "UPDATE"]
+
+def test_upload_loads_project_and_analysis_once(client, project_id, statements):
+    with statements() as executed:
+        response = client.post(f"/projects/{project_id}/upload", files={"file": ("part.stl", _binary_stl(), "model/stl")})
+    assert response.status_code == 200
+    # Ownership check, analysis cache lookup, the write
+    assert executed == ["SELECT", "SELECT", "UPDATE"]
+
+def test_replacing_upload_also_counts_old_blob_references(client, project_id, statements):
+    client.post(f"/projects/{project_id}/upload", files={"file": ("part.stl", _binary_stl(), "model/stl")})
+    with statements() as executed:
+        client.post(f"/projects/{project_id}/upload", files={"file": ("part.stl", _binary_stl(), "model/stl")})
+    # The previous blob is released: one reference count, and a second after moving it aside
+    assert executed == ["SELECT", "SELECT", "UPDATE", "SELECT", "SELECT"]
+
+def test_delete_project(client, project_id, statements):
+    with statements() as executed:
+        assert client.delete(f"/projects/{project_id}").status_code == 204
+    assert executed == ["SELECT", "DELETE"]
+
+def test_patch_params_claims_its_version_and_buffers_the_params(client, project_id, statements):
+    with statements() as executed:
+        first = client.patch(f"/projects/{project_id}/params", json={"version": 0, "production_params": {"infill": 20}})
+    assert first.json()["version"] == 1
+    # Loading the project into the buffer, then the version claim
+    assert executed == ["SELECT", "UPDATE"]
+
+    with statements() as executed:
+        second = client.patch(f"/projects/{project_id}/params", json={"version": 1, "production_params": {"infill": 30}})
+    assert second.json()["version"] == 2
+    assert executed == ["UPDATE"]
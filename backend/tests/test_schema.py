@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+import models
+from database import upgrade_schema
+from projects.repo import ProjectRepository
+
+# The projects table as the first release created it, before any of the later columns
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id VARCHAR PRIMARY KEY, email VARCHAR UNIQUE, hashed_password VARCHAR, is_active BOOLEAN)",
+    """CREATE TABLE projects (
+        id VARCHAR PRIMARY KEY, title VARCHAR, created_at DATETIME, client_name VARCHAR, contact VARCHAR,
+        notes TEXT, owner_id VARCHAR REFERENCES users(id), file_path VARCHAR, file_status VARCHAR,
+        poly_count INTEGER, volume_mm3 FLOAT, dim_x FLOAT, dim_y FLOAT, dim_z FLOAT,
+        production_params JSON, calculated_results JSON, ai_description TEXT, ai_commercial_text TEXT
+    )""",
+    "INSERT INTO projects (id, title, file_status) VALUES ('legacy', 'Old project', 'ready')",
+    # Saved by the old PUT /params, which stored the whole request body
+    """INSERT INTO projects (id, title, production_params)
+       VALUES ('nested', 'Quoted project', '{"production_params": {"infill": 20}, "calculated_results": null}')""",
+]
+
+def test_upgrade_adds_missing_columns_indexes_and_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+
+    assert ("projects", "params_version") in upgrade_schema(engine, models.Base.metadata)
+    # Running it again on an up-to-date database changes nothing
+    assert upgrade_schema(engine, models.Base.metadata) == set()
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("projects")}
+    assert set(models.Project.__table__.columns.keys()) <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("projects")}
+    assert {"ix_projects_owner_created", "ix_projects_file_hash"} <= indexes
+    assert "mesh_analyses" in inspector.get_table_names()
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT params_version, params_claimed_version FROM projects WHERE id = 'legacy'")).one()
+    assert tuple(row) == (0, 0)
+
+def test_old_put_bodies_are_flattened(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+    upgrade_schema(engine, models.Base.metadata)
+
+    with Session(engine) as db:
+        repository = ProjectRepository(db)
+        assert repository.unnest_saved_params(batch_size=1) == 1
+        assert repository.unnest_saved_params() == 0
+        assert db.get(models.Project, "nested").production_params == {"infill": 20}
@@ -0,0 +1,36 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import worker
+from auth.cache import UserSnapshot
+
+OTHER = UserSnapshot(id=str(uuid.uuid4()), email="other@example.com", is_active=True)
+
+@pytest.fixture
+def tasks(monkeypatch):
+    # Stands in for the Redis result backend: task id -> owner
+    owners = {}
+    monkeypatch.setattr(worker, "task_owner", owners.get)
+    monkeypatch.setattr(worker.celery_app, "AsyncResult", lambda task_id: SimpleNamespace(state="PROGRESS", info={"completed": 1}))
+    return owners
+
+def test_ai_batch_is_readable_by_its_owner_only(client, login, user, tasks):
+    tasks["batch"] = user.id
+
+    assert client.get("/projects/ai-batch/batch").json()["progress"] == {"completed": 1}
+    login(OTHER)
+    assert client.get("/projects/ai-batch/batch").status_code == 404
+    # e.g. an admin requote, which has no owner record
+    assert client.get("/projects/ai-batch/requote").status_code == 404
+
+def test_ai_job_must_belong_to_the_project(client, login, tasks):
+    project_id = client.post("/projects/", json={"title": "Bracket"}).json()["id"]
+    other_project_id = client.post("/projects/", json={"title": "Hinge"}).json()["id"]
+    tasks["job"] = other_project_id
+
+    assert client.get(f"/projects/{project_id}/generate-ai/job").status_code == 404
+    assert client.get(f"/projects/{other_project_id}/generate-ai/job").json()["state"] == "PROGRESS"
+    login(OTHER)
+    assert client.get(f"/projects/{other_project_id}/generate-ai/job").status_code == 404
@@ -0,0 +1,50 @@
+import zlib
+
+import numpy as np
+import trimesh
+
+from mesh.thumbnail import render_thumbnail, view_basis
+
+SIZE = 128
+
+def _decode(png: bytes) -> np.ndarray:
+    # Only reads what encode_png writes: one IDAT chunk of unfiltered RGBA scanlines
+    start = png.index(b"IDAT") + 4
+    length = int.from_bytes(png[start - 8:start - 4], "big")
+    raw = np.frombuffer(zlib.decompress(png[start:start + length]), dtype=np.uint8)
+    return raw.reshape(SIZE, -1)[:, 1:].reshape(SIZE, SIZE, 4)
+
+def _grow(mask: np.ndarray) -> np.ndarray:
+    grown = mask.copy()
+    grown[1:] |= mask[:-1]
+    grown[:-1] |= mask[1:]
+    grown[:, 1:] |= mask[:, :-1]
+    grown[:, :-1] |= mask[:, 1:]
+    return grown
+
+def test_dense_mesh_covers_the_same_pixels_as_its_coarse_version():
+    coarse = trimesh.creation.box(extents=[3, 1, 2])
+    dense = coarse
+    for _ in range(6):
+        dense = dense.subdivide()
+    # Large faces go through the rasterizer, sub-pixel ones through the per-pixel shortcut
+    coarse_alpha = _decode(render_thumbnail(coarse.triangles, SIZE))[..., 3] > 0
+    dense_alpha = _decode(render_thumbnail(dense.triangles, SIZE))[..., 3] > 0
+    assert coarse_alpha.sum() > 0.3 * SIZE * SIZE
+    # Coverage may only differ on the silhouette
+    assert not (dense_alpha & ~_grow(coarse_alpha)).any()
+    assert not (coarse_alpha & ~_grow(dense_alpha)).any()
+
+def test_nearest_face_wins_whatever_the_order():
+    forward = view_basis()[2]
+    near = trimesh.creation.box(extents=[1, 1, 1]).triangles
+    # Smaller and turned, so its faces shade differently from the box around it
+    turned = trimesh.creation.box(extents=[0.5, 0.5, 0.5], transform=trimesh.transformations.rotation_matrix(0.5, [0, 0, 1])).triangles
+    near_only = _decode(render_thumbnail(near, SIZE))
+    covered = near_only[..., 3] > 0
+    # forward points away from the camera
+    for distance, hidden in ((3, True), (-3, False)):
+        other = turned + forward * distance
+        for faces in (np.concatenate([near, other]), np.concatenate([other, near])):
+            image = _decode(render_thumbnail(faces, SIZE))
+            assert np.array_equal(image[covered], near_only[covered]) == hidden
@@ -4,47 +4,398 @@ from celery import Celery
 redis_url = settings.redis_url
 
 celery_app = Celery("3d_worker", broker=redis_url, backend=redis_url)
+# Thumbnails run on their own queue and worker so they never sit in front of mesh analysis;
+# mesh files are routed to "mesh" or "mesh_large" by size when enqueued (enqueue_processing)
+celery_app.conf.task_routes = {"worker.render_project_thumbnail": {"queue": "thumbnails"}}
+# A worker process reserves only the task it runs, so a long mesh never holds others hostage
+celery_app.conf.worker_prefetch_multiplier = 1
+# Pool processes warm up before taking work (init_worker_process); allow for that on start
+celery_app.conf.worker_proc_alive_timeout = 30
 
+import asyncio
+import os
+import tempfile
+import time
+import uuid
 import models
+import numpy as np
 import trimesh
-from database import SessionLocal
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import worker_process_init
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from ai.batch import complete_batch
+from ai.cache import ai_cache
+from ai.service import AIPrompt, ai_service
+from database import SessionLocal, engine
+from mesh.analyzer import AnalysisOptions, analyze_mesh, iter_triangle_blocks
+from mesh.lod import build_lods, decode_qmesh, plan_levels, preview_assets_exist, reduced_levels, write_preview_assets
+from mesh.thumbnail import render_thumbnail, thumbnail_path
+from pricing.engine import calculate_results_batch
+from projects.delivery import precompress
+from projects.events import ProjectEventPublisher, status_event
+from projects.repo import ProjectRepository
+
+analysis_options = AnalysisOptions(
+    streaming_threshold=settings.streaming_analysis_threshold_mb * 1024 * 1024,
+    workers=settings.mesh_analysis_workers,
+    chunk_faces=settings.mesh_analysis_chunk_faces,
+    overhang_angle=settings.overhang_angle_deg,
+    topology_max_faces=settings.topology_max_faces,
+)
+event_publisher = ProjectEventPublisher(redis_url)
+# Progress events are only published when the fraction moves by at least this much
+PROGRESS_EVENT_STEP = 0.01
+
+MESH_QUEUE = "mesh"
+MESH_LARGE_QUEUE = "mesh_large"
+
+def mesh_queue(file_path: str) -> str:
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    return MESH_LARGE_QUEUE if size >= settings.mesh_large_file_mb * 1024 * 1024 else MESH_QUEUE
+
+def enqueue_processing(project_id: str, file_path: str):
+    return process_3d_file.apply_async(
+        (project_id,),
+        queue=mesh_queue(file_path),
+        # Also runs when the hard time limit kills the task, which skips its own handlers
+        link_error=processing_failed.s(),
+    )
+
+# Who may read a task's state and progress, kept next to its result for as long as it
+TASK_OWNER_PREFIX = "task-owner-"
+
+def enqueue_owned(task, owner: str, *args):
+    """Enqueues a task whose state only ``owner`` (a user or project id) may read back."""
+    task_id = str(uuid.uuid4())
+    # Recorded before the task is sent, so the owner is known from the very first poll
+    celery_app.backend.set(TASK_OWNER_PREFIX + task_id, owner)
+    return task.apply_async(args, task_id=task_id)
+
+def task_owner(task_id: str) -> Optional[str]:
+    owner = celery_app.backend.get(TASK_OWNER_PREFIX + task_id)
+    return owner.decode() if owner is not None else None
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # Pooled connections inherited from the parent must not be shared across the fork; the
+    # child opens its own and keeps them for every task it runs
+    engine.dispose(close=False)
+    _warm_up()
+
+def _warm_up():
+    """Runs a tiny mesh through analysis and rendering so the first real task doesn't pay for
+    trimesh's lazy imports, NumPy's BLAS start-up and the code paths' first-call costs."""
+    started = time.monotonic()
+    fd, path = tempfile.mkstemp(suffix=".stl")
+    os.close(fd)
+    try:
+        trimesh.creation.icosphere(subdivisions=2).export(path, file_type="stl")
+        stats = analyze_mesh(path, analysis_options)
+        render_thumbnail(np.asarray(trimesh.load(path, file_type="stl").triangles), 32)
+        print(f"Worker process warmed up in {time.monotonic() - started:.2f}s ({stats.poly_count} faces)")
+    except Exception as e:
+        # A cold process is slower, not broken
+        print(f"Worker warm-up failed: {e}")
+    finally:
+        os.remove(path)
+
+@celery_app.task(
+    bind=True,
+    # Redelivered if the worker goes away mid-task instead of being lost with its reservation
+    acks_late=True,
+    soft_time_limit=settings.mesh_task_soft_time_limit_seconds,
+    time_limit=settings.mesh_task_time_limit_seconds,
+)
+def process_3d_file(self, project_id: str):
+    db = SessionLocal()
+    try:
+        _process_3d_file(self, db, project_id)
+    except SoftTimeLimitExceeded:
+        print(f"Processing project {project_id} exceeded its time limit")
+        db.rollback()
+        _mark_processing_failed(db, project_id)
+    finally:
+        db.close()
 
 @celery_app.task
-def process_3d_file(project_id: str):
+def processing_failed(request, exc, traceback):
+    """Error callback of process_3d_file: a project must never stay "processing" forever."""
+    db = SessionLocal()
+    try:
+        _mark_processing_failed(db, request.args[0])
+    finally:
+        db.close()
+
+def _mark_processing_failed(db, project_id: str):
+    # Only a project still in processing is failed; one already ready keeps its results
+    updated = (
+        db.query(models.Project)
+        .filter(models.Project.id == project_id, models.Project.file_status == "processing")
+        .update({models.Project.file_status: "error"}, synchronize_session=False)
+    )
+    db.commit()
+    if updated:
+        event_publisher.publish(project_id, {"status": "error"})
+
+def _process_3d_file(task, db, project_id: str):
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project or not project.file_path:
+        return
+
+    file_path = project.file_path
+
+    # Another project may have analyzed the same content while this task was queued
+    if project.file_hash:
+        cached = db.query(models.MeshAnalysis).filter(models.MeshAnalysis.content_hash == project.file_hash).first()
+        if cached is not None and preview_assets_exist(cached.preview_assets):
+            for field in models.MESH_ANALYSIS_FIELDS:
+                setattr(project, field, getattr(cached, field))
+            project.file_status = "ready"
+            db.commit()
+            _publish_status(project)
+            return
+
+    report_progress = _progress_reporter(task, project_id)
+    event_publisher.publish(project_id, {"status": "processing", "stage": "analyzing", "progress": 0.0})
+    try:
+        # Binary STL is analyzed straight from a memory map (in parallel when large), huge
+        # ASCII STL/OBJ files are streamed in batches, and everything else goes through trimesh
+        stats = analyze_mesh(
+            file_path,
+            analysis_options,
+            progress=report_progress,
+        )
+        stats.preview_assets = _build_preview_assets(project_id, file_path, stats)
+
+        # Update DB with calculations
+        for field in models.MESH_ANALYSIS_FIELDS:
+            setattr(project, field, getattr(stats, field))
+        project.file_status = "ready"
+
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception as e:
+        print(f"Error processing mesh {file_path}: {e}")
+        project.file_status = "error"
+
+    db.commit()
+    _publish_status(project)
+
+    if project.file_status == "ready" and project.file_hash:
+        _cache_analysis(db, project)
+        render_project_thumbnail.delay(project_id)
+        # Last, so compressing a large file never holds back the ready status
+        _precompress_files([file_path] + [asset["path"] for asset in project.preview_assets or ()])
+
+@celery_app.task(
+    acks_late=True,
+    soft_time_limit=settings.thumbnail_task_soft_time_limit_seconds,
+    time_limit=settings.thumbnail_task_time_limit_seconds,
+)
+def render_project_thumbnail(project_id: str):
+    """Renders the dashboard thumbnail beside the project's blob, unless it already exists."""
     db = SessionLocal()
     try:
         project = db.query(models.Project).filter(models.Project.id == project_id).first()
-        if not project or not project.file_path:
+        if not project or project.file_status != "ready" or not project.file_path:
+            return
+        path = thumbnail_path(project.file_path)
+        if os.path.exists(path):
             return
-            
-        file_path = project.file_path
-        
+        triangles = _thumbnail_triangles(project)
+        if triangles is None:
+            return
+        data = render_thumbnail(triangles, settings.thumbnail_size)
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+    except SoftTimeLimitExceeded:
+        # The thumbnail route keeps showing the placeholder; nothing about the project is wrong
+        print(f"Rendering the thumbnail of project {project_id} exceeded its time limit")
+    finally:
+        db.close()
+
+def _thumbnail_triangles(project: models.Project):
+    # The finest viewer LOD within budget is already decimated and welded; prefer it
+    assets = [asset for asset in project.preview_assets or () if asset["faces"] <= settings.thumbnail_max_faces and os.path.exists(asset["path"])]
+    if assets:
+        with open(max(assets, key=lambda asset: asset["faces"])["path"], "rb") as f:
+            vertices, faces = decode_qmesh(f.read())
+        return vertices[faces]
+    if (project.poly_count or 0) <= settings.thumbnail_max_faces:
+        return np.concatenate(list(iter_triangle_blocks(project.file_path, analysis_options)))
+    return None
+
+def _precompress_files(paths):
+    for path in paths:
         try:
-            # Load the mesh using trimesh
-            mesh = trimesh.load(file_path, force='mesh')
-            
-            # Extract basic properties
-            poly_count = len(mesh.faces)
-            volume = mesh.volume
-            
-            # Dimensions (bounding box extent)
-            extents = mesh.bounding_box.extents
-            dim_x = extents[0]
-            dim_y = extents[1]
-            dim_z = extents[2]
-            
-            # Update DB with calculations
-            project.poly_count = poly_count
-            project.volume_mm3 = volume
-            project.dim_x = dim_x
-            project.dim_y = dim_y
-            project.dim_z = dim_z
-            project.file_status = "ready"
-            
-        except Exception as e:
-            print(f"Error processing mesh {file_path}: {e}")
-            project.file_status = "error"
-            
+            precompress(path)
+        except OSError as e:
+            print(f"Error precompressing {path}: {e}")
+
+def _build_preview_assets(project_id: str, file_path: str, stats):
+    # The viewer falls back to the original file, so a failure here never fails the upload
+    try:
+        longest = max(stats.dim_x, stats.dim_y, stats.dim_z)
+        levels = plan_levels(settings.lod_resolutions, stats.poly_count, stats.surface_area_mm2 or 0.0, longest, settings.lod_max_faces)
+        if not levels:
+            return None
+        event_publisher.publish(project_id, {"status": "processing", "stage": "preview", "progress": 1.0})
+        lods = build_lods(iter_triangle_blocks(file_path, analysis_options), levels, longest)
+        return write_preview_assets(file_path, reduced_levels(lods, stats.poly_count))
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception as e:
+        print(f"Error building previews for {file_path}: {e}")
+        return None
+
+def _progress_reporter(task, project_id: str):
+    last = [0.0]
+    def report(fraction: float):
+        if fraction - last[0] < PROGRESS_EVENT_STEP and fraction < 1.0:
+            return
+        last[0] = fraction
+        task.update_state(state="PROGRESS", meta={"project_id": project_id, "progress": fraction})
+        event_publisher.publish(project_id, {"status": "processing", "stage": "analyzing", "progress": round(fraction, 4)})
+    return report
+
+def _publish_status(project: models.Project):
+    event_publisher.publish(project.id, status_event(project))
+
+def _cache_analysis(db, project: models.Project):
+    stats = {field: getattr(project, field) for field in models.MESH_ANALYSIS_FIELDS}
+    try:
+        cached = db.query(models.MeshAnalysis).filter(models.MeshAnalysis.content_hash == project.file_hash).first()
+        if cached is not None:
+            # Re-analyzed because its preview assets had been deleted with the blob
+            cached.preview_assets = project.preview_assets
+        else:
+            db.add(models.MeshAnalysis(content_hash=project.file_hash, **stats))
         db.commit()
+    except IntegrityError:
+        # A concurrent task cached the same content first
+        db.rollback()
+
+@celery_app.task(bind=True)
+def requote_projects(self, batch_size: int = settings.requote_batch_size):
+    """Recomputes calculated_results for every analyzed project from its stored params."""
+    db = SessionLocal()
+    try:
+        repository = ProjectRepository(db)
+        total = repository.count_quotable_projects()
+        processed = skipped = 0
+        started = time.monotonic()
+        for rows in repository.iter_quote_inputs(batch_size):
+            results = calculate_results_batch([row.production_params for row in rows], [row.volume_mm3 for row in rows])
+            updates = [{"id": row.id, "calculated_results": result} for row, result in zip(rows, results) if result is not None]
+            if updates:
+                repository.bulk_update_calculated_results(updates)
+            processed += len(rows)
+            skipped += len(rows) - len(updates)
+            self.update_state(state="PROGRESS", meta=_requote_progress(processed, skipped, total, started))
+        return _requote_progress(processed, skipped, total, started)
+    finally:
+        db.close()
+
+def _requote_progress(processed: int, skipped: int, total: int, started: float) -> dict:
+    elapsed = time.monotonic() - started
+    return {
+        "processed": processed,
+        "skipped": skipped,
+        "total": total,
+        "elapsed_seconds": round(elapsed, 2),
+        "projects_per_second": round(processed / elapsed, 1) if elapsed else None,
+    }
+
+@celery_app.task(bind=True)
+def generate_project_ai(self, project_id: str, lang: str = "en"):
+    """Generates and stores the AI texts of a project; identical prompts share one completion."""
+    db = SessionLocal()
+    try:
+        project = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if project is None:
+            return
+        prompt = ai_service.build_prompt(project, lang)
+        if prompt is None:
+            return
+        description, commercial_text = _complete_once(prompt)
+        if description:
+            project.ai_description = description
+            project.ai_commercial_text = commercial_text
+            db.commit()
+    finally:
+        db.close()
+
+def _complete_once(prompt: AIPrompt):
+    key = prompt.cache_key
+    texts = ai_cache.get(key)
+    if texts is not None:
+        return texts
+    if not ai_cache.acquire(key):
+        texts = ai_cache.wait(key)
+        if texts is not None:
+            return texts
+        # The lock holder failed; fall through and try upstream ourselves
+    try:
+        texts = ai_service.complete(prompt)
+        ai_cache.set(key, texts)
+        return texts
+    finally:
+        ai_cache.release(key)
+
+@celery_app.task(bind=True)
+def generate_ai_batch(self, project_ids: list, owner_id: str, lang: str = "en"):
+    """Generates AI texts for many projects of one owner and saves them in a single bulk update."""
+    db = SessionLocal()
+    try:
+        repository = ProjectRepository(db)
+        prompts = {}
+        keys_by_project = {}
+        for project in repository.get_projects_by_ids(project_ids, owner_id):
+            prompt = ai_service.build_prompt(project, lang)
+            if prompt is not None:
+                prompts[prompt.cache_key] = prompt
+                keys_by_project[project.id] = prompt.cache_key
+
+        # Cached and identical prompts cost nothing upstream
+        texts_by_key = {}
+        for key in prompts:
+            cached = ai_cache.get(key)
+            if cached is not None:
+                texts_by_key[key] = cached
+        pending = {key: prompt for key, prompt in prompts.items() if key not in texts_by_key}
+
+        progress = {"total": len(project_ids), "prompts": len(prompts), "cached": len(texts_by_key), "completed": 0, "failed": 0, "updated": 0}
+        last_report = [0.0]
+
+        def on_result(key: str, texts):
+            if texts is None:
+                progress["failed"] += 1
+            else:
+                texts_by_key[key] = texts
+                ai_cache.set(key, texts)
+                progress["completed"] += 1
+            now = time.monotonic()
+            if now - last_report[0] >= 1.0:
+                last_report[0] = now
+                self.update_state(state="PROGRESS", meta=progress)
+
+        self.update_state(state="PROGRESS", meta=progress)
+        if pending:
+            asyncio.run(complete_batch(pending, on_result))
+
+        updates = [
+            {"id": project_id, "ai_description": texts_by_key[key][0], "ai_commercial_text": texts_by_key[key][1]}
+            for project_id, key in keys_by_project.items()
+            if key in texts_by_key and texts_by_key[key][0]
+        ]
+        if updates:
+            repository.bulk_update_ai_texts(updates)
+        progress["updated"] = len(updates)
+        return progress
     finally:
         db.close()
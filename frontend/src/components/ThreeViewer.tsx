@@ -1,9 +1,10 @@
 import { Canvas, useThree } from '@react-three/fiber';
 import { OrbitControls, Center } from '@react-three/drei';
-import { useRef, useEffect, useCallback } from 'react';
+import { useRef, useEffect, useCallback, Suspense } from 'react';
 import * as THREE from 'three';
 import { RotateCcw } from 'lucide-react';
 import { useI18n } from '../lib/i18n';
+import { QMeshLoader } from '../lib/qmesh';
 // @ts-ignore
 import { STLLoader } from 'three/examples/jsm/loaders/STLLoader';
 // @ts-ignore
@@ -15,6 +16,8 @@ import { useLoader } from '@react-three/fiber';
 interface ThreeViewerProps {
     fileUrl?: string;
     fileExt?: string;
+    // Decimated previews, coarse first; shown in turn while the original loads
+    lodUrls?: string[];
     status: string;
 }
 
@@ -94,7 +97,26 @@ const Model = ({ url, ext }: { url: string, ext: string }) => {
     return null;
 };
 
-export const ThreeViewer = ({ fileUrl, fileExt, status }: ThreeViewerProps) => {
+/**
+ * Shows each level of detail while the next, finer one downloads, so the first
+ * few-MB preview appears quickly and detail streams in behind it. The previews are
+ * all reduced, so the original comes last.
+ */
+const LodModel = ({ urls, original, index = 0 }: { urls: string[], original: React.ReactNode, index?: number }) => {
+    const geometry = useLoader(QMeshLoader as any, urls[index]) as unknown as THREE.BufferGeometry;
+    const mesh = (
+        <mesh geometry={geometry}>
+            <meshStandardMaterial color="#3b82f6" roughness={0.4} metalness={0.1} />
+        </mesh>
+    );
+    return (
+        <Suspense fallback={mesh}>
+            {index + 1 < urls.length ? <LodModel urls={urls} original={original} index={index + 1} /> : original}
+        </Suspense>
+    );
+};
+
+export const ThreeViewer = ({ fileUrl, fileExt, lodUrls, status }: ThreeViewerProps) => {
     const controlsRef = useRef<any>(null);
     const groupRef = useRef<THREE.Group>(null);
     const { t } = useI18n();
@@ -149,7 +171,11 @@ export const ThreeViewer = ({ fileUrl, fileExt, status }: ThreeViewerProps) => {
 
                 <group ref={groupRef}>
                     <Center>
-                        <Model url={fileUrl} ext={fileExt || 'stl'} />
+                        {lodUrls && lodUrls.length > 0 ? (
+                            <LodModel urls={lodUrls} original={<Model url={fileUrl} ext={fileExt || 'stl'} />} />
+                        ) : (
+                            <Model url={fileUrl} ext={fileExt || 'stl'} />
+                        )}
                     </Center>
                 </group>
 
@@ -6,12 +6,14 @@ import { useI18n } from '../../lib/i18n';
 
 interface ViewerPanelProps {
     project: Project;
+    processingProgress?: number | null;
 }
 
-export const ViewerPanel: React.FC<ViewerPanelProps> = ({ project }) => {
+export const ViewerPanel: React.FC<ViewerPanelProps> = ({ project, processingProgress }) => {
     const API_BASE = import.meta.env.VITE_API_URL || 'http://localhost:8000';
     const API_FILE_URL = project.file_path ? `${API_BASE}/${project.file_path}` : undefined;
     const fileExt = project.file_path ? project.file_path.split('.').pop() : undefined;
+    const lodUrls = project.preview_assets?.map(asset => `${API_BASE}/${asset.path}`);
     const { t } = useI18n();
 
     return (
@@ -29,7 +31,10 @@ export const ViewerPanel: React.FC<ViewerPanelProps> = ({ project }) => {
                             <div className="flex justify-between gap-6"><span className="text-gray-400">{t('polygons')}</span> <span className="text-gray-200">{project.poly_count?.toLocaleString()}</span></div>
                         </div>
                     ) : (
-                        <div className="text-xs text-gray-500 italic">{t('waiting_processing')}</div>
+                        <div className="text-xs text-gray-500 italic">
+                            {t('waiting_processing')}
+                            {project.file_status === 'processing' && processingProgress != null && ` ${Math.round(processingProgress * 100)}%`}
+                        </div>
                     )}
                 </div>
 
@@ -37,6 +42,7 @@ export const ViewerPanel: React.FC<ViewerPanelProps> = ({ project }) => {
                     <ThreeViewer
                         fileUrl={API_FILE_URL}
                         fileExt={fileExt}
+                        lodUrls={lodUrls}
                         status={project.file_status}
                     />
                 </div>
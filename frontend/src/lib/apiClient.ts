@@ -1,7 +1,7 @@
 import axios from 'axios';
 import { useStore } from '../store';
 
-const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+export const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 export const apiClient = axios.create({
     baseURL: API_URL,
@@ -0,0 +1,33 @@
+// JSON merge patches (RFC 7386), the format PATCH /projects/{id}/params accepts
+
+type Json = any;
+
+const isObject = (value: Json) => value !== null && typeof value === 'object' && !Array.isArray(value);
+
+// Smallest patch that turns `from` into `to`, or undefined when they are equal
+export const diffMergePatch = (from: Json, to: Json): Json => {
+    if (!isObject(from) || !isObject(to)) {
+        return JSON.stringify(from) === JSON.stringify(to) ? undefined : to;
+    }
+    const patch: Record<string, Json> = {};
+    for (const key of Object.keys(from)) {
+        // null removes a key
+        if (!(key in to) || to[key] === undefined) patch[key] = null;
+    }
+    for (const [key, value] of Object.entries(to)) {
+        if (value === undefined) continue;
+        const change = key in from ? diffMergePatch(from[key], value) : value;
+        if (change !== undefined) patch[key] = change;
+    }
+    return Object.keys(patch).length ? patch : undefined;
+};
+
+export const applyMergePatch = (target: Json, patch: Json): Json => {
+    if (!isObject(patch)) return patch;
+    const result: Record<string, Json> = isObject(target) ? { ...target } : {};
+    for (const [key, value] of Object.entries(patch)) {
+        if (value === null) delete result[key];
+        else result[key] = applyMergePatch(result[key], value);
+    }
+    return result;
+};
@@ -0,0 +1,52 @@
+import * as THREE from 'three';
+
+// Mirrors backend/mesh/lod.py: magic, version, index byte width, vertex count, face count, origin xyz, step xyz
+const HEADER_SIZE = 40;
+const MAGIC = 'QMSH';
+
+export const decodeQMesh = (buffer: ArrayBuffer): THREE.BufferGeometry => {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== MAGIC) throw new Error('Not a qmesh file');
+
+    const indexBytes = view.getUint16(6, true);
+    const vertexCount = view.getUint32(8, true);
+    const faceCount = view.getUint32(12, true);
+    const origin = [0, 1, 2].map(i => view.getFloat32(16 + i * 4, true));
+    const step = [0, 1, 2].map(i => view.getFloat32(28 + i * 4, true));
+
+    // Dequantize the 16-bit positions over the bounding box
+    const quantized = new Uint16Array(buffer, HEADER_SIZE, vertexCount * 3);
+    const positions = new Float32Array(vertexCount * 3);
+    for (let i = 0; i < positions.length; i++) {
+        const axis = i % 3;
+        positions[i] = origin[axis] + quantized[i] * step[axis];
+    }
+
+    // Indices start 4-byte aligned after the positions
+    const indexOffset = HEADER_SIZE + Math.ceil((vertexCount * 6) / 4) * 4;
+    const indices = indexBytes === 2
+        ? new Uint16Array(buffer, indexOffset, faceCount * 3)
+        : new Uint32Array(buffer, indexOffset, faceCount * 3);
+
+    const geometry = new THREE.BufferGeometry();
+    geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3));
+    geometry.setIndex(new THREE.BufferAttribute(indices, 1));
+    geometry.computeVertexNormals();
+    return geometry;
+};
+
+export class QMeshLoader extends THREE.Loader {
+    load(url: string, onLoad: (geometry: THREE.BufferGeometry) => void, onProgress?: (event: ProgressEvent) => void, onError?: (err: unknown) => void) {
+        const loader = new THREE.FileLoader(this.manager);
+        loader.setResponseType('arraybuffer');
+        loader.setWithCredentials(this.withCredentials);
+        loader.load(url, (data) => {
+            try {
+                onLoad(decodeQMesh(data as ArrayBuffer));
+            } catch (e) {
+                onError ? onError(e) : console.error(e);
+            }
+        }, onProgress, onError);
+    }
+}
@@ -26,7 +26,7 @@ export const Dashboard = () => {
     const fetchProjects = async () => {
         try {
             const res = await projectsApi.getProjects();
-            setProjects(res.data);
+            setProjects(res.data.items);
         } catch (err) {
             console.error(err);
         } finally {
@@ -38,7 +38,7 @@ export const Dashboard = () => {
         setCreating(true);
         try {
             const res = await projectsApi.createProject(data);
-            setProjects([...projects, res.data]);
+            setProjects([res.data, ...projects]);
             setShowModal(false);
             toast.success('Project created');
             handleOpenProject(res.data.id);
@@ -162,6 +162,16 @@ export const Dashboard = () => {
                                     )}
                                 </button>
 
+                                {project.file_status === 'ready' && (
+                                    <img
+                                        src={projectsApi.thumbnailUrl(project.id)}
+                                        alt=""
+                                        loading="lazy"
+                                        className="w-full h-32 object-contain mb-4 rounded-xl bg-dark-900/40"
+                                        onError={(e) => { e.currentTarget.style.display = 'none'; }}
+                                    />
+                                )}
+
                                 <div className="flex justify-between items-start mb-4 pr-8">
                                     <h3 className="text-lg font-semibold text-white group-hover:text-primary-400 transition-colors leading-tight">
                                         {project.title}
@@ -187,11 +197,11 @@ export const Dashboard = () => {
                                             {new Date(project.created_at).toLocaleDateString()}
                                         </span>
                                     </div>
-                                    {project.calculated_results?.total_price && (
+                                    {project.total_price != null && (
                                         <div className="flex items-center gap-2 mt-3 pt-3 border-t border-white/5">
                                             <span className="text-xs text-gray-500">Quote:</span>
                                             <span className="text-lg font-bold text-white">
-                                                ${project.calculated_results.total_price.toFixed(2)}
+                                                ${project.total_price.toFixed(2)}
                                             </span>
                                         </div>
                                     )}
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState, useMemo, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { useStore } from '../store';
 import { projectsApi } from '../projects/api';
@@ -10,6 +10,7 @@ import { ParametersPanel } from '../components/project/ParametersPanel';
 import { ViewerPanel } from '../components/project/ViewerPanel';
 import { ResultsPanel } from '../components/project/ResultsPanel';
 import { calculateEconomics } from '../lib/calculator';
+import { applyMergePatch, diffMergePatch } from '../lib/mergePatch';
 import { useI18n } from '../lib/i18n';
 
 const DEFAULT_PARAMS = {
@@ -53,8 +54,13 @@ export const ProjectEditor = () => {
     const [editContact, setEditContact] = useState('');
     const [editNotes, setEditNotes] = useState('');
     const [showDetails, setShowDetails] = useState(false);
+    // Last params_version seen from the server, sent with every autosave patch
+    const paramsVersion = useRef(0);
+    // What the server holds at that version; autosave sends only the difference to it
+    const savedState = useRef<{ params: any; results: any }>({ params: {}, results: null });
+    const [processingProgress, setProcessingProgress] = useState<number | null>(null);
 
-    // Poll project status if it's processing
+    // Load the project, then follow processing status over server-sent events
     useEffect(() => {
         if (!id) return;
 
@@ -62,6 +68,8 @@ export const ProjectEditor = () => {
             try {
                 const res = await projectsApi.getProject(id as string);
                 setProject(res.data);
+                paramsVersion.current = res.data.params_version ?? 0;
+                savedState.current = { params: res.data.production_params ?? {}, results: res.data.calculated_results ?? null };
                 if (res.data.production_params) {
                     setParams(prev => ({ ...prev, ...res.data.production_params }));
                 }
@@ -71,14 +79,24 @@ export const ProjectEditor = () => {
         };
 
         fetchProject();
+    }, [id]);
 
-        // Poll every 3 seconds if processing
-        let interval: NodeJS.Timeout;
-        if (project?.file_status === 'processing') {
-            interval = setInterval(fetchProject, 3000);
-        }
+    useEffect(() => {
+        if (!id || project?.file_status !== 'processing') return;
+
+        const source = projectsApi.subscribeEvents(id);
+        source.addEventListener('status', (e) => {
+            const event = JSON.parse((e as MessageEvent).data);
+            if (event.status === 'processing') {
+                setProcessingProgress(event.progress ?? null);
+                return;
+            }
+            source.close();
+            setProcessingProgress(null);
+            setProject(prev => prev ? { ...prev, ...event, file_status: event.status } : prev);
+        });
 
-        return () => clearInterval(interval);
+        return () => source.close();
     }, [id, project?.file_status]);
 
     // Reactive calculations via pure function
@@ -89,15 +107,25 @@ export const ProjectEditor = () => {
         if (!project || !results) return;
 
         const timeoutId = setTimeout(async () => {
+            const base = savedState.current;
+            const patch = {
+                production_params: diffMergePatch(base.params, params),
+                calculated_results: diffMergePatch(base.results, results),
+            };
+            if (patch.production_params === undefined && patch.calculated_results === undefined) return;
+
             setSaving(true);
             try {
-                await projectsApi.updateProjectParams(project.id, {
-                    production_params: params,
-                    calculated_results: results
-                });
+                const res = await projectsApi.patchProjectParams(project.id, { version: paramsVersion.current, ...patch });
+                paramsVersion.current = res.data.version;
+                savedState.current = { params, results };
                 updateProjectInList({ ...project, production_params: params, calculated_results: results });
-            } catch (e) {
-                console.error("Auto-save failed", e);
+            } catch (e: any) {
+                if (e.response?.status === 409) {
+                    await rebaseOnServer(base);
+                } else {
+                    console.error("Auto-save failed", e);
+                }
             } finally {
                 setSaving(false);
             }
@@ -106,6 +134,22 @@ export const ProjectEditor = () => {
         return () => clearTimeout(timeoutId);
     }, [params, results]);
 
+    // Someone else saved first: take their state and re-apply only our unsaved edits on top.
+    // The params change, so the next autosave sends those edits against the new version.
+    const rebaseOnServer = async (base: { params: any; results: any }) => {
+        if (!project) return;
+        try {
+            const res = await projectsApi.getProject(project.id);
+            const server = res.data.production_params ?? {};
+            paramsVersion.current = res.data.params_version ?? 0;
+            savedState.current = { params: server, results: res.data.calculated_results ?? null };
+            setParams(current => ({ ...DEFAULT_PARAMS, ...applyMergePatch(server, diffMergePatch(base.params, current) ?? {}) }));
+            toast.info('Parameters were changed elsewhere; your edits were merged');
+        } catch (e) {
+            console.error("Failed to reload parameters", e);
+        }
+    };
+
     const handleFileUpload = async (e: React.ChangeEvent<HTMLInputElement>) => {
         if (!e.target.files || !e.target.files[0] || !project) return;
 
@@ -138,14 +182,39 @@ export const ProjectEditor = () => {
         setGeneratingAi(true);
         try {
             // Ensure latest calculations are saved before generating
-            await projectsApi.updateProjectParams(project.id, {
+            const saved = await projectsApi.updateProjectParams(project.id, {
                 production_params: params,
                 calculated_results: results
             });
-
-            const res = await projectsApi.generateAi(project.id, lang);
-            setProject(res.data);
-            updateProjectInList(res.data);
+            paramsVersion.current = saved.data.params_version ?? paramsVersion.current;
+            savedState.current = { params: saved.data.production_params ?? {}, results: saved.data.calculated_results ?? null };
+
+            // Texts render as the model writes them; the stream ends with the saved project
+            setProject(prev => prev ? { ...prev, ai_description: '', ai_commercial_text: '' } : prev);
+            const savedProject = await new Promise<any>((resolve, reject) => {
+                const source = projectsApi.streamAi(project.id, lang);
+                const append = (field: 'ai_description' | 'ai_commercial_text') => (e: Event) => {
+                    const { delta } = JSON.parse((e as MessageEvent).data);
+                    setProject(prev => prev ? { ...prev, [field]: (prev[field] || '') + delta } : prev);
+                };
+                source.addEventListener('description', append('ai_description'));
+                source.addEventListener('pitch', append('ai_commercial_text'));
+                source.addEventListener('done', (e) => {
+                    source.close();
+                    resolve(JSON.parse((e as MessageEvent).data));
+                });
+                source.addEventListener('ai_error', (e) => {
+                    source.close();
+                    reject(new Error(JSON.parse((e as MessageEvent).data).message));
+                });
+                // Closing stops EventSource from reconnecting and regenerating
+                source.onerror = () => {
+                    source.close();
+                    reject(new Error('AI stream interrupted'));
+                };
+            });
+            setProject(savedProject);
+            updateProjectInList(savedProject);
             toast.success(t('saving') ? 'AI descriptions generated' : 'AI descriptions generated'); // Toast can also use existing or simple strings
         } catch (e) {
             console.error(e);
@@ -390,7 +459,7 @@ export const ProjectEditor = () => {
                 <ParametersPanel params={params} onChange={handleChange} />
 
                 {/* CENTER PANEL: 3D Viewer */}
-                <ViewerPanel project={project} />
+                <ViewerPanel project={project} processingProgress={processingProgress} />
 
                 {/* RIGHT PANEL: Results */}
                 <ResultsPanel
@@ -1,12 +1,18 @@
-import { apiClient } from '../lib/apiClient';
+import { apiClient, API_URL } from '../lib/apiClient';
 
 export const projectsApi = {
-    getProjects: () => apiClient.get('/projects'),
+    getProjects: (params?: { cursor?: string; limit?: number; file_status?: string; title?: string }) => apiClient.get('/projects', { params }),
     getProject: (id: string) => apiClient.get(`/projects/${id}`),
     createProject: (data: any) => apiClient.post('/projects', data),
     updateProject: (id: string, data: any) => apiClient.put(`/projects/${id}`, data),
     deleteProject: (id: string) => apiClient.delete(`/projects/${id}`),
     updateProjectParams: (id: string, params: any) => apiClient.put(`/projects/${id}/params`, params),
+    patchProjectParams: (id: string, patch: { version: number; production_params?: any; calculated_results?: any }) => apiClient.patch(`/projects/${id}/params`, patch),
     uploadFile: (id: string, formData: FormData) => apiClient.post(`/projects/${id}/upload`, formData),
+    // Server-sent status events while the uploaded file is being processed
+    subscribeEvents: (id: string) => new EventSource(`${API_URL}/projects/${id}/events`, { withCredentials: true }),
+    thumbnailUrl: (id: string) => `${API_URL}/projects/${id}/thumbnail`,
     generateAi: (id: string, lang: string = 'en') => apiClient.post(`/projects/${id}/generate-ai?lang=${lang}`),
+    streamAi: (id: string, lang: string = 'en') => new EventSource(`${API_URL}/projects/${id}/generate-ai-stream?lang=${lang}`, { withCredentials: true }),
+    getAiJob: (id: string, taskId: string) => apiClient.get(`/projects/${id}/generate-ai/${taskId}`),
 };
@@ -14,6 +14,9 @@ export interface Project {
     dim_z?: number;
     production_params?: Record<string, any>;
     calculated_results?: Record<string, any>;
+    params_version?: number;
+    preview_assets?: { level: number; path: string; faces: number; vertices: number; size: number }[];
+    total_price?: number; // list endpoint only, projected from calculated_results.finalBatchPrice
     ai_description?: string;
     ai_commercial_text?: string;
 }